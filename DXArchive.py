@@ -1,18 +1,27 @@
 from io import SEEK_END, SEEK_SET, TextIOWrapper
 from pathlib import Path
-from stat import FILE_ATTRIBUTE_DIRECTORY
 
 try:
     from .huffman import huffman_Decode
+    from .archivebase import ArchivedFile, DARC_FILETIME, DXArchiveBase
+    from .stats import FileRecord
+    from .nametable import getEncoding, readString
+    from .bufferpool import getOutput, readInto, takeOutput
+    from .keys import key_2_25_2_81
 except ImportError:
     from huffman import huffman_Decode
+    from archivebase import ArchivedFile, DARC_FILETIME, DXArchiveBase
+    from stats import FileRecord
+    from nametable import getEncoding, readString
+    from bufferpool import getOutput, readInto, takeOutput
+    from keys import key_2_25_2_81
 import struct
+from time import perf_counter
 
 
 DXA_HEAD = struct.unpack("H", b"DX")[0]  # Header
 DXA_VER = 0x0008  # Version
 DXA_VER_MIN = 0x0008  # The minimum version supported.
-DXA_BUFFERSIZE = 0x1000000  # Size of the buffer used when creating the archive
 DXA_KEY_BYTES = 7  # Number of bytes in the key
 DXA_KEY_STRING_LENGTH = 63  # Length of key string
 DXA_KEY_STRING_MAXLENGTH = 2048  # Size of key string buffer
@@ -79,29 +88,6 @@ Head->reserve = {self.reserve}
 """
 
 
-# Time information of the file
-class DARC_FILETIME:
-    create = None  # Creation time
-    lastAccess = None  # Last access time
-    lastWrite = None  # Last update time
-
-    def __init__(self, fileTime_bytes=None):
-        if fileTime_bytes is None:
-            return
-        unpacked = struct.unpack("QQQ", fileTime_bytes[: len(self)])
-        self.create = unpacked[0]
-        self.lastAccess = unpacked[1]
-        self.lastWrite = unpacked[2]
-
-    def __len__(self) -> int:
-        return struct.calcsize("QQQ")
-
-    def __repr__(self) -> str:
-        return f"""\tTime->create = {self.create}
-\tTime->lastAccess = {self.lastAccess}
-\tTime->lastWrite = {self.lastWrite}"""
-
-
 # File storage information
 class DARC_FILEHEAD:
     nameAddress = None  # Address where the file name is stored (the address of the member variable FileNameTableStartAddress of the ARCHIVE_HEAD structure is set to address 0)
@@ -172,77 +158,38 @@ self.fileHeadAddress = {self.fileHeadAddress}
 """
 
 
-# Information for storing the progress of the encoding process
-class DARC_ENCODEINFO:
-    totalFileNum = None  # Total number of files
-    compFileNum = None  # Number of files processed.
-    prevDispTime = None  # Time of the last status output
-    processFileName = None  # Name of the file currently being processed
-    outputStatus = None  # Whether status output is performed or not
+class MiddleWriter:
+    """
+    Write callable that fills buffer sequentially starting at offset,
+    handing what it's given back to pool
+    """
 
-    def __repr__(self) -> str:
-        return f"""
-self.totalFileNum = {self.totalFileNum}
-self.compFileNum = {self.compFileNum}
-self.prevDispTime = {self.prevDispTime}
-self.processFileName = {self.processFileName}
-self.outputStatus = {self.outputStatus}
-"""
+    def __init__(self, buffer: bytearray, offset: int, pool=None) -> None:
+        self.buffer = buffer
+        self.offset = offset
+        self.pool = pool
 
+    def __call__(self, data) -> None:
+        self.buffer[self.offset : self.offset + len(data)] = data
+        self.offset += len(data)
+        if self.pool is not None:
+            self.pool.give(data)
 
-class ArchivedFile:
-    filePath: Path
-    compressed: bool
-    huffmanCompressed: bool
-    key: bytearray | None
-    dataStart: int
-    dataSize: int
-    pressDataSize: int
-    huffPressDataSize: int
-
-    def __str__(self) -> str:
-        return f"""ArchivedFile(
-\tfilePath: {self.filePath}
-\tcompressed: {self.compressed}
-\thuffmanCompressed: {self.huffmanCompressed}
-\tkey: {self.key}
-\tdataStart: {self.dataStart}
-\tdataSize: {self.dataSize}
-\tpressDataSize: {self.pressDataSize}
-\thuffPressDataSize: {self.huffPressDataSize}
-)"""
-
-
-class DXArchive:
-    MIN_COMPRESS = 4  # Minimum number of compressed bytes
-    MAX_SEARCHLISTNUM = (
-        64  # Maximum number of lists to traverse to find the maximum match length
-    )
-    MAX_SUBLISTNUM = 65536  # Maximum number of sublists to reduce compression time
-    MAX_COPYSIZE = (
-        0x1FFF + MIN_COMPRESS
-    )  # Maximum size to copy from a reference address ( Maximum copy size that a compression code can represent + Minimum number of compressed bytes )
-    MAX_ADDRESSLISTNUM = 1024 * 1024 * 1  # Maximum size of slide dictionary
-    MAX_POSITION = 1 << 24  # Maximum relative address that can be referenced ( 16MB )
-
-    def __init__(self) -> None:
-        self.archivedFiles = []
-
-    def error(self) -> bool:
-        if self.fp is not None:
-            self.fp.close()
-
-        return False
 
+class DXArchive(DXArchiveBase):
     def loadArchive(
         self,
         archivePath: Path,
         outputPath: Path = Path("."),
         keyString_: bytearray = None,
-    ):
+        patterns: list = None,
+        predicate=None,
+    ) -> bool:
         self.fp = open(archivePath, mode="rb")
         self.outputPath = outputPath
-        self.directory = self.outputPath
+        # Kept so worker processes can load the archive again
+        self.archivePath = archivePath
+        self.keyString_ = keyString_
 
         key = bytearray([0] * DXA_KEY_BYTES)
         keyString = bytearray([0] * (DXA_KEY_STRING_LENGTH + 1))
@@ -267,8 +214,6 @@ class DXArchive:
         if self.archiveHead.version > DXA_VER or self.archiveHead.version < DXA_VER_MIN:
             return self.error()
 
-        headBuffer = [0] * self.archiveHead.headSize
-
         self.noKey = (self.archiveHead.flags & DXA_FLAG_NO_KEY) != 0
 
         if self.archiveHead.headSize is None or self.archiveHead.headSize == 0:
@@ -277,7 +222,13 @@ class DXArchive:
         if (self.archiveHead.flags & DXA_FLAG_NO_HEAD_PRESS) != 0:
             # 圧縮されていない場合は普通に読み込む
             self.fp.seek(self.archiveHead.fileNameTableStartAddress, SEEK_SET)
-            headBuffer = self.keyConvFileRead(self.archiveHead.headSize, 0)
+            headBuffer = self.keyConvFileRead(
+                None,
+                self.archiveHead.headSize,
+                self.fp,
+                None if self.noKey else key,
+                0,
+            )
         else:
             # 圧縮されたヘッダの容量を取得する
             self.fp.seek(0, SEEK_END)
@@ -288,40 +239,30 @@ class DXArchive:
             if huffHeadSize is None or huffHeadSize <= 0:
                 return self.error()
 
-            huffHeadBuffer = bytearray([0] * huffHeadSize)
-
             # ハフマン圧縮されたヘッダをメモリに読み込む
             huffHeadBuffer = self.keyConvFileRead(
-                huffHeadBuffer, huffHeadSize, None if self.noKey else key, 0
+                None, huffHeadSize, self.fp, None if self.noKey else key, 0
             )
 
-            # ハフマン圧縮されたヘッダの解凍後の容量を取得する
-            lzHeadSize = huffman_Decode(huffHeadBuffer, None)
+            # ハフマン圧縮されたヘッダを解凍する
+            # (the Huffman header is parsed once, huffman_Decode sizes the buffer)
+            (lzHeadBuffer, lzHeadSize) = huffman_Decode(huffHeadBuffer, bytearray())
 
             if lzHeadSize is None or lzHeadSize <= 0:
                 return self.error()
 
-            lzHeadBuffer = bytearray([0] * lzHeadSize)
-
-            # ハフマン圧縮されたヘッダを解凍する
-            (lzHeadBuffer, originalSize) = huffman_Decode(huffHeadBuffer, lzHeadBuffer)
-
             # LZ圧縮されたヘッダを解凍する
-            (headBuffer, size) = self.decode(lzHeadBuffer, bytearray(headBuffer))
-
-            self.nameTable = headBuffer[: self.archiveHead.fileTableStartAddress]
-            self.fileTable = headBuffer[
-                self.archiveHead.fileTableStartAddress : self.archiveHead.directoryTableStartAddress
-            ]
-            self.directoryTable = headBuffer[
-                self.archiveHead.directoryTableStartAddress :
-            ]
-
-            self.directoryDecode(
-                DARC_DIRECTORY(self.directoryTable), key, keyString, keyStringBytes
+            (headBuffer, size) = self.decode(
+                lzHeadBuffer, bytearray(self.archiveHead.headSize)
             )
 
-            return True
+        # Kept to derive the per file keys of entries listed later on
+        self.key = key
+        self.keyString = keyString
+        self.keyStringBytes = keyStringBytes
+
+        encoding = getEncoding(self.archiveHead.charCodeFormat)
+        return self.loadTables(headBuffer, encoding, patterns, predicate)
 
     def keyCreate(self, source: bytearray, sourceBytes: int, key: bytearray):
         workBuffer = bytearray([0] * 1024)
@@ -394,26 +335,56 @@ class DXArchive:
         return CRC ^ 0xFFFFFFFF
 
     def keyConvFileRead(
-        self, data: bytearray, size: int, key: bytearray, position: int
+        self,
+        data: bytearray,
+        size: int,
+        fp: TextIOWrapper,
+        key: bytearray,
+        position: int = -1,
+        record: FileRecord = None,
+        pool=None,
     ) -> bytearray:
+        """
+        Read and decrypt size bytes. With pool, they're read into a buffer
+        from it, which can be longer than size.
+        """
+        if fp is None:
+            fp = self.fp
+
         pos = 0
 
         if key is not None:
             # ファイルの位置を取得しておく
             if position == -1:
-                pos = self.fp.tell()
+                pos = fp.tell()
             else:
                 pos = position
 
+        if record is not None:
+            start = perf_counter()
+
         # 読み込む
-        data = bytearray(
-            self.fp.read(size)
-        )  # For assignment in keyConv data[i] ^= key[j]
+        if pool is None:
+            data = bytearray(
+                fp.read(size)
+            )  # For assignment in keyConv data[i] ^= key[j]
+        else:
+            data = readInto(fp, pool, size)
+
+        if record is not None:
+            record.stage("read", start)
+            record.bytesIn += min(len(data), size)
 
         if key is not None:
+            if record is not None:
+                start = perf_counter()
+
             # データを鍵文字列を使って Xor 演算
             data = self.keyConv(data, size, pos, key)
 
+            if record is not None:
+                record.stage("keyConv", start)
+
         return data
 
     def keyConv(
@@ -441,176 +412,58 @@ class DXArchive:
 
         return data
 
-    def decode(self, src, dest) -> tuple:
-        srcp = src
-
-        destsize = struct.unpack("I", srcp[0:4])[0]
-        srcsize = struct.unpack("I", srcp[4:8])[0] - 9
-
-        keycode = srcp[8]
-
-        if dest is None:
-            return destsize
-
-        sp = srcp[9:]
-
-        tda = bytearray([0] * destsize)
-        tdac = 0
-
-        while srcsize > 0:
-            if sp[0] != keycode:
-                tda[tdac] = sp[0]
-                tdac += 1
-                sp = sp[1:]
-                srcsize -= 1
-                continue
-
-            if sp[1] == keycode:
-                tda[tdac] = keycode % 256
-                tdac += 1
-                sp = sp[2:]
-                srcsize -= 2
-                continue
-
-            code = sp[1]
-
-            if code > keycode:
-                code -= 1
-
-            sp = sp[2:]
-            srcsize -= 2
-
-            conbo = code >> 3
-            if code & (0x1 << 2):
-                conbo |= sp[0] << 5
-                sp = sp[1:]
-                srcsize -= 1
-
-            conbo += self.MIN_COMPRESS
-
-            indexsize = code & 0x3
-            if indexsize == 0:
-                index = sp[0]
-                sp = sp[1:]
-                srcsize -= 1
-            elif indexsize == 1:
-                index = struct.unpack("H", sp[0:2])[0]
-                sp = sp[2:]
-                srcsize -= 2
-            elif indexsize == 2:
-                index = struct.unpack("H", sp[0:2])[0] | (sp[2] << 16)
-                sp = sp[3:]
-                srcsize -= 3
-
-            index += 1
-
-            if index < conbo:
-                num = index
-                while conbo > num:
-                    copied_bytes = tda[tdac - num : tdac - num + num]
-                    tda[tdac : tdac + num] = copied_bytes
-                    tdac += num
-                    conbo -= num
-                    num += num
-                if conbo != 0:
-                    copied_bytes = tda[tdac - num : tdac - num + conbo]
-                    tda[tdac : tdac + conbo] = copied_bytes
-                    tdac += conbo
-            else:
-                copied_bytes = tda[tdac - index : tdac - index + conbo]
-                tda[tdac : tdac + conbo] = copied_bytes
-                tdac += conbo
+    def getDirectory(self, address: int) -> DARC_DIRECTORY:
+        return DARC_DIRECTORY(self.directoryTable[address:])
 
-        return (tda, destsize)
+    def getFileHeads(self, directory: DARC_DIRECTORY) -> list:
+        fileHeadSize = len(DARC_FILEHEAD())
+        return [
+            DARC_FILEHEAD(
+                self.fileTable[directory.fileHeadAddress + fileHeadSize * i :]
+            )
+            for i in range(directory.fileHeadNum)
+        ]
 
-    def directoryDecode(
+    def fillArchivedFile(
         self,
-        directoryInfo: DARC_DIRECTORY,
-        key: bytearray,
-        keyString: str,
-        keyStringBytes: int,
+        archivedFile: ArchivedFile,
+        directory: DARC_DIRECTORY,
+        fileHead: DARC_FILEHEAD,
     ) -> None:
-        """
-        Recursively get all directory information from directoryTable:
-            Directory Name
-            Information about files inside directory (actual files and other directories)
-        """
+        archivedFile.compressed = fileHead.pressDataSize != 0xFFFFFFFFFFFFFFFF
+        archivedFile.huffmanCompressed = (
+            fileHead.huffPressDataSize != 0xFFFFFFFFFFFFFFFF
+        )
+        archivedFile.huffPressDataSize = fileHead.huffPressDataSize
+        archivedFile.key = None
 
-        # Save current directory
-        old_directory = self.directory
+        # ファイル個別の鍵を作成
+        if not self.noKey:
+            keyStringBuffer = self.createKeyFileString(
+                self.keyString, self.keyStringBytes, directory, fileHead
+            )
+            keyStringBufferBytes = len(keyStringBuffer)
+            lKey = self.keyCreate(
+                keyStringBuffer,
+                keyStringBufferBytes,
+                bytearray([0] * DXA_KEY_BYTES),
+            )
+            archivedFile.key = lKey
 
+    def getStoredSize(self, archivedFile: ArchivedFile) -> int:
+        """Bytes archivedFile takes in the archive, see huffmanDecodeFile for the layout"""
+        streamSize = super().getStoredSize(archivedFile)
+        if not archivedFile.huffmanCompressed:
+            return streamSize
+
+        huffmanEncodeSize = self.archiveHead.huffmanEncodeKB * 1024
         if (
-            directoryInfo.directoryAddress != 0xFFFFFFFFFFFFFFFF
-            and directoryInfo.parentDirectoryAddress != 0xFFFFFFFFFFFFFFFF
+            self.archiveHead.huffmanEncodeKB != 0xFF
+            and streamSize > huffmanEncodeSize * 2
         ):
-            dirFile = DARC_FILEHEAD(self.fileTable[directoryInfo.directoryAddress :])
-            pName = self.getOriginalFileName(self.nameTable[dirFile.nameAddress :])
-            self.directory = self.directory / pName
-
-        # Get info about file sinside this directory
-        for i in range(directoryInfo.fileHeadNum):
-            offset = len(DARC_FILEHEAD()) * i
-            fileInfo = DARC_FILEHEAD(
-                self.fileTable[directoryInfo.fileHeadAddress + offset :]
-            )
+            return archivedFile.huffPressDataSize + streamSize - huffmanEncodeSize * 2
 
-            # Is the file another directory?
-            if fileInfo.attributes & FILE_ATTRIBUTE_DIRECTORY:
-                # Get that info too
-                self.directoryDecode(
-                    DARC_DIRECTORY(self.directoryTable[fileInfo.dataAddress :]),
-                    key,
-                    keyString,
-                    keyStringBytes,
-                )
-            else:
-                # It's an actual file
-                pName = self.getOriginalFileName(self.nameTable[fileInfo.nameAddress :])
-                filePath = self.directory / pName
-
-                archivedFile = ArchivedFile()
-                archivedFile.filePath = filePath
-                archivedFile.compressed = fileInfo.pressDataSize != 0xFFFFFFFFFFFFFFFF
-                archivedFile.huffmanCompressed = (
-                    fileInfo.huffPressDataSize != 0xFFFFFFFFFFFFFFFF
-                )
-                archivedFile.key = None
-                archivedFile.dataStart = (
-                    self.archiveHead.dataStartAddress + fileInfo.dataAddress
-                )
-                archivedFile.dataSize = fileInfo.dataSize
-                archivedFile.pressDataSize = fileInfo.pressDataSize
-                archivedFile.huffPressDataSize = fileInfo.huffPressDataSize
-
-                # ファイル個別の鍵を作成
-                if not self.noKey:
-                    keyStringBuffer = self.createKeyFileString(
-                        keyString, keyStringBytes, directoryInfo, fileInfo
-                    )
-                    keyStringBufferBytes = len(keyStringBuffer)
-                    lKey = self.keyCreate(
-                        keyStringBuffer,
-                        keyStringBufferBytes,
-                        bytearray([0] * DXA_KEY_BYTES),
-                    )
-                    archivedFile.key = lKey
-
-                self.archivedFiles.append(archivedFile)
-
-            if i == directoryInfo.fileHeadNum - 1:
-                break
-
-        # Like going one directory up ../
-        self.directory = old_directory
-
-    def getOriginalFileName(self, fileNameTable) -> Path:
-        filename_start_pos = fileNameTable[0] * 4 + 4
-        null_pos = fileNameTable[filename_start_pos:].find(0x0)
-        pName = fileNameTable[filename_start_pos : filename_start_pos + null_pos]
-        try:
-            return Path(pName.decode("utf8"))
-        except UnicodeDecodeError:
-            return Path(pName.decode("cp932"))  # For Japanese characters
+        return archivedFile.huffPressDataSize
 
     def createKeyFileString(
         self,
@@ -639,20 +492,18 @@ class DXArchive:
             b"00000000"
         )
 
-        src = self.nameTable[fileHead.nameAddress + 4 :]
         amount = (DXA_KEY_STRING_MAXLENGTH - 8) - og_startAddr
-        end_string = min(src.find(0x0), amount - 1)
-        copied = src[:end_string]
+        copied = readString(self.nameTable, fileHead.nameAddress + 4, amount - 1)
         fileString[startAddr : startAddr + len(copied)] = copied
         startAddr = startAddr + len(copied)
 
         if directory.parentDirectoryAddress != 0xFFFFFFFFFFFFFFFF:
             while True:
                 fileHead = DARC_FILEHEAD(self.fileTable[directory.directoryAddress :])
-                src = self.nameTable[fileHead.nameAddress + 4 :]
                 amount = (DXA_KEY_STRING_MAXLENGTH - 8) - og_startAddr
-                end_string = min(src.find(0x0), amount - 1)
-                copied = src[:end_string]
+                copied = readString(
+                    self.nameTable, fileHead.nameAddress + 4, amount - 1
+                )
                 fileString[startAddr : startAddr + len(copied)] = copied
                 startAddr = startAddr + len(copied)
                 directory = DARC_DIRECTORY(
@@ -664,162 +515,180 @@ class DXArchive:
         new_key = fileString[:startAddr]
         return new_key
 
-    def extractAll(self) -> None:
-        for archivedFile in self.archivedFiles:
-            self.extractFile(archivedFile)
+    def decodeFile(
+        self,
+        archivedFile: ArchivedFile,
+        write,
+        record: FileRecord = None,
+        check: bool = False,
+        fp=None,
+        pool=None,
+    ) -> None:
+        """Huffman compressed files are decoded by huffmanDecodeFile"""
+        if not archivedFile.huffmanCompressed:
+            return super().decodeFile(archivedFile, write, record, check, fp, pool)
 
-    def extractFile(self, archivedFile: ArchivedFile) -> None:
-        if not archivedFile.filePath.parent.exists():
-            archivedFile.filePath.parent.mkdir(parents=True)
+        if archivedFile.dataSize == 0:
+            return
 
-        destP = open(archivedFile.filePath, mode="wb")
+        if fp is None:
+            fp = self.fp
 
-        if archivedFile.dataSize != 0:
-            outputSize = archivedFile.dataSize
+        if fp.tell() != archivedFile.dataStart:
+            fp.seek(archivedFile.dataStart, SEEK_SET)
 
-            if self.fp.tell() != archivedFile.dataStart:
-                self.fp.seek(archivedFile.dataStart, SEEK_SET)
+        self.huffmanDecodeFile(archivedFile, write, record, check, fp, pool)
 
-            if archivedFile.compressed:
-                outputSize += archivedFile.pressDataSize
+    def getStreamPrefix(
+        self, archivedFile: ArchivedFile, length: int
+    ) -> bytearray | None:
+        if archivedFile.huffmanCompressed:
+            return self.getHuffmanStreamPrefix(archivedFile, length)
+        return super().getStreamPrefix(archivedFile, length)
 
-            if archivedFile.huffmanCompressed:
-                outputSize += archivedFile.huffPressDataSize
+    def getHuffmanStreamPrefix(
+        self, archivedFile: ArchivedFile, length: int
+    ) -> bytearray | None:
+        """
+        First length bytes of the stream of a Huffman compressed file (see
+        huffmanDecodeFile), None if it reaches into the Huffman coded tail
+        """
+        huffmanEncodeSize = self.archiveHead.huffmanEncodeKB * 1024
+        streamSize = (
+            archivedFile.pressDataSize
+            if archivedFile.compressed
+            else archivedFile.dataSize
+        )
+        partial = (
+            self.archiveHead.huffmanEncodeKB != 0xFF
+            and streamSize > huffmanEncodeSize * 2
+        )
+        length = min(length, streamSize)
 
-            output = bytearray([0] * (outputSize))
+        self.fp.seek(archivedFile.dataStart, SEEK_SET)
+        huffData = self.readStored(archivedFile, archivedFile.huffPressDataSize)
 
-            # If there's huffman compression
-            if archivedFile.huffmanCompressed:
-                keyConvFileReadSize = (
-                    archivedFile.pressDataSize
-                    if archivedFile.compressed
-                    else archivedFile.dataSize
-                )
+        head = min(length, huffmanEncodeSize) if partial else length
+        (stream, _) = huffman_Decode(huffData, bytearray(head), head)
 
-                read = self.keyConvFileRead(
-                    output,
-                    archivedFile.huffPressDataSize,
-                    archivedFile.key,
-                    archivedFile.dataSize,
-                )
-                output[: len(read)] = read
+        if not partial or length <= huffmanEncodeSize:
+            return stream[:length]
 
-                (decoded, _) = huffman_Decode(
-                    output, output[archivedFile.huffPressDataSize :]
-                )
-                output[archivedFile.huffPressDataSize :] = decoded
-
-                if (
-                    self.archiveHead.huffmanEncodeKB != 0xFF
-                    and keyConvFileReadSize
-                    > self.archiveHead.huffmanEncodeKB * 1024 * 2
-                ):
-                    amount_to_move = self.archiveHead.huffmanEncodeKB * 1024
-                    start_dest = (
-                        archivedFile.huffPressDataSize
-                        + keyConvFileReadSize
-                        - self.archiveHead.huffmanEncodeKB * 1024
-                    )
-                    start_src = (
-                        archivedFile.huffPressDataSize
-                        + self.archiveHead.huffmanEncodeKB * 1024
-                    )
-                    moved_bytes = output[start_src : start_src + amount_to_move]
-                    output[start_dest : start_dest + amount_to_move] = moved_bytes
-
-                    data = self.keyConvFileRead(
-                        output[
-                            archivedFile.huffPressDataSize
-                            + self.archiveHead.huffmanEncodeKB * 1024 :
-                        ],
-                        keyConvFileReadSize
-                        - self.archiveHead.huffmanEncodeKB * 1024 * 2,
-                        archivedFile.key,
-                        archivedFile.dataSize + archivedFile.huffPressDataSize,
-                    )
-                    output[
-                        archivedFile.huffPressDataSize
-                        + self.archiveHead.huffmanEncodeKB * 1024 : len(data)
-                    ] = data
-
-                if archivedFile.compressed:
-                    (decoded, _) = self.decode(
-                        output[archivedFile.huffPressDataSize :],
-                        output[
-                            archivedFile.huffPressDataSize
-                            + archivedFile.pressDataSize :
-                        ],
-                    )
-
-                    output[
-                        archivedFile.huffPressDataSize + archivedFile.pressDataSize :
-                    ] = decoded
-                    destP.write(
-                        output[
-                            archivedFile.huffPressDataSize
-                            + archivedFile.pressDataSize : archivedFile.huffPressDataSize
-                            + archivedFile.pressDataSize
-                            + archivedFile.dataSize
-                        ]
-                    )
-                else:
-                    destP.write(
-                        output[
-                            archivedFile.huffPressDataSize : archivedFile.huffPressDataSize
-                            + archivedFile.dataSize
-                        ]
-                    )
+        # The middle isn't Huffman coded and follows the Huffman data
+        if length > streamSize - huffmanEncodeSize:
+            return None
 
-            else:
-                # There's no huffman compression, check for regular compression
-                if archivedFile.compressed:
-                    read = self.keyConvFileRead(
-                        output,
-                        archivedFile.pressDataSize,
-                        archivedFile.key,
-                        archivedFile.dataSize,
-                    )
-                    output[: len(read)] = read
-
-                    (decoded, _) = self.decode(
-                        output, output[archivedFile.pressDataSize :]
-                    )
-                    output[archivedFile.pressDataSize :] = decoded
-
-                    destP.write(
-                        output[
-                            archivedFile.pressDataSize : archivedFile.pressDataSize
-                            + archivedFile.dataSize
-                        ]
-                    )
-                else:
-                    writeSize = 0
-                    while writeSize < archivedFile.dataSize:
-                        if archivedFile.dataSize - writeSize > DXA_BUFFERSIZE:
-                            moveSize = DXA_BUFFERSIZE
-                        else:
-                            moveSize = archivedFile.dataSize - writeSize
-
-                        read = self.keyConvFileRead(
-                            output,
-                            moveSize,
-                            archivedFile.key,
-                            archivedFile.dataSize + writeSize,
-                        )
-                        output[: len(read)] = read
-
-                        destP.write(output[:moveSize])
-
-                        writeSize += moveSize
-
-        destP.close()
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc_value, exc_traceback):
-        if not self.fp.closed:
-            self.fp.close()
+        stream = stream[:huffmanEncodeSize]
+        stream += self.readStored(
+            archivedFile, length - huffmanEncodeSize, archivedFile.huffPressDataSize
+        )
+        return stream
+
+    def huffmanDecodeFile(
+        self,
+        archivedFile: ArchivedFile,
+        write,
+        record: FileRecord = None,
+        check: bool = False,
+        fp=None,
+        pool=None,
+    ) -> None:
+        """
+        Huffman compressed files are stored as:
+            Huffman data of the whole stream (LZ data if compressed, file data otherwise)
+        or, if the stream is longer than huffmanEncodeKB * 2 KB:
+            Huffman data of the first and last huffmanEncodeKB KB of the stream
+            The rest of the stream, only encrypted
+        """
+        huffmanEncodeSize = self.archiveHead.huffmanEncodeKB * 1024
+        streamSize = (
+            archivedFile.pressDataSize
+            if archivedFile.compressed
+            else archivedFile.dataSize
+        )
+        partial = (
+            self.archiveHead.huffmanEncodeKB != 0xFF
+            and streamSize > huffmanEncodeSize * 2
+        )
+
+        huffData = self.readStored(
+            archivedFile, archivedFile.huffPressDataSize, 0, record, fp, self.pool
+        )
+
+        if record is not None:
+            start = perf_counter()
+
+        huffSize = huffmanEncodeSize * 2 if partial else streamSize
+        if check and len(huffData) < archivedFile.huffPressDataSize:
+            raise ValueError(
+                f"Huffman data is {len(huffData)} bytes, "
+                f"file table says {archivedFile.huffPressDataSize}"
+            )
+
+        # Decoded straight into the output when there's nothing else to do
+        if partial or archivedFile.compressed:
+            huffDecoded = self.pool.take(huffSize)
+        else:
+            huffDecoded = takeOutput(pool, huffSize)
+        (huffDecoded, originalSize) = huffman_Decode(huffData, huffDecoded)
+        self.pool.give(huffData)
+        if originalSize < huffSize:
+            # Like decode, a reused buffer doesn't pass on what it held
+            huffDecoded[originalSize:huffSize] = bytes(huffSize - originalSize)
+
+        if check and originalSize != huffSize:
+            raise ValueError(
+                f"Huffman header size is {originalSize}, expected {huffSize}"
+            )
+
+        if record is not None:
+            record.stage("huffman", start)
+
+        if not partial:
+            stream = huffDecoded
+        elif not archivedFile.compressed:
+            # Nothing else to decode, the middle goes straight to the output
+            # (head and tail are copied, huffDecoded goes back to the pool)
+            write(huffDecoded[:huffmanEncodeSize])
+            self.streamStored(
+                archivedFile,
+                streamSize - huffmanEncodeSize * 2,
+                archivedFile.huffPressDataSize,
+                write,
+                record,
+                fp,
+                pool,
+            )
+            write(huffDecoded[huffmanEncodeSize:huffSize])
+            self.pool.give(huffDecoded)
+            return
+        else:
+            # The LZ decoder needs the whole stream: head + middle + tail
+            stream = self.pool.take(streamSize)
+            stream[:huffmanEncodeSize] = memoryview(huffDecoded)[:huffmanEncodeSize]
+            stream[streamSize - huffmanEncodeSize : streamSize] = memoryview(
+                huffDecoded
+            )[huffmanEncodeSize:huffSize]
+            self.pool.give(huffDecoded)
+
+            self.streamStored(
+                archivedFile,
+                streamSize - huffmanEncodeSize * 2,
+                archivedFile.huffPressDataSize,
+                MiddleWriter(stream, huffmanEncodeSize, self.pool),
+                record,
+                fp,
+                self.pool,
+            )
+
+        if archivedFile.compressed:
+            self.decodeStream(archivedFile, stream, write, record, check, pool)
+        else:
+            write(getOutput(stream, streamSize))
+
+    def getKeyPhase(self, archivedFile: ArchivedFile) -> int:
+        """Position in the key the data of archivedFile starts being XORed at"""
+        return archivedFile.dataSize % DXA_KEY_BYTES
 
 
 def main() -> None:
@@ -828,41 +697,6 @@ def main() -> None:
     archivePath_v8 = Path("./test_wolf/version_2264.wolf")
     archivePath_v8 = Path("./test_wolf/version_2271.wolf")
     archivePath_v8 = Path("./test_wolf/version_2281.wolf")
-    key_2_25_2_81 = bytearray(
-        [
-            57,
-            0x4C,
-            0x46,
-            0x52,
-            0x50,
-            0x72,
-            0x4F,
-            0x21,
-            0x70,
-            0x28,
-            0x3B,
-            0x73,
-            0x35,
-            0x28,
-            0x28,
-            0x38,
-            0x50,
-            0x40,
-            0x28,
-            0x28,
-            0x55,
-            0x46,
-            0x57,
-            0x6C,
-            0x75,
-            0x24,
-            0x23,
-            0x35,
-            0x28,
-            0x3D,
-        ]
-    )
-    key_2_25_2_81 = bytearray(b"WLFRPrO!p(;s5((8P@((UFWlu$#5(=")
 
     # Setup
     archivePath = archivePath_v8
@@ -871,14 +705,12 @@ def main() -> None:
 
     with DXArchive() as decompiler:
         if decompiler.loadArchive(
-            archivePath=archivePath, outputPath=outputPath, keyString_=keyString_
+            archivePath=archivePath,
+            outputPath=outputPath,
+            keyString_=keyString_,
+            patterns=["Game.dat", "*.png", "*.jpg", "*.ogg", "*.mp3"],
         ):
-            for archivedFile in decompiler.archivedFiles:
-                if (
-                    archivedFile.filePath.name == "Game.dat"
-                    or archivedFile.filePath.suffix in [".png", ".jpg", ".ogg", ".mp3"]
-                ):
-                    decompiler.extractFile(archivedFile)
+            decompiler.extractAll()
 
 
 if __name__ == "__main__":
@@ -1,13 +1,34 @@
 from io import SEEK_SET, TextIOWrapper
 from pathlib import Path
-from stat import FILE_ATTRIBUTE_DIRECTORY
 import struct
-import array
+
+try:
+    from .archivebase import (
+        ArchivedFile,
+        DARC_FILETIME,
+        DXArchiveBase,
+    )
+    from .stats import FileRecord
+    from .nametable import getEncoding
+    from .keyrecovery import VER5_LAYOUT, KeyCache, recoverKey
+    from .bufferpool import readInto
+    from .keys import key_2_10
+except ImportError:
+    from archivebase import (
+        ArchivedFile,
+        DARC_FILETIME,
+        DXArchiveBase,
+    )
+    from stats import FileRecord
+    from nametable import getEncoding
+    from keyrecovery import VER5_LAYOUT, KeyCache, recoverKey
+    from bufferpool import readInto
+    from keys import key_2_10
+from time import perf_counter
 
 
 DXA_HEAD = struct.unpack("H", b"DX")[0]  # Header
 DXA_VER = 0x0005  # Version
-DXA_BUFFERSIZE = 0x1000000  # Size of the buffer used when creating the archive
 DXA_KEY_STRING_LENGTH = 12  # Length of key string
 
 # Default key string
@@ -62,29 +83,6 @@ Head->charCodeFormat = {self.charCodeFormat}
 """
 
 
-# Time information of the file
-class DARC_FILETIME:
-    create = None  # Creation time
-    lastAccess = None  # Last access time
-    lastWrite = None  # Last update time
-
-    def __init__(self, fileTime_bytes=None):
-        if fileTime_bytes is None:
-            return
-        unpacked = struct.unpack("QQQ", fileTime_bytes[: len(self)])
-        self.create = unpacked[0]
-        self.lastAccess = unpacked[1]
-        self.lastWrite = unpacked[2]
-
-    def __len__(self) -> int:
-        return struct.calcsize("QQQ")
-
-    def __repr__(self) -> str:
-        return f"""\tTime->create = {self.create}
-\tTime->lastAccess = {self.lastAccess}
-\tTime->lastWrite = {self.lastWrite}"""
-
-
 # File storage information
 class DARC_FILEHEAD:
     nameAddress = None  # Address where the file name is stored (the address of the member variable FileNameTableStartAddress of the ARCHIVE_HEAD structure is set to address 0)
@@ -112,7 +110,7 @@ class DARC_FILEHEAD:
         self.time.lastWrite = unpacked[4]
         self.dataAddress = unpacked[5]
         self.dataSize = unpacked[6]
-        if self.version == 5:
+        if self.version > 2:
             self.pressDataSize = unpacked[7]
 
     def __len__(self) -> int:
@@ -132,7 +130,7 @@ File->dataAddress = {self.dataAddress}
 File->dataSize = {self.dataSize}
 """
             + f"File->pressDataSize = {self.pressDataSize}"
-            if self.version == 5
+            if self.version > 2
             else ""
         )
 
@@ -165,56 +163,22 @@ self.fileHeadAddress = {self.fileHeadAddress}
 """
 
 
-# Information for storing the progress of the encoding process
-class DARC_ENCODEINFO:
-    totalFileNum = None  # Total number of files
-    compFileNum = None  # Number of files processed.
-    prevDispTime = None  # Time of the last status output
-    processFileName = None  # Name of the file currently being processed
-    outputStatus = None  # Whether status output is performed or not
-
-    def __repr__(self) -> str:
-        return f"""
-self.totalFileNum = {self.totalFileNum}
-self.compFileNum = {self.compFileNum}
-self.prevDispTime = {self.prevDispTime}
-self.processFileName = {self.processFileName}
-self.outputStatus = {self.outputStatus}
-"""
-
-
-class DXArchive:
-    MIN_COMPRESS = 4  # Minimum number of compressed bytes
-    MAX_SEARCHLISTNUM = (
-        64  # Maximum number of lists to traverse to find the maximum match length
-    )
-    MAX_SUBLISTNUM = 65536  # Maximum number of sublists to reduce compression time
-    MAX_COPYSIZE = (
-        0x1FFF + MIN_COMPRESS
-    )  # Maximum size to copy from a reference address ( Maximum copy size that a compression code can represent + Minimum number of compressed bytes )
-    MAX_ADDRESSLISTNUM = 1024 * 1024 * 1  # Maximum size of slide dictionary
-    MAX_POSITION = 1 << 24  # Maximum relative address that can be referenced ( 16MB )
-
-    def __init__(self) -> None:
-        pass
-
-    def error(self) -> bool:
-        if self.fp is not None:
-            self.fp.close()
+class DXArchive(DXArchiveBase):
+    keyLayout = VER5_LAYOUT  # What recoverKey knows of the header
 
-        return False
-
-    def decodeArchive(
+    def loadArchive(
         self,
         archivePath: Path,
         outputPath: Path = Path("."),
-        only_game_dat: bool = False,
         keyString_: bytearray = None,
-    ):
+        patterns: list = None,
+        predicate=None,
+    ) -> bool:
         self.fp = open(archivePath, mode="rb")
         self.outputPath = outputPath
-        self.directory = self.outputPath
-        self.only_game_dat = only_game_dat
+        # Kept so worker processes can load the archive again
+        self.archivePath = archivePath
+        self.keyString_ = keyString_
 
         key = bytearray([0] * DXA_KEY_STRING_LENGTH)
 
@@ -237,8 +201,6 @@ class DXArchive:
         if head.version > DXA_VER:
             return self.error()
 
-        headBuffer = array.array("B", [0] * head.headSize)
-
         if head.headSize is None or head.headSize == 0:
             return self.error()
 
@@ -246,20 +208,46 @@ class DXArchive:
 
         # Unnecessary as it's been checked on L230 / It's on DXArchiveVer5.cpp so whatever
         if head.version >= DXA_VER:
-            headBuffer = self.keyConvFileRead(
-                headBuffer, head.headSize, self.fp, key, 0
-            )
+            headBuffer = self.keyConvFileRead(None, head.headSize, self.fp, key, 0)
         else:
-            headBuffer = self.keyConvFileRead(headBuffer, head.headSize, self.fp, key)
+            headBuffer = self.keyConvFileRead(None, head.headSize, self.fp, key)
+
+        self.archiveHead = head
+        self.key = key
+
+        # Older headers end before charCodeFormat, what's read there is file data
+        encoding = None
+        if head.dataStartAddress >= len(DARC_HEAD()):
+            encoding = getEncoding(head.charCodeFormat)
 
-        nameP = headBuffer
-        fileP = nameP[head.fileTableStartAddress :]
-        dirP = nameP[head.directoryTableStartAddress :]
-        self.directoryDecode(
-            nameP, dirP, fileP, head, DARC_DIRECTORY(dirP), self.fp, key
+        return self.loadTables(headBuffer, encoding, patterns, predicate)
+
+    def getDirectory(self, address: int) -> DARC_DIRECTORY:
+        return DARC_DIRECTORY(self.directoryTable[address:])
+
+    def getFileHeads(self, directory: DARC_DIRECTORY) -> list:
+        version = self.archiveHead.version
+        fileHeadSize = len(DARC_FILEHEAD(version=version))
+        return [
+            DARC_FILEHEAD(
+                self.fileTable[directory.fileHeadAddress + fileHeadSize * i :],
+                version=version,
+            )
+            for i in range(directory.fileHeadNum)
+        ]
+
+    def fillArchivedFile(
+        self,
+        archivedFile: ArchivedFile,
+        directory: DARC_DIRECTORY,
+        fileHead: DARC_FILEHEAD,
+    ) -> None:
+        archivedFile.compressed = (
+            self.archiveHead.version >= 2 and fileHead.pressDataSize != 0xFFFFFFFF
         )
-        self.fp.close()
-        return True
+        archivedFile.huffmanCompressed = False
+        archivedFile.key = self.key
+        archivedFile.huffPressDataSize = 0xFFFFFFFF
 
     def keyCreate(self, source: bytearray, key: bytearray):
         key_length = len(key)
@@ -286,6 +274,14 @@ class DXArchive:
 
         return key
 
+    def recoverKey(self, archivePath: Path, cache: KeyCache = None) -> bytearray | None:
+        """
+        Key string of an archive made with an unknown key, found from what's
+        known of its header and tables (see keyrecovery.recoverKey), None if
+        there's no convincing one. Pass it to loadArchive as keyString_.
+        """
+        return recoverKey(self, archivePath, self.keyLayout, cache)
+
     def keyConvFileRead(
         self,
         data: bytearray,
@@ -293,7 +289,13 @@ class DXArchive:
         fp: TextIOWrapper,
         key: bytearray,
         position: int = -1,
+        record: FileRecord = None,
+        pool=None,
     ) -> bytearray:
+        """
+        Read and decrypt size bytes. With pool, they're read into a buffer
+        from it, which can be longer than size.
+        """
         pos = 0
 
         # ファイルの位置を取得しておく
@@ -302,11 +304,25 @@ class DXArchive:
         else:
             pos = position
 
+        if record is not None:
+            start = perf_counter()
+
         # 読み込む
-        data = bytearray(fp.read(size))  # For assignment in keyConv data[i] ^= key[j]
+        if pool is None:
+            data = bytearray(fp.read(size))  # For assignment in keyConv data[i] ^= key[j]
+        else:
+            data = readInto(fp, pool, size)
+
+        if record is not None:
+            record.stage("read", start)
+            record.bytesIn += min(len(data), size)
+            start = perf_counter()
 
         data = self.keyConv(data, size, pos, key)
 
+        if record is not None:
+            record.stage("keyConv", start)
+
         return data
 
     def keyConv(
@@ -323,245 +339,12 @@ class DXArchive:
 
         return data
 
-    def decode(self, src, dest) -> tuple:
-        srcp = src
-
-        destsize = struct.unpack("I", srcp[0:4])[0]
-        srcsize = struct.unpack("I", srcp[4:8])[0] - 9
-
-        keycode = srcp[8]
-
-        if dest is None:
-            return destsize
-
-        sp = srcp[9:]
-
-        tda = bytearray([0] * destsize)
-        tdac = 0
-
-        while srcsize > 0:
-            if sp[0] != keycode:
-                tda[tdac] = sp[0]
-                tdac += 1
-                sp = sp[1:]
-                srcsize -= 1
-                continue
-
-            if sp[1] == keycode:
-                tda[tdac] = keycode % 256
-                tdac += 1
-                sp = sp[2:]
-                srcsize -= 2
-                continue
-
-            code = sp[1]
-
-            if code > keycode:
-                code -= 1
-
-            sp = sp[2:]
-            srcsize -= 2
-
-            conbo = code >> 3
-            if code & (0x1 << 2):
-                conbo |= sp[0] << 5
-                sp = sp[1:]
-                srcsize -= 1
-
-            conbo += self.MIN_COMPRESS
-
-            indexsize = code & 0x3
-            if indexsize == 0:
-                index = sp[0]
-                sp = sp[1:]
-                srcsize -= 1
-            elif indexsize == 1:
-                index = struct.unpack("H", sp[0:2])[0]
-                sp = sp[2:]
-                srcsize -= 2
-            elif indexsize == 2:
-                index = struct.unpack("H", sp[0:2])[0] | (sp[2] << 16)
-                sp = sp[3:]
-                srcsize -= 3
-
-            index += 1
-
-            if index < conbo:
-                num = index
-                while conbo > num:
-                    copied_bytes = tda[tdac - num : tdac - num + num]
-                    tda[tdac : tdac + num] = copied_bytes
-                    tdac += num
-                    conbo -= num
-                    num += num
-                if conbo != 0:
-                    copied_bytes = tda[tdac - num : tdac - num + conbo]
-                    tda[tdac : tdac + conbo] = copied_bytes
-                    tdac += conbo
-            else:
-                copied_bytes = tda[tdac - index : tdac - index + conbo]
-                tda[tdac : tdac + conbo] = copied_bytes
-                tdac += conbo
-
-        return (tda, destsize)
-
-    def directoryDecode(
-        self, nameP, dirP, fileP, head: DARC_HEAD, _dir: DARC_DIRECTORY, arcP, key
-    ) -> None:
-        old_directory = self.directory
-
-        if (
-            _dir.directoryAddress != 0xFFFFFFFF
-            and _dir.parentDirectoryAddress != 0xFFFFFFFF
-        ):
-            dirFile = DARC_FILEHEAD(fileP[_dir.directoryAddress :])
-            pName = self.getOriginalFileName(nameP[dirFile.nameAddress :])
-            self.directory = self.directory / pName
-            self.directory.mkdir(parents=True, exist_ok=True)
-
-        fileHeadSize = len(DARC_FILEHEAD(version=head.version))
-        file = DARC_FILEHEAD(fileP[_dir.fileHeadAddress :])
-        last_index = _dir.fileHeadAddress
-        for i in range(_dir.fileHeadNum):
-            if file.attributes & FILE_ATTRIBUTE_DIRECTORY:
-                # ディレクトリの場合は再帰をかける
-                self.directoryDecode(
-                    nameP,
-                    dirP,
-                    fileP,
-                    head,
-                    DARC_DIRECTORY(dirP[file.dataAddress :]),
-                    arcP,
-                    key,
-                )
-                if self.only_game_dat:
-                    if "BasicData" not in str(self.directory):
-                        last_index += fileHeadSize
-                        file = DARC_FILEHEAD(fileP[last_index:])
-                        continue
-            else:
-                # ファイルの場合は展開する
-                # バッファを確保する
-                buffer = bytearray([0] * DXA_BUFFERSIZE)
-                if buffer is None or len(buffer) == 0:
-                    return -1
-
-                # ファイルを開く
-                pName = self.getOriginalFileName(nameP[file.nameAddress :])
-                if self.only_game_dat:
-                    if str(pName) != "Game.dat":
-                        last_index += fileHeadSize
-                        file = DARC_FILEHEAD(fileP[last_index:])
-                        continue
-
-                if not self.directory.exists():
-                    self.directory.mkdir(parents=True)
-                destP = open(self.directory / pName, mode="wb")
-
-                # データがある場合のみ転送
-                if file.dataSize != 0:
-                    # 初期位置をセットする
-                    if arcP.tell() != head.dataStartAddress + file.dataAddress:
-                        arcP.seek(head.dataStartAddress + file.dataAddress, SEEK_SET)
-
-                    if head.version >= 2 and file.pressDataSize != 0xFFFFFFFF:
-                        # 圧縮データが収まるメモリ領域の確保
-                        temp = bytearray([0] * (file.pressDataSize + file.dataSize))
-
-                        if head.version >= 5:
-                            read = self.keyConvFileRead(
-                                temp, file.pressDataSize, arcP, key, file.dataSize
-                            )
-                        else:
-                            read = self.keyConvFileRead(
-                                temp, file.pressDataSize, arcP, key
-                            )
-
-                        temp[: len(read)] = read
-
-                        # 解凍
-                        (decoded, _) = self.decode(temp, temp[file.pressDataSize :])
-                        temp[file.pressDataSize :] = decoded
-
-                        # 書き出し
-                        destP.write(
-                            temp[
-                                file.pressDataSize : file.pressDataSize + file.dataSize
-                            ]
-                        )
-                    else:
-                        # 転送処理開始
-                        writeSize = 0
-                        while writeSize < file.dataSize:
-                            if file.dataSize - writeSize > DXA_BUFFERSIZE:
-                                moveSize = DXA_BUFFERSIZE
-                            else:
-                                moveSize = file.dataSize - writeSize
-
-                            if head.version >= 5:
-                                read = self.keyConvFileRead(
-                                    buffer,
-                                    moveSize,
-                                    arcP,
-                                    key,
-                                    file.dataSize + writeSize,
-                                )
-                            else:
-                                read = self.keyConvFileRead(buffer, moveSize, arcP, key)
-
-                            buffer[: len(read)] = read
-
-                            # 書き出し
-                            destP.write(buffer[:moveSize])
-
-                            writeSize += moveSize
-
-                # ファイルを閉じる
-                destP.close()
-
-                """
-                # This is on the original .cpp file so I copied it too but I'm pretty sure the dates are wrongly parsed
-                # ファイルのタイムスタンプを設定する
-                import win32file, pywintypes
-                
-                pName = self.getOriginalFileName(nameP[file.nameAddress:])
-                
-                hFile = win32file.CreateFileW(str(self.directory / pName),
-                                    win32file.GENERIC_WRITE, 0, None,
-                                    win32file.OPEN_EXISTING, win32file.FILE_ATTRIBUTE_NORMAL, None )
-
-                if hFile == win32file.INVALID_HANDLE_VALUE:
-                    hFile = hFile # ¯\_(ツ)_/¯
-                
-                createTime = pywintypes.Time(file.time.create >> 32)
-                lastAccessTime = pywintypes.Time(file.time.lastAccess >> 32)
-                lastWriteTime = pywintypes.Time(file.time.lastWrite >> 32)
-                
-                win32file.SetFileTime( hFile, createTime, lastAccessTime, lastWriteTime )
-                
-                win32file.CloseHandle(hFile)
-
-                # ファイル属性を付ける
-                win32file.SetFileAttributesW(str(self.directory / pName), file.attributes)
-                """
-
-            if i == _dir.fileHeadNum - 1:
-                break
-            else:
-                last_index += fileHeadSize
-                file = DARC_FILEHEAD(fileP[last_index:])
-                if self.only_game_dat:
-                    return
-        self.directory = old_directory
-
-    def getOriginalFileName(self, fileNameTable) -> Path:
-        filename_start_pos = fileNameTable[0] * 4 + 4
-        null_pos = fileNameTable[filename_start_pos:].find(0x0)
-        pName = fileNameTable[filename_start_pos : filename_start_pos + null_pos]
-        try:
-            return Path(pName.decode("utf8"))
-        except UnicodeDecodeError:
-            return Path(pName.decode("cp932"))
+    def getKeyPhase(self, archivedFile: ArchivedFile) -> int:
+        """Position in the key the data of archivedFile starts being XORed at"""
+        if self.archiveHead.version >= 5:
+            return archivedFile.dataSize % DXA_KEY_STRING_LENGTH
+        # Older versions use the position in the archive
+        return archivedFile.dataStart % DXA_KEY_STRING_LENGTH
 
 
 def main() -> None:
@@ -575,14 +358,7 @@ def main() -> None:
     archivePath_v5 = Path("./test_wolf/version_200.wolf")
     archivePath_v5 = Path("./test_wolf/version_201.wolf")
     archivePath_v5 = Path("./test_wolf/version_202.wolf")
-    key_1_01_2_02 = bytearray(
-        [0x0F, 0x53, 0xE1, 0x3E, 0x04, 0x37, 0x12, 0x17, 0x60, 0x0F, 0x53, 0xE1]
-    )
-
     archivePath_v5 = Path("./test_wolf/version_210.wolf")
-    key_2_10 = bytearray(
-        [0x4C, 0xD9, 0x2A, 0xB7, 0x28, 0x9B, 0xAC, 0x07, 0x3E, 0x77, 0xEC, 0x4C]
-    )
 
     # Setup
     archivePath = archivePath_v5
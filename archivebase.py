@@ -0,0 +1,959 @@
+from io import SEEK_SET
+from pathlib import Path
+from stat import FILE_ATTRIBUTE_DIRECTORY
+import struct
+
+try:
+    from .filters import EntryFilter
+    from .stats import ExtractionStats, FileRecord
+    from .progress import ProgressReporter
+    from .index import ArchiveIndex
+    from .nametable import decodeNameTable, readString
+    from .verify import VerifyReport, verifyArchive
+    from .schedule import adviseGroups, advise, planReads, readGroup
+    from .pipeline import PipelinedExtractor
+    from .threaded import ThreadedExtractor
+    from .journal import ExtractionJournal
+    from .manifest import ExtractionManifest, ManifestDiff
+    from .budget import MemoryBudget
+    from .sink import OutputSink
+    from .store import ContentStore
+    from .convert import convertArchive
+    from .container import exportContainer
+    from .bufferpool import BufferPool, getOutput, takeOutput
+except ImportError:
+    from filters import EntryFilter
+    from stats import ExtractionStats, FileRecord
+    from progress import ProgressReporter
+    from index import ArchiveIndex
+    from nametable import decodeNameTable, readString
+    from verify import VerifyReport, verifyArchive
+    from schedule import adviseGroups, advise, planReads, readGroup
+    from pipeline import PipelinedExtractor
+    from threaded import ThreadedExtractor
+    from journal import ExtractionJournal
+    from manifest import ExtractionManifest, ManifestDiff
+    from budget import MemoryBudget
+    from sink import OutputSink
+    from store import ContentStore
+    from convert import convertArchive
+    from container import exportContainer
+    from bufferpool import BufferPool, getOutput, takeOutput
+from time import perf_counter
+
+
+DXA_BUFFERSIZE = 0x1000000  # Size of the buffer used when creating the archive
+PEEK_STREAM_SIZE = 0x1000  # Compressed bytes first decoded by peek(), grown when it's not enough
+
+
+# Time information of the file
+class DARC_FILETIME:
+    create = None  # Creation time
+    lastAccess = None  # Last access time
+    lastWrite = None  # Last update time
+
+    def __init__(self, fileTime_bytes=None):
+        if fileTime_bytes is None:
+            return
+        unpacked = struct.unpack("QQQ", fileTime_bytes[: len(self)])
+        self.create = unpacked[0]
+        self.lastAccess = unpacked[1]
+        self.lastWrite = unpacked[2]
+
+    def __len__(self) -> int:
+        return struct.calcsize("QQQ")
+
+    def __repr__(self) -> str:
+        return f"""\tTime->create = {self.create}
+\tTime->lastAccess = {self.lastAccess}
+\tTime->lastWrite = {self.lastWrite}"""
+
+
+# Information for storing the progress of the encoding process
+class DARC_ENCODEINFO:
+    totalFileNum = None  # Total number of files
+    compFileNum = None  # Number of files processed.
+    prevDispTime = None  # Time of the last status output
+    processFileName = None  # Name of the file currently being processed
+    outputStatus = None  # Whether status output is performed or not
+    totalBytes = None  # Total size of the files once decoded (not in DXLib)
+    compBytes = None  # Decoded size of the files processed (not in DXLib)
+    startTime = None  # Time the process started (not in DXLib)
+
+    def __repr__(self) -> str:
+        return f"""
+self.totalFileNum = {self.totalFileNum}
+self.compFileNum = {self.compFileNum}
+self.prevDispTime = {self.prevDispTime}
+self.processFileName = {self.processFileName}
+self.outputStatus = {self.outputStatus}
+self.totalBytes = {self.totalBytes}
+self.compBytes = {self.compBytes}
+"""
+
+
+class ArchivedFile:
+    outputPath: Path  # Directory the file is extracted to
+    name: str  # Path inside the archive, "/" separated
+    searchName: bytes  # Uppercased name as stored in the name table, used by find()
+    compressed: bool
+    huffmanCompressed: bool  # Huffman compression was added in Ver0x0008
+    key: bytearray | None
+    dataStart: int
+    dataSize: int
+    pressDataSize: int
+    huffPressDataSize: int
+    storedSize: int  # Bytes taken in the archive
+    time: DARC_FILETIME
+    digests: dict | None = None  # {algorithm: hex digest} when extracted with digests
+
+    _filePath: Path | None = None
+
+    @property
+    def filePath(self) -> Path:
+        """Where the file is extracted to, built on first use"""
+        if self._filePath is None:
+            self._filePath = self.outputPath / self.name
+        return self._filePath
+
+    @filePath.setter
+    def filePath(self, filePath: Path) -> None:
+        self._filePath = filePath
+
+    def __str__(self) -> str:
+        return f"""ArchivedFile(
+\tfilePath: {self.filePath}
+\tname: {self.name}
+\tcompressed: {self.compressed}
+\thuffmanCompressed: {self.huffmanCompressed}
+\tkey: {self.key}
+\tdataStart: {self.dataStart}
+\tdataSize: {self.dataSize}
+\tpressDataSize: {self.pressDataSize}
+\thuffPressDataSize: {self.huffPressDataSize}
+)"""
+
+
+class DXArchiveBase:
+    """
+    What the DXArchive of every archive version shares: listing, looking up,
+    reading and extracting files. Each version implements:
+        loadArchive: decrypt the header and the tables, then loadTables
+        getFileHeads / getDirectory: entries of its file and directory tables
+        fillArchivedFile: the fields of an ArchivedFile that depend on the version
+        keyConvFileRead / getKeyPhase: reading and decrypting data
+    """
+
+    MIN_COMPRESS = 4  # Minimum number of compressed bytes
+    MAX_SEARCHLISTNUM = (
+        64  # Maximum number of lists to traverse to find the maximum match length
+    )
+    MAX_SUBLISTNUM = 65536  # Maximum number of sublists to reduce compression time
+    MAX_COPYSIZE = (
+        0x1FFF + MIN_COMPRESS
+    )  # Maximum size to copy from a reference address ( Maximum copy size that a compression code can represent + Minimum number of compressed bytes )
+    MAX_ADDRESSLISTNUM = 1024 * 1024 * 1  # Maximum size of slide dictionary
+    MAX_POSITION = 1 << 24  # Maximum relative address that can be referenced ( 16MB )
+
+    def __init__(self) -> None:
+        self.fp = None  # The archive, opened by loadArchive
+        self.archivedFiles = []
+        self.stats = None
+        self.pool = BufferPool()  # Scratch buffers of decodeFile
+        self.chunkSize = DXA_BUFFERSIZE  # Raw data is read and written this many bytes at a time
+
+    def enableStats(self, callback=None) -> ExtractionStats:
+        """Start measuring every extractFile call, callback(record) runs after each file"""
+        self.stats = ExtractionStats(callback)
+        return self.stats
+
+    def disableStats(self) -> ExtractionStats:
+        stats = self.stats
+        self.stats = None
+        return stats
+
+    def error(self) -> bool:
+        if self.fp is not None:
+            self.fp.close()
+
+        return False
+
+    def loadTables(
+        self, headBuffer, encoding: str, patterns: list = None, predicate=None
+    ) -> bool:
+        """
+        Set up the tables of the decrypted header headBuffer, decode the
+        name table with encoding (guessed when None) and list the files
+        selected by patterns / predicate
+        """
+        head = self.archiveHead
+
+        # The tables are views of the one header buffer, nothing is copied
+        headView = memoryview(headBuffer)
+        self.nameTable = headView[: head.fileTableStartAddress]
+        self.fileTable = headView[
+            head.fileTableStartAddress : head.directoryTableStartAddress
+        ]
+        self.directoryTable = headView[head.directoryTableStartAddress :]
+        self.fileNames = decodeNameTable(
+            self.nameTable, head.fileTableStartAddress, encoding
+        )
+
+        self.archivedFiles = self.listFiles(patterns, predicate)
+        self.index = ArchiveIndex(self.archivedFiles)
+
+        return True
+
+    def decodeArchive(
+        self,
+        archivePath: Path,
+        outputPath: Path = Path("."),
+        only_game_dat: bool = False,
+        keyString_: bytearray = None,
+        patterns: list = None,
+        predicate=None,
+    ) -> bool:
+        if only_game_dat:
+            patterns = ["BasicData/Game.dat"]
+
+        if not self.loadArchive(
+            archivePath=archivePath,
+            outputPath=outputPath,
+            keyString_=keyString_,
+            patterns=patterns,
+            predicate=predicate,
+        ):
+            return False
+
+        self.extractAll()
+        self.fp.close()
+        return True
+
+    def listFiles(self, patterns: list = None, predicate=None) -> list:
+        """
+        Walk the directory table and return the ArchivedFile of every selected file.
+        Directories rejected by the filter are skipped without reading their contents.
+        """
+        archivedFiles = []
+        self.directoryDecode(
+            self.getDirectory(0), archivedFiles, EntryFilter(patterns, predicate)
+        )
+        return archivedFiles
+
+    def decode(
+        self, src, dest, check: bool = False, limit: int = None
+    ) -> tuple:
+        """
+        LZ decode src into dest (or a new buffer if dest is too small).
+        With limit, decoding stops once at least limit bytes are out, the
+        result may run a few bytes past it.
+        """
+        srcp = src
+
+        destsize = struct.unpack("I", bytes(srcp[0:4]))[0]
+        srcsize = struct.unpack("I", bytes(srcp[4:8]))[0] - 9
+
+        keycode = srcp[8]
+
+        if dest is None:
+            return destsize
+
+        outsize = destsize if limit is None else min(destsize, limit)
+
+        # Decode straight into dest when it's big enough
+        if isinstance(dest, bytearray) and len(dest) >= outsize:
+            tda = dest
+        else:
+            tda = bytearray(outsize)
+        tdac = 0
+
+        # Position in srcp, moved along instead of slicing srcp
+        sp = 9
+
+        while srcsize > 0 and tdac < outsize:
+            if srcp[sp] != keycode:
+                tda[tdac] = srcp[sp]
+                tdac += 1
+                sp += 1
+                srcsize -= 1
+                continue
+
+            if srcp[sp + 1] == keycode:
+                tda[tdac] = keycode % 256
+                tdac += 1
+                sp += 2
+                srcsize -= 2
+                continue
+
+            code = srcp[sp + 1]
+
+            if code > keycode:
+                code -= 1
+
+            sp += 2
+            srcsize -= 2
+
+            conbo = code >> 3
+            if code & (0x1 << 2):
+                conbo |= srcp[sp] << 5
+                sp += 1
+                srcsize -= 1
+
+            conbo += self.MIN_COMPRESS
+
+            indexsize = code & 0x3
+            if indexsize == 0:
+                index = srcp[sp]
+                sp += 1
+                srcsize -= 1
+            elif indexsize == 1:
+                index = srcp[sp] | (srcp[sp + 1] << 8)
+                sp += 2
+                srcsize -= 2
+            elif indexsize == 2:
+                index = srcp[sp] | (srcp[sp + 1] << 8) | (srcp[sp + 2] << 16)
+                sp += 3
+                srcsize -= 3
+
+            index += 1
+
+            if index < conbo:
+                num = index
+                while conbo > num:
+                    copied_bytes = tda[tdac - num : tdac - num + num]
+                    tda[tdac : tdac + num] = copied_bytes
+                    tdac += num
+                    conbo -= num
+                    num += num
+                if conbo != 0:
+                    copied_bytes = tda[tdac - num : tdac - num + conbo]
+                    tda[tdac : tdac + conbo] = copied_bytes
+                    tdac += conbo
+            else:
+                copied_bytes = tda[tdac - index : tdac - index + conbo]
+                tda[tdac : tdac + conbo] = copied_bytes
+                tdac += conbo
+
+        if tdac < outsize:
+            # Data cut short: dest may be a reused buffer, don't pass on what it held
+            tda[tdac:outsize] = bytes(outsize - tdac)
+
+        if check:
+            if srcsize != 0:
+                raise ValueError(f"LZ data doesn't end where its size says ({srcsize})")
+            if tdac != destsize:
+                raise ValueError(f"LZ data decoded to {tdac} bytes, expected {destsize}")
+
+        return (tda, destsize)
+
+    def directoryDecode(
+        self,
+        directory,
+        archivedFiles: list,
+        entryFilter: EntryFilter,
+        directoryName: str = "",
+        directorySearchName: bytes = b"",
+    ) -> None:
+        for fileHead in self.getFileHeads(directory):
+            name = self.getFileName(fileHead.nameAddress)
+            if directoryName:
+                name = f"{directoryName}/{name}"
+
+            searchName = self.getSearchFileName(self.nameTable, fileHead.nameAddress)
+            if directorySearchName:
+                searchName = directorySearchName + b"/" + searchName
+
+            if fileHead.attributes & FILE_ATTRIBUTE_DIRECTORY:
+                # Don't walk into directories that can't contain anything we want
+                if entryFilter and not entryFilter.matchDirectory(name):
+                    continue
+
+                # ディレクトリの場合は再帰をかける
+                self.directoryDecode(
+                    self.getDirectory(fileHead.dataAddress),
+                    archivedFiles,
+                    entryFilter,
+                    name,
+                    searchName,
+                )
+            else:
+                if entryFilter and not entryFilter.matchFile(name):
+                    continue
+
+                archivedFile = ArchivedFile()
+                archivedFile.outputPath = self.outputPath
+                archivedFile.name = name
+                archivedFile.searchName = searchName
+                archivedFile.dataStart = (
+                    self.archiveHead.dataStartAddress + fileHead.dataAddress
+                )
+                archivedFile.dataSize = fileHead.dataSize
+                archivedFile.pressDataSize = fileHead.pressDataSize
+                archivedFile.time = fileHead.time
+                self.fillArchivedFile(archivedFile, directory, fileHead)
+                archivedFile.storedSize = self.getStoredSize(archivedFile)
+
+                archivedFiles.append(archivedFile)
+
+    def getStoredSize(self, archivedFile: ArchivedFile) -> int:
+        """Bytes archivedFile takes in the archive"""
+        if archivedFile.compressed:
+            return archivedFile.pressDataSize
+        return archivedFile.dataSize
+
+    def extractAll(
+        self,
+        *,
+        progress=None,
+        pipelined: bool = False,
+        workers: int = 0,
+        setTimes: bool = False,
+        digests=None,
+        maxMemory: int = None,
+        threads: int = 0,
+        resume: bool = False,
+        verifyResumed: bool = False,
+    ) -> None:
+        """
+        progress(status: ProgressStatus) is called periodically, see progress.py
+        pipelined reads, decodes and writes at the same time, decoding
+        in workers processes if there are any, see PipelinedExtractor
+        setTimes gives the extracted files the times stored in the archive
+        digests, like ("sha256", "crc32"), are computed while writing and
+        stored in archivedFile.digests
+        maxMemory bounds the bytes held by the files being extracted, see
+        budget.MemoryBudget (extraction is then pipelined)
+        threads extracts with that many threads of this process instead, see
+        ThreadedExtractor (not together with pipelined, workers or maxMemory)
+        resume keeps a journal of the extracted files (see ExtractionJournal)
+        and skips the ones an earlier, interrupted extraction finished and
+        that still have the size and time they were written with,
+        verifyResumed also checks their digests (reading them all again)
+        """
+        self.extractFiles(
+            self.archivedFiles,
+            progress=progress,
+            pipelined=pipelined,
+            workers=workers,
+            setTimes=setTimes,
+            digests=digests,
+            maxMemory=maxMemory,
+            threads=threads,
+            resume=resume,
+            verifyResumed=verifyResumed,
+        )
+
+    def extract(
+        self,
+        patterns: list = None,
+        predicate=None,
+        *,
+        progress=None,
+        pipelined: bool = False,
+        workers: int = 0,
+        setTimes: bool = False,
+        digests=None,
+        maxMemory: int = None,
+        threads: int = 0,
+        resume: bool = False,
+        verifyResumed: bool = False,
+    ) -> None:
+        """Extract only the files selected by patterns / predicate (see EntryFilter)"""
+        if patterns is None and predicate is None:
+            return self.extractAll(
+                progress=progress,
+                pipelined=pipelined,
+                workers=workers,
+                setTimes=setTimes,
+                digests=digests,
+                maxMemory=maxMemory,
+                threads=threads,
+                resume=resume,
+                verifyResumed=verifyResumed,
+            )
+
+        self.extractFiles(
+            self.listFiles(patterns, predicate),
+            progress=progress,
+            pipelined=pipelined,
+            workers=workers,
+            setTimes=setTimes,
+            digests=digests,
+            maxMemory=maxMemory,
+            threads=threads,
+            resume=resume,
+            verifyResumed=verifyResumed,
+        )
+
+    def extractFiles(
+        self,
+        archivedFiles: list,
+        *,
+        progress=None,
+        pipelined: bool = False,
+        workers: int = 0,
+        setTimes: bool = False,
+        digests=None,
+        maxMemory: int = None,
+        threads: int = 0,
+        resume: bool = False,
+        verifyResumed: bool = False,
+        journal: ExtractionJournal = None,
+    ) -> None:
+        """journal records the files extracted, resume opens the archive's own"""
+        if resume:
+            with ExtractionJournal.open(self, verifyResumed) as journal:
+                self.extractFiles(
+                    journal.getUnfinished(archivedFiles),
+                    progress=progress,
+                    pipelined=pipelined,
+                    workers=workers,
+                    setTimes=setTimes,
+                    digests=digests,
+                    maxMemory=maxMemory,
+                    threads=threads,
+                    journal=journal,
+                )
+                journal.finish()
+            return
+
+        if threads > 0 and (pipelined or workers > 0 or maxMemory is not None):
+            raise ValueError(
+                "threads can't be used with pipelined, workers or maxMemory"
+            )
+
+        self.encodeInfo = DARC_ENCODEINFO()
+        reporter = ProgressReporter(self.encodeInfo, progress)
+        reporter.start(archivedFiles)
+
+        if threads > 0:
+            # The extracting threads do the writing, the sink doesn't need its own
+            with OutputSink(0, setTimes, self.stats, digests, journal=journal) as sink:
+                ThreadedExtractor(self, threads, sink).run(archivedFiles, reporter)
+            reporter.finish()
+            return
+
+        if pipelined or workers > 0 or maxMemory is not None:
+            # The writer thread does the writing, the sink doesn't need its own
+            sink = OutputSink(0, setTimes, self.stats, digests, journal=journal)
+            budget = None if maxMemory is None else MemoryBudget(maxMemory)
+            PipelinedExtractor(self, workers, sink, budget).run(archivedFiles, reporter)
+            reporter.finish()
+            return
+
+        # Read the archive front to back, small neighbouring files in a single read
+        groups = planReads(archivedFiles)
+        adviseGroups(self.fp, groups)
+
+        with OutputSink(
+            setTimes=setTimes, stats=self.stats, digests=digests, journal=journal
+        ) as sink:
+            for i, group in enumerate(groups):
+                if i + 1 < len(groups):
+                    nextGroup = groups[i + 1]
+                    advise(self.fp, nextGroup.start, nextGroup.size, "WILLNEED")
+
+                source = readGroup(self.fp, group)
+                for archivedFile in group.files:
+                    reporter.fileStarted(archivedFile)
+                    self.extractFile(archivedFile, source, sink)
+                    reporter.fileDone(archivedFile)
+
+        reporter.finish()
+
+    def extractChanges(
+        self,
+        *,
+        progress=None,
+        pipelined: bool = False,
+        workers: int = 0,
+        setTimes: bool = False,
+        digests=None,
+        maxMemory: int = None,
+        threads: int = 0,
+        manifest: ExtractionManifest = None,
+    ) -> ManifestDiff:
+        """
+        Bring outputPath up to date with this version of the archive: compare
+        it with the manifest of the last extraction (see ExtractionManifest),
+        extract only the added and changed files and delete the removed ones.
+        manifest is the one of outputPath by default. Other options are the
+        ones of extractAll.
+        """
+        if manifest is None:
+            manifest = ExtractionManifest.open(self)
+        # Files left out when loading are neither extracted nor removed
+        names = [archivedFile.name for archivedFile in self.listFiles()]
+        diff = manifest.diff(self, names=names)
+        self.extractFiles(
+            diff.extracted,
+            progress=progress,
+            pipelined=pipelined,
+            workers=workers,
+            setTimes=setTimes,
+            digests=digests,
+            maxMemory=maxMemory,
+            threads=threads,
+        )
+        manifest.apply(diff)
+        return diff
+
+    def extractToStore(
+        self, store: ContentStore, patterns: list = None, predicate=None
+    ) -> ContentStore:
+        """
+        Extract through a ContentStore (or the path of one): files already in
+        the store aren't decoded, and extracted files are linked to the store
+        (see ContentStore.link)
+        """
+        if not isinstance(store, ContentStore):
+            store = ContentStore(store)
+
+        archivedFiles = None
+        if patterns is not None or predicate is not None:
+            archivedFiles = self.listFiles(patterns, predicate)
+
+        store.extract(self, archivedFiles)
+        return store
+
+    def convert(
+        self,
+        output,
+        format: str = None,
+        patterns: list = None,
+        predicate=None,
+        workers: int = 0,
+    ) -> int:
+        """
+        Write the files straight into a tar / zip file (or "-" for stdout),
+        see convert.convertArchive. Returns the number of files written.
+        """
+        archivedFiles = None
+        if patterns is not None or predicate is not None:
+            archivedFiles = self.listFiles(patterns, predicate)
+
+        return convertArchive(self, output, format, archivedFiles, workers)
+
+    def exportContainer(
+        self, containerPath: Path, patterns: list = None, predicate=None
+    ) -> int:
+        """
+        Decode the files once into a container that ContainerReader maps
+        and reads without decoding, see container.py
+        """
+        archivedFiles = None
+        if patterns is not None or predicate is not None:
+            archivedFiles = self.listFiles(patterns, predicate)
+
+        return exportContainer(self, containerPath, archivedFiles)
+
+    def extractFile(
+        self, archivedFile: ArchivedFile, fp=None, sink: OutputSink = None
+    ) -> None:
+        """
+        fp: where to read the file from instead of the archive, see schedule.SpanReader
+        sink: OutputSink doing the writing, the file is written right away without one
+        """
+        if sink is None:
+            with OutputSink(threads=0, stats=self.stats) as sink:
+                return self.extractFile(archivedFile, fp, sink)
+
+        record = None if self.stats is None else self.stats.beginFile(archivedFile)
+
+        if sink.buffers(archivedFile):
+            chunks = []
+            self.decodeFile(archivedFile, chunks.append, record, fp=fp, pool=self.pool)
+            sink.submit(archivedFile, chunks, record, self.pool)
+            return
+
+        # ファイルを開く
+        writer = sink.open(archivedFile, record)
+
+        def write(data) -> None:
+            writer(data)
+            self.pool.give(data)
+
+        try:
+            self.decodeFile(archivedFile, write, record, fp=fp, pool=self.pool)
+        except BaseException:
+            sink.close(writer, completed=False)
+            raise
+
+        # ファイルを閉じる
+        sink.close(writer)
+
+        sink.endFile(record)
+
+    def decodeFile(
+        self,
+        archivedFile: ArchivedFile,
+        write,
+        record: FileRecord = None,
+        check: bool = False,
+        fp=None,
+        pool=None,
+    ) -> None:
+        """
+        Decode archivedFile passing its contents, in order, to write(data).
+        Large files are passed in several chunks.
+        With check, sizes stored in the compressed data that don't match the
+        file table raise ValueError instead of producing a broken file.
+        The data is read from fp, the archive by default.
+        With pool (a bufferpool.BufferPool), what's passed to write() comes
+        from it and write() owns it: it's given back to pool once written.
+        Scratch buffers always come from self.pool.
+        """
+        # データがある場合のみ転送
+        if archivedFile.dataSize == 0:
+            return
+
+        if fp is None:
+            fp = self.fp
+
+        # 初期位置をセットする
+        if fp.tell() != archivedFile.dataStart:
+            fp.seek(archivedFile.dataStart, SEEK_SET)
+
+        if archivedFile.compressed:
+            # 圧縮データをメモリに読み込む
+            read = self.readStored(
+                archivedFile, archivedFile.pressDataSize, 0, record, fp, self.pool
+            )
+            self.decodeStream(archivedFile, read, write, record, check, pool)
+        else:
+            # 転送処理開始
+            self.streamStored(
+                archivedFile, archivedFile.dataSize, 0, write, record, fp, pool
+            )
+
+    def decodeStream(
+        self,
+        archivedFile: ArchivedFile,
+        stream: bytearray,
+        write,
+        record: FileRecord = None,
+        check: bool = False,
+        pool=None,
+    ) -> None:
+        """
+        LZ decode stream, the whole compressed data of archivedFile taken
+        from self.pool, and pass the result to write(data)
+        """
+        if record is not None:
+            start = perf_counter()
+
+        # 解凍
+        if check:
+            self.checkLZHeader(archivedFile, stream, archivedFile.pressDataSize)
+
+        (decoded, decodedSize) = self.decode(
+            stream, takeOutput(pool, archivedFile.dataSize), check
+        )
+        self.pool.give(stream)
+        if decodedSize < archivedFile.dataSize:
+            # The LZ header says less than the file table, the rest is zeros
+            decoded[decodedSize : archivedFile.dataSize] = bytes(
+                archivedFile.dataSize - decodedSize
+            )
+
+        if record is not None:
+            record.stage("decode", start)
+
+        # 書き出し
+        write(getOutput(decoded, archivedFile.dataSize))
+
+    def readStored(
+        self,
+        archivedFile: ArchivedFile,
+        size: int,
+        offset: int = 0,
+        record: FileRecord = None,
+        fp=None,
+        pool=None,
+    ) -> bytearray:
+        """
+        Read and decrypt size bytes of what archivedFile stores, offset bytes
+        into it, from the current position of fp (the archive by default)
+        """
+        return self.keyConvFileRead(
+            None,
+            size,
+            self.fp if fp is None else fp,
+            archivedFile.key,
+            self.getKeyPhase(archivedFile) + offset,
+            record,
+            pool,
+        )
+
+    def streamStored(
+        self,
+        archivedFile: ArchivedFile,
+        size: int,
+        offset: int,
+        write,
+        record: FileRecord = None,
+        fp=None,
+        pool=None,
+    ) -> None:
+        """
+        readStored size bytes in self.chunkSize chunks and pass them to write(data).
+        With pool, the chunks come from it and write() gives them back.
+        """
+        writeSize = 0
+        while writeSize < size:
+            if size - writeSize > self.chunkSize:
+                moveSize = self.chunkSize
+            else:
+                moveSize = size - writeSize
+
+            read = self.readStored(
+                archivedFile, moveSize, offset + writeSize, record, fp, pool
+            )
+
+            # 書き出し
+            write(getOutput(read, moveSize))
+
+            writeSize += moveSize
+
+    def checkLZHeader(self, archivedFile: ArchivedFile, data, pressDataSize: int):
+        """Raise ValueError if the LZ header of data doesn't match the file table"""
+        destsize = self.decode(data, None)
+        if destsize != archivedFile.dataSize:
+            raise ValueError(
+                f"LZ header size is {destsize}, file table says {archivedFile.dataSize}"
+            )
+
+        srcsize = struct.unpack("I", bytes(data[4:8]))[0]
+        if srcsize != pressDataSize or len(data) < pressDataSize:
+            raise ValueError(
+                f"LZ data is {len(data)} bytes with a header of {srcsize}, "
+                f"file table says {pressDataSize}"
+            )
+
+    def verify(self, workers: int = None) -> VerifyReport:
+        """
+        Decode every listed file without writing anything and report the
+        ones that are broken (or decrypted with the wrong key) by name.
+        workers defaults to the number of CPUs, 1 checks in this process.
+        """
+        return verifyArchive(self, self.archivedFiles, workers)
+
+    def readFile(self, archivedFile: ArchivedFile) -> bytes:
+        """Decode archivedFile into memory"""
+        chunks = []
+        self.decodeFile(archivedFile, chunks.append)
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    def peek(self, archivedFile: ArchivedFile, size: int) -> bytes:
+        """
+        First size bytes of archivedFile, decoding only as much as needed:
+        the LZ decoder gets a growing prefix of the stream (see
+        getStreamPrefix) and stops after size bytes.
+        """
+        size = max(0, min(size, archivedFile.dataSize))
+        if size == 0:
+            return b""
+
+        if not archivedFile.compressed and not archivedFile.huffmanCompressed:
+            return bytes(self.readRange(archivedFile, 0, size))
+
+        if archivedFile.compressed:
+            streamSize = archivedFile.pressDataSize
+            length = min(streamSize, max(PEEK_STREAM_SIZE, size))
+        else:
+            streamSize = length = size
+
+        while True:
+            stream = self.getStreamPrefix(archivedFile, length)
+            if stream is None:
+                # Would need the tail of the stream, as slow as the whole file
+                return bytes(self.readFile(archivedFile)[:size])
+
+            if not archivedFile.compressed:
+                return bytes(stream[:size])
+
+            try:
+                (decoded, _) = self.decode(stream, bytearray(size), limit=size)
+                return bytes(decoded[:size])
+            except IndexError:
+                # The prefix ended in the middle of what size bytes need
+                if length >= streamSize:
+                    raise
+                length = min(streamSize, length * 4)
+
+    def getStreamPrefix(
+        self, archivedFile: ArchivedFile, length: int
+    ) -> bytearray | None:
+        """
+        First length bytes of the stream of archivedFile (the LZ data if
+        compressed, the file otherwise), None if they can't be read on their own
+        """
+        self.fp.seek(archivedFile.dataStart, SEEK_SET)
+        return self.readStored(archivedFile, length)
+
+    def readRange(
+        self, archivedFile: ArchivedFile, offset: int, length: int
+    ) -> bytearray:
+        """
+        Read length bytes starting at offset of an uncompressed file
+        without reading the rest of it.
+        Uncompressed files are only XORed with a key whose phase depends on
+        the position, so any range can be decrypted on its own.
+        """
+        if archivedFile.compressed or archivedFile.huffmanCompressed:
+            raise ValueError(
+                f"{archivedFile.name} is compressed, it can only be read whole"
+            )
+
+        if offset < 0 or length < 0:
+            raise ValueError("offset and length can't be negative")
+
+        length = max(0, min(length, archivedFile.dataSize - offset))
+        if length == 0:
+            return bytearray()
+
+        self.fp.seek(archivedFile.dataStart + offset, SEEK_SET)
+
+        return self.readStored(archivedFile, length, offset)
+
+    def getSearchFileName(self, nameTable, nameAddress: int) -> bytes:
+        """
+        Name table entries are:
+            u16 length of each name in 4 byte units
+            u16 parity (sum of the bytes of the uppercased name)
+            uppercased name, DXLib uses it when looking files up
+            original name
+        DXLib compares parities before names while walking a directory;
+        find() looks whole paths up in a dict, which already rejects on
+        the hash, so the parity is only used to score keys (see keyrecovery)
+        """
+        length = (nameTable[nameAddress] | (nameTable[nameAddress + 1] << 8)) * 4
+        start = nameAddress + 4
+        return bytes(nameTable[start : start + length]).rstrip(b"\0")
+
+    def find(self, path: str) -> ArchivedFile | None:
+        """Case-insensitive lookup of a file listed by loadArchive"""
+        return self.index.find(path)
+
+    def getFileName(self, nameAddress: int) -> str:
+        """Original name of the name table entry at nameAddress"""
+        name = self.fileNames.get(nameAddress)
+        if name is None:
+            # Not reached by the bulk decode, the table is probably damaged
+            name = self.getOriginalFileName(self.nameTable[nameAddress:]).as_posix()
+        return name
+
+    def getOriginalFileName(self, fileNameTable) -> Path:
+        filename_start_pos = fileNameTable[0] * 4 + 4
+        pName = readString(fileNameTable, filename_start_pos, fileNameTable[0] * 4)
+        try:
+            return Path(pName.decode("utf8"))
+        except UnicodeDecodeError:
+            return Path(pName.decode("cp932"))  # For Japanese characters
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if not self.fp.closed:
+            self.fp.close()
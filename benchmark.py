@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+try:
+    from .reader import openArchive
+except ImportError:
+    from reader import openArchive
+
+THREAD_COUNTS = (1, 2, 4, 8)
+
+
+def isGilEnabled() -> bool:
+    """False on a free-threaded build running without the GIL (python3.13t and later)"""
+    isEnabled = getattr(sys, "_is_gil_enabled", None)
+    return True if isEnabled is None else isEnabled()
+
+
+def getModes(threadCounts=THREAD_COUNTS, workers: int = None) -> list:
+    """(label, extractAll keyword arguments) of every compared mode"""
+    modes = [("sequential", {})]
+    modes += [(f"threads={count}", {"threads": count}) for count in threadCounts]
+    if workers:
+        modes.append((f"workers={workers}", {"workers": workers}))
+    return modes
+
+
+def benchmarkExtraction(
+    archiveClass, archivePath: Path, keyString_=None, modes: list = None
+) -> list:
+    """
+    (label, seconds) of extracting the whole archive in every mode of
+    modes (see getModes), each time into a new temporary directory
+    """
+    results = []
+    for label, options in getModes() if modes is None else modes:
+        with tempfile.TemporaryDirectory() as outputPath:
+            archive = archiveClass()
+            if not archive.loadArchive(archivePath, Path(outputPath), keyString_):
+                raise ValueError(f"Can't load {archivePath}")
+            try:
+                start = perf_counter()
+                archive.extractAll(**options)
+                results.append((label, perf_counter() - start))
+            finally:
+                archive.fp.close()
+    return results
+
+
+def main() -> None:
+    """
+    python benchmark.py ARCHIVE [KEY_HEX]
+    Compares sequential, threaded and worker process extraction, run it
+    with a regular and a free-threaded build to see what the GIL costs
+    """
+    if len(sys.argv) < 2:
+        print(main.__doc__)
+        return
+
+    archivePath = Path(sys.argv[1])
+    keyString_ = bytearray.fromhex(sys.argv[2]) if len(sys.argv) > 2 else None
+    reader = openArchive(archivePath, keyString_)
+    if reader is None:
+        print(f"Couldn't load {archivePath.name}")
+        return
+    archiveClass = type(reader.archive)
+    reader.archive.fp.close()
+
+    build = "GIL" if isGilEnabled() else "free-threaded"
+    print(f"Python {sys.version.split()[0]} ({build}), {os.cpu_count()} CPUs")
+    results = benchmarkExtraction(
+        archiveClass, archivePath, keyString_, getModes(workers=os.cpu_count())
+    )
+    baseline = results[0][1]
+    for label, seconds in results:
+        print(f"{label:>12}: {seconds:.3f}s ({baseline / seconds:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import threading
+from collections import deque
+
+try:
+    from .bufferpool import getBufferSize
+except ImportError:
+    from bufferpool import getBufferSize
+
+MIN_MAX_MEMORY = 1024 * 1024  # Smallest budget accepted
+POOL_SHARE = 8  # 1 / POOL_SHARE of the budget is left to the buffer pool's free buffers
+STREAM_SHARE = 4  # Raw files larger than 1 / STREAM_SHARE of the budget are streamed
+LOOKAHEAD = 32  # Files considered for admission at once
+MAX_OVERTAKES = 64  # Files admitted ahead of one that doesn't fit before it's waited for
+POLL_INTERVAL = 0.1  # Seconds between checks for a stop while waiting
+
+
+def getFootprint(archivedFile) -> int:
+    """
+    Bytes decodeFile holds at once for archivedFile: the output, the LZ
+    data and the Huffman data, rounded up like the buffer pool does
+    """
+    footprint = getBufferSize(archivedFile.dataSize)
+    if archivedFile.compressed:
+        footprint += getBufferSize(archivedFile.pressDataSize)
+    if getattr(archivedFile, "huffmanCompressed", False):
+        footprint += getBufferSize(archivedFile.huffPressDataSize)
+    return footprint
+
+
+def isRaw(archivedFile) -> bool:
+    return not archivedFile.compressed and not getattr(
+        archivedFile, "huffmanCompressed", False
+    )
+
+
+class MemoryBudget:
+    """
+    Keeps the files being extracted under maxMemory bytes.
+    Files are admitted by their footprint and hold it until they're written.
+    Raw files too large for a share of the budget are streamed, streamSize
+    bytes at a time. Smaller files can be admitted ahead of one that doesn't
+    fit yet so the decoders stay busy, MAX_OVERTAKES times in a row at most.
+    A 1 / POOL_SHARE part of maxMemory is left to the buffer pool.
+    """
+
+    def __init__(self, maxMemory: int) -> None:
+        if maxMemory < MIN_MAX_MEMORY:
+            raise ValueError(f"maxMemory must be at least {MIN_MAX_MEMORY} bytes")
+
+        self.maxMemory = maxMemory
+        self.poolSize = maxMemory // POOL_SHARE
+        self.size = maxMemory - self.poolSize
+
+        # A power of two, so the pooled chunks take exactly that
+        self.streamSize = 1
+        while self.streamSize * 2 <= self.size // STREAM_SHARE:
+            self.streamSize *= 2
+
+        self.used = 0
+        self.peak = 0
+        self.condition = threading.Condition()
+
+    def streams(self, archivedFile) -> bool:
+        """Is archivedFile written as it's read instead of decoded whole"""
+        return isRaw(archivedFile) and archivedFile.dataSize > self.streamSize
+
+    def getCost(self, archivedFile) -> int:
+        if self.streams(archivedFile):
+            return self.streamSize
+        return getFootprint(archivedFile)
+
+    def check(self, archivedFiles: list) -> None:
+        """Raise ValueError if one of archivedFiles can't be extracted within the budget"""
+        for archivedFile in archivedFiles:
+            cost = self.getCost(archivedFile)
+            if cost > self.size:
+                raise ValueError(
+                    f"{archivedFile.name} needs {cost} bytes to be decoded, "
+                    f"more than the {self.size} bytes maxMemory={self.maxMemory} leaves"
+                )
+
+    def admit(self, items, getCost, stop: threading.Event = None):
+        """
+        Yield (item, cost) for every item once its cost fits in what's left,
+        taking items in order except for overtakes. Whoever is done with an
+        item calls release() with its cost (or parts of it).
+        Stops early when stop is set.
+        """
+        items = iter(items)
+        waiting = deque()
+        overtakes = 0
+        while True:
+            while len(waiting) < LOOKAHEAD:
+                item = next(items, None)
+                if item is None:
+                    break
+                waiting.append((item, getCost(item)))
+            if not waiting:
+                return
+
+            with self.condition:
+                chosen = self.choose(waiting, overtakes)
+                while chosen is None:
+                    if stop is not None and stop.is_set():
+                        return
+                    self.condition.wait(POLL_INTERVAL)
+                    chosen = self.choose(waiting, overtakes)
+
+                (item, cost) = waiting[chosen]
+                del waiting[chosen]
+                self.used += cost
+                self.peak = max(self.peak, self.used)
+
+            overtakes = overtakes + 1 if chosen > 0 else 0
+            yield (item, cost)
+
+    def choose(self, waiting: deque, overtakes: int) -> int | None:
+        """Index of the first waiting item that fits, None if none does"""
+        candidates = 1 if overtakes >= MAX_OVERTAKES else len(waiting)
+        for i in range(candidates):
+            if self.used + waiting[i][1] <= self.size:
+                return i
+        return None
+
+    def release(self, cost: int) -> None:
+        with self.condition:
+            self.used -= cost
+            self.condition.notify_all()
+
+    def __str__(self) -> str:
+        return (
+            f"peak {self.peak} of {self.size} bytes "
+            f"(maxMemory {self.maxMemory}, {self.poolSize} for the buffer pool)"
+        )
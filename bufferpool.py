@@ -0,0 +1,156 @@
+import threading
+
+MIN_SIZE_CLASS = 64 * 1024  # Smaller requests get a buffer of this size
+MAX_SIZE_CLASS = 64 * 1024 * 1024  # Larger buffers are allocated and freed as usual
+POOL_SIZE = 128 * 1024 * 1024  # Free bytes kept by a pool, across its arenas
+
+
+def getSizeClass(size: int) -> int:
+    """Smallest power of two, at least MIN_SIZE_CLASS, size fits in"""
+    sizeClass = MIN_SIZE_CLASS
+    while sizeClass < size:
+        sizeClass <<= 1
+    return sizeClass
+
+
+def getBufferSize(size: int) -> int:
+    """Bytes a buffer taken from a pool for size bytes really takes"""
+    return size if size > MAX_SIZE_CLASS else getSizeClass(size)
+
+
+def takeOutput(pool, size: int) -> bytearray:
+    """
+    Buffer for size bytes that will be passed to write():
+    from pool when the caller gives them back, of the exact size otherwise
+    """
+    return bytearray(size) if pool is None else pool.take(size)
+
+
+def getOutput(buffer: bytearray, size: int):
+    """The first size bytes of buffer, without copying them"""
+    return buffer if len(buffer) == size else memoryview(buffer)[:size]
+
+
+def readInto(fp, pool, size: int) -> bytearray:
+    """
+    size bytes of fp in a buffer from pool.
+    If fp ends first, an exact copy of what was read is returned instead.
+    """
+    buffer = pool.take(size)
+    with memoryview(buffer) as view:
+        read = fp.readinto(view[:size])
+
+    if read < size:
+        data = buffer[:read]
+        pool.give(buffer)
+        return data
+    return buffer
+
+
+class PoolBuffer(bytearray):
+    """bytearray remembering the arena it goes back to"""
+
+    __slots__ = ("arena",)
+
+
+class Arena:
+    """Free buffers of one thread, by size class"""
+
+    def __init__(self, pool) -> None:
+        self.pool = pool
+        self.free = {}
+        self.taken = 0
+        self.reused = 0
+
+    def take(self, sizeClass: int) -> PoolBuffer:
+        pool = self.pool
+        with pool.lock:
+            self.taken += 1
+            buffers = self.free.get(sizeClass)
+            if buffers:
+                self.reused += 1
+                pool.freeSize -= sizeClass
+                return buffers.pop()
+
+        buffer = PoolBuffer(sizeClass)
+        buffer.arena = self
+        return buffer
+
+    def put(self, buffer: PoolBuffer) -> None:
+        pool = self.pool
+        with pool.lock:
+            if pool.freeSize + len(buffer) > pool.limit:
+                # Left to the garbage collector
+                return
+            self.free.setdefault(len(buffer), []).append(buffer)
+            pool.freeSize += len(buffer)
+
+    def clear(self) -> None:
+        for sizeClass, buffers in self.free.items():
+            self.pool.freeSize -= sizeClass * len(buffers)
+        self.free = {}
+
+
+class BufferPool:
+    """
+    Scratch buffers of the XOR, Huffman and LZ stages, reused from file to
+    file instead of allocated (and page faulted in) every time.
+
+    Buffers are rounded up to a power of two size class, so they're
+    usually longer than asked for and the caller keeps track of the size.
+    They aren't zeroed either, every stage overwrites what it uses.
+    Each thread takes from its own arena, a buffer given back by another
+    thread (the sink's writers) goes back to the arena it came from.
+    At most limit bytes of free buffers are kept.
+    """
+
+    def __init__(self, limit: int = POOL_SIZE) -> None:
+        self.local = threading.local()
+        self.lock = threading.Lock()  # Around arenas, buffers can be given back from any thread
+        self.arenas = []
+        self.freeSize = 0
+        self.limit = limit
+
+    def setLimit(self, limit: int) -> int:
+        """Keep at most limit bytes of free buffers from now on, returns the previous limit"""
+        with self.lock:
+            previous = self.limit
+            self.limit = limit
+            if self.freeSize > limit:
+                for arena in self.arenas:
+                    arena.clear()
+        return previous
+
+    def getArena(self) -> Arena:
+        arena = getattr(self.local, "arena", None)
+        if arena is None:
+            arena = Arena(self)
+            self.local.arena = arena
+            with self.lock:
+                self.arenas.append(arena)
+        return arena
+
+    def take(self, size: int) -> bytearray:
+        """Buffer of at least size bytes"""
+        if size > MAX_SIZE_CLASS:
+            return bytearray(size)
+        return self.getArena().take(getSizeClass(size))
+
+    def give(self, buffer) -> None:
+        """
+        Hand back a buffer from take() (or a memoryview of one), nothing can
+        use it afterwards. Anything else is ignored.
+        """
+        if isinstance(buffer, memoryview):
+            view = buffer
+            buffer = view.obj
+            view.release()
+
+        if isinstance(buffer, PoolBuffer):
+            buffer.arena.put(buffer)
+
+    def __str__(self) -> str:
+        with self.lock:
+            taken = sum(arena.taken for arena in self.arenas)
+            reused = sum(arena.reused for arena in self.arenas)
+        return f"{reused} of {taken} buffers reused, {self.freeSize} bytes free"
@@ -0,0 +1,232 @@
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+from time import perf_counter
+
+CONTAINER_MAGIC = b"WOLFCNT\0"
+CONTAINER_VERSION = 1
+PAGE_SIZE = max(mmap.PAGESIZE, mmap.ALLOCATIONGRANULARITY)  # Payloads start on a page
+HEADER_FORMAT = "<8sIIQQQ"  # magic, version, count, indexOffset, namesOffset, namesSize
+INDEX_FORMAT = "<QQQII"  # name hash, offset, length, name offset, name length
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+
+# Container layout:
+#     header, padded to PAGE_SIZE
+#     decoded files, each one starting on a PAGE_SIZE boundary
+#     index: count INDEX_FORMAT entries sorted by name hash
+#     names: the UTF-8 names the index points to
+
+
+def getNameHash(name: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(name.encode("utf8"), digest_size=8).digest(), "little"
+    )
+
+
+def alignUp(value: int, alignment: int = PAGE_SIZE) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+def exportContainer(archive, containerPath: Path, archivedFiles: list = None) -> int:
+    """
+    Decode the files of a loaded archive (with decodeFile, like extractFile)
+    into a container at containerPath. The container replaces any previous
+    one only once complete. Returns the number of files exported.
+    """
+    if archivedFiles is None:
+        archivedFiles = archive.archivedFiles
+
+    containerPath = Path(containerPath)
+    temporaryPath = containerPath.with_name(containerPath.name + ".tmp")
+
+    entries = []
+    with open(temporaryPath, mode="wb") as destP:
+        destP.write(bytes(PAGE_SIZE))
+        offset = PAGE_SIZE
+
+        for archivedFile in archivedFiles:
+            destP.seek(offset)
+            archive.decodeFile(archivedFile, destP.write)
+            length = destP.tell() - offset
+            entries.append((archivedFile.name, offset, length))
+            offset = alignUp(offset + length)
+
+        indexOffset = alignUp(destP.tell(), 8)
+        destP.seek(indexOffset)
+
+        names = bytearray()
+        index = []
+        for name, entryOffset, length in entries:
+            encoded = name.encode("utf8")
+            index.append(
+                (getNameHash(name), entryOffset, length, len(names), len(encoded))
+            )
+            names += encoded
+        index.sort()
+
+        for entry in index:
+            destP.write(struct.pack(INDEX_FORMAT, *entry))
+        namesOffset = destP.tell()
+        destP.write(names)
+
+        destP.seek(0)
+        destP.write(
+            struct.pack(
+                HEADER_FORMAT,
+                CONTAINER_MAGIC,
+                CONTAINER_VERSION,
+                len(index),
+                indexOffset,
+                namesOffset,
+                len(names),
+            )
+        )
+
+    os.replace(temporaryPath, containerPath)
+    return len(entries)
+
+
+class ContainerReader:
+    """
+    Memory mapped container written by exportContainer.
+    read(name) returns a memoryview of the mapped file, nothing is decoded
+    or copied. Views have to be released before close().
+    """
+
+    def __init__(self, containerPath: Path) -> None:
+        self.fp = open(containerPath, mode="rb")
+        self.map = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+        (
+            magic,
+            version,
+            self.count,
+            self.indexOffset,
+            self.namesOffset,
+            namesSize,
+        ) = struct.unpack_from(HEADER_FORMAT, self.map, 0)
+
+        if magic != CONTAINER_MAGIC or version != CONTAINER_VERSION:
+            self.close()
+            raise ValueError(f"{containerPath} isn't a container")
+
+    def getEntry(self, i: int) -> tuple:
+        offset = self.indexOffset + i * INDEX_SIZE
+        return struct.unpack_from(INDEX_FORMAT, self.map, offset)
+
+    def getName(self, entry: tuple) -> str:
+        start = self.namesOffset + entry[3]
+        return bytes(self.view[start : start + entry[4]]).decode("utf8")
+
+    def find(self, name: str) -> tuple | None:
+        """Binary search of the index, (offset, length) or None"""
+        nameHash = getNameHash(name)
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.getEntry(middle)[0] < nameHash:
+                low = middle + 1
+            else:
+                high = middle
+
+        # Names with the same hash are next to each other
+        for i in range(low, self.count):
+            entry = self.getEntry(i)
+            if entry[0] != nameHash:
+                break
+            if self.getName(entry) == name:
+                return (entry[1], entry[2])
+
+        return None
+
+    def read(self, name: str) -> memoryview:
+        found = self.find(name)
+        if found is None:
+            raise KeyError(f"There is no item named {name!r} in the container")
+
+        (offset, length) = found
+        return self.view[offset : offset + length]
+
+    def namelist(self) -> list:
+        return [self.getName(self.getEntry(i)) for i in range(self.count)]
+
+    def __contains__(self, name: str) -> bool:
+        return self.find(name) is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self.view.release()
+        self.map.close()
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+def measure(read, names: list) -> list:
+    """Seconds taken by read(name) for each name"""
+    times = []
+    for name in names:
+        start = perf_counter()
+        read(name)
+        times.append(perf_counter() - start)
+    return times
+
+
+def describe(times: list) -> str:
+    times = sorted(times)
+    mean = sum(times) / len(times)
+    return (
+        f"mean {mean * 1e6:.1f}us "
+        f"median {times[len(times) // 2] * 1e6:.1f}us "
+        f"max {times[-1] * 1e6:.1f}us"
+    )
+
+
+def main() -> None:
+    """Per-file read latency of a .wolf archive against its container"""
+    try:
+        from . import DXArchive5
+        from .keys import key_1_01_2_02
+    except ImportError:
+        import DXArchive5
+        from keys import key_1_01_2_02
+
+    archivePath = Path("./test_wolf/version_131.wolf")
+    containerPath = Path("output") / (archivePath.stem + ".container")
+    containerPath.parent.mkdir(parents=True, exist_ok=True)
+
+    archive = DXArchive5.DXArchive()
+    if not archive.loadArchive(archivePath=archivePath, keyString_=key_1_01_2_02):
+        print(f"Couldn't load {archivePath.name}")
+        return
+
+    start = perf_counter()
+    count = archive.exportContainer(containerPath)
+    print(f"Exported {count} files in {perf_counter() - start:.2f}s")
+
+    names = [archivedFile.name for archivedFile in archive.archivedFiles]
+    files = archive.index.files
+    times = measure(lambda name: archive.readFile(files[name]), names)
+    print(f"{archivePath.name}: {describe(times)}")
+
+    with ContainerReader(containerPath) as container:
+        # Release the views right away so the container can be closed
+        times = measure(lambda name: container.read(name).release(), names)
+        print(f"{containerPath.name}: {describe(times)}")
+
+    archive.fp.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import sys
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from .pipeline import DECODES_PER_WORKER, decodeToSlot, initSharedWorker
+    from .sink import fileTimeToNs
+    from .transport import SLOT_SIZE, SLOTS_PER_WORKER, SharedIndex, SlotPool
+except ImportError:
+    from pipeline import DECODES_PER_WORKER, decodeToSlot, initSharedWorker
+    from sink import fileTimeToNs
+    from transport import SLOT_SIZE, SLOTS_PER_WORKER, SharedIndex, SlotPool
+
+# Format -> tarfile mode, streaming modes so the output doesn't have to be seekable
+TAR_MODES = {
+    "tar": "w|",
+    "tar.gz": "w|gz",
+    "tar.bz2": "w|bz2",
+    "tar.xz": "w|xz",
+}
+FORMATS = tuple(TAR_MODES) + ("zip",)
+ZIP64_LIMIT = 0x7FFFFFFF  # Larger files need zip64 headers from the start
+
+
+def guessFormat(output) -> str:
+    """Format from the output file name, tar when there's nothing to go by"""
+    name = str(output).lower()
+    for format in sorted(FORMATS, key=len, reverse=True):
+        if name.endswith("." + format):
+            return format
+    if name.endswith(".tgz"):
+        return "tar.gz"
+    return "tar"
+
+
+def getModificationTime(archivedFile) -> float:
+    """Seconds since the Unix epoch of the last write, 0 if it isn't set"""
+    fileTime = getattr(archivedFile, "time", None)
+    ns = None if fileTime is None else fileTimeToNs(fileTime.lastWrite)
+    return 0 if ns is None else ns / 1e9
+
+
+class ChunkReader:
+    """Read-only file object over decoded chunks, handing them out as they're read"""
+
+    def __init__(self, chunks: list) -> None:
+        self.chunks = deque(memoryview(chunk) for chunk in chunks)
+
+    def read(self, size: int = -1) -> bytes:
+        data = bytearray()
+        while self.chunks and (size < 0 or len(data) < size):
+            chunk = self.chunks.popleft()
+            if size >= 0 and len(data) + len(chunk) > size:
+                cut = size - len(data)
+                self.chunks.appendleft(chunk[cut:])
+                chunk = chunk[:cut]
+            data += chunk
+        return bytes(data)
+
+
+def decodeEntries(archive, archivedFiles: list, workers: int = 0):
+    """
+    (archivedFile, decoded chunks) for every file, in the order of archivedFiles.
+    The chunks are only valid until the next file is asked for.
+    With workers, files are decoded by a process pool with a bounded number
+    in flight, results are still handed out in order. Like PipelinedExtractor,
+    the workers get the files from a transport.SharedIndex and decode them
+    into a transport.SlotPool, nothing but file and slot numbers is pickled.
+    """
+    if workers <= 0:
+        for archivedFile in archivedFiles:
+            chunks = []
+            archive.decodeFile(archivedFile, chunks.append)
+            yield (archivedFile, chunks)
+        return
+
+    index = SharedIndex.publish(archive, archivedFiles)
+    try:
+        slots = SlotPool(workers * SLOTS_PER_WORKER, SLOT_SIZE)
+    except BaseException:
+        index.close()
+        raise
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=initSharedWorker,
+            initargs=(
+                type(archive),
+                archive.archivePath,
+                index.name,
+                slots.name,
+                slots.size,
+                None,
+            ),
+        ) as executor:
+            pending = deque()
+            try:
+                for number, archivedFile in enumerate(archivedFiles):
+                    if archivedFile.dataSize > slots.size:
+                        # Decoded here once everything before it is out
+                        while pending:
+                            yield from handOut(slots, *pending.popleft())
+                        chunks = []
+                        archive.decodeFile(archivedFile, chunks.append)
+                        yield (archivedFile, chunks)
+                        continue
+
+                    slot = slots.take()
+                    future = executor.submit(decodeToSlot, number, slot)
+                    pending.append((archivedFile, future, slot))
+
+                    if len(pending) >= workers * DECODES_PER_WORKER:
+                        yield from handOut(slots, *pending.popleft())
+
+                while pending:
+                    yield from handOut(slots, *pending.popleft())
+            except BaseException:
+                for _, future, _ in pending:
+                    future.cancel()
+                raise
+    finally:
+        slots.close()
+        index.close()
+
+
+def handOut(slots: SlotPool, archivedFile, future, slot: int):
+    """Hand out the file a worker decoded into slot, then free the slot"""
+    try:
+        size = future.result()
+    except BaseException:
+        slots.give(slot)
+        raise
+
+    view = slots.getView(slot, size)
+    try:
+        yield (archivedFile, [view])
+    finally:
+        view.release()
+        slots.give(slot)
+
+
+def getDirectories(archivedFiles: list) -> list:
+    """Every directory containing one of archivedFiles, parents first"""
+    directories = set()
+    for archivedFile in archivedFiles:
+        parts = archivedFile.name.split("/")[:-1]
+        for i in range(1, len(parts) + 1):
+            directories.add("/".join(parts[:i]))
+    return sorted(directories)
+
+
+def writeTar(fileobj, mode: str, entries, directories: list) -> int:
+    count = 0
+    with tarfile.open(fileobj=fileobj, mode=mode, format=tarfile.PAX_FORMAT) as tar:
+        for directory in directories:
+            tarInfo = tarfile.TarInfo(directory)
+            tarInfo.type = tarfile.DIRTYPE
+            tarInfo.mode = 0o755
+            tar.addfile(tarInfo)
+
+        for archivedFile, chunks in entries:
+            tarInfo = tarfile.TarInfo(archivedFile.name)
+            tarInfo.size = archivedFile.dataSize
+            tarInfo.mtime = getModificationTime(archivedFile)
+            tarInfo.mode = 0o644
+            tar.addfile(tarInfo, ChunkReader(chunks))
+            count += 1
+    return count
+
+
+def writeZip(fileobj, entries, directories: list, compression: int) -> int:
+    count = 0
+    with zipfile.ZipFile(fileobj, mode="w", compression=compression) as zipFile:
+        for directory in directories:
+            zipFile.writestr(directory + "/", b"")
+
+        for archivedFile, chunks in entries:
+            zipInfo = zipfile.ZipInfo(
+                archivedFile.name, getZipTime(getModificationTime(archivedFile))
+            )
+            zipInfo.compress_type = compression
+            zipInfo.file_size = archivedFile.dataSize
+            with zipFile.open(
+                zipInfo, mode="w", force_zip64=archivedFile.dataSize > ZIP64_LIMIT
+            ) as destP:
+                for chunk in chunks:
+                    destP.write(chunk)
+            count += 1
+    return count
+
+
+def getZipTime(seconds: float) -> tuple:
+    # Zip dates start in 1980
+    return max(time.localtime(seconds)[:6], (1980, 1, 1, 0, 0, 0))
+
+
+def convertArchive(
+    archive,
+    output,
+    format: str = None,
+    archivedFiles: list = None,
+    workers: int = 0,
+    compression: int = zipfile.ZIP_DEFLATED,
+) -> int:
+    """
+    Write the files of a loaded archive into a tar or zip file without
+    extracting them, keeping their directories and modification times.
+    output is a path, "-" for stdout, or a writable binary file object.
+    Each file is decoded, written and dropped before the next, so memory
+    holds about one file (workers * DECODES_PER_WORKER with workers).
+    Returns the number of files written.
+    """
+    if archivedFiles is None:
+        archivedFiles = archive.archivedFiles
+
+    if format is None:
+        format = guessFormat(output if isinstance(output, (str, Path)) else "")
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+
+    closeOutput = False
+    if isinstance(output, (str, Path)):
+        if str(output) == "-":
+            output = sys.stdout.buffer
+        else:
+            output = open(output, mode="wb")
+            closeOutput = True
+
+    try:
+        entries = decodeEntries(archive, archivedFiles, workers)
+        directories = getDirectories(archivedFiles)
+        if format == "zip":
+            return writeZip(output, entries, directories, compression)
+        return writeTar(output, TAR_MODES[format], entries, directories)
+    finally:
+        if closeOutput:
+            output.close()
+        else:
+            output.flush()
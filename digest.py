@@ -0,0 +1,43 @@
+import hashlib
+import zlib
+
+CRC32 = "crc32"  # Same result as DXArchive.CRC32, computed by zlib
+
+
+class CRC32Digest:
+    """hashlib-like CRC32"""
+
+    name = CRC32
+
+    def __init__(self) -> None:
+        self.crc = 0
+
+    def update(self, data) -> None:
+        self.crc = zlib.crc32(data, self.crc)
+
+    def hexdigest(self) -> str:
+        return f"{self.crc:08x}"
+
+
+def newDigest(name: str):
+    """CRC32Digest for "crc32", the hashlib algorithm called name otherwise"""
+    if name == CRC32:
+        return CRC32Digest()
+    return hashlib.new(name)
+
+
+class Digester:
+    """
+    Computes several digests of data passed in chunks.
+    Raises ValueError right away for an unknown algorithm.
+    """
+
+    def __init__(self, names) -> None:
+        self.digests = {name: newDigest(name) for name in names}
+
+    def update(self, data) -> None:
+        for digest in self.digests.values():
+            digest.update(data)
+
+    def result(self) -> dict:
+        return {name: digest.hexdigest() for name, digest in self.digests.items()}
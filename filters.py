@@ -0,0 +1,100 @@
+from fnmatch import fnmatchcase
+
+
+class EntryFilter:
+    """
+    Selects archive entries while the directory table is being walked.
+
+    patterns:
+        Glob patterns over archive-relative paths using "/" as separator, e.g.
+        "BasicData/*.dat" or "**/*.ogg". Matching is case-insensitive like DXLib.
+        A pattern without "/" matches the entry name at any depth.
+        A pattern that matches a directory selects everything below it.
+    predicate:
+        predicate(path: str, isDirectory: bool) -> bool
+        Returning False for a directory prunes the whole subtree.
+
+    An entry is selected when it matches any pattern (if patterns were given)
+    and the predicate (if one was given).
+    """
+
+    def __init__(self, patterns=None, predicate=None) -> None:
+        self.patterns = None
+        self.predicate = predicate
+
+        if patterns is not None:
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            self.patterns = []
+            for pattern in patterns:
+                parts = tuple(
+                    part
+                    for part in pattern.replace("\\", "/").lower().split("/")
+                    if part not in ("", ".")
+                )
+                if len(parts) == 1 and parts[0] != "**":
+                    parts = ("**",) + parts
+                self.patterns.append(parts)
+
+    def __bool__(self) -> bool:
+        return self.patterns is not None or self.predicate is not None
+
+    def matchDirectory(self, path: str) -> bool:
+        """Whether anything below the directory at path could still be selected"""
+        if self.patterns is not None:
+            parts = splitPath(path)
+            if not any(
+                canDescend(pattern, parts) or matchesAncestor(pattern, parts)
+                for pattern in self.patterns
+            ):
+                return False
+
+        if self.predicate is not None and not self.predicate(path, True):
+            return False
+
+        return True
+
+    def matchFile(self, path: str) -> bool:
+        if self.patterns is not None:
+            parts = splitPath(path)
+            if not any(matchesAncestor(pattern, parts) for pattern in self.patterns):
+                return False
+
+        if self.predicate is not None and not self.predicate(path, False):
+            return False
+
+        return True
+
+
+def splitPath(path: str) -> tuple:
+    return tuple(part for part in path.lower().split("/") if part != "")
+
+
+def fullMatch(pattern: tuple, parts: tuple) -> bool:
+    if not pattern:
+        return not parts
+
+    if pattern[0] == "**":
+        return any(fullMatch(pattern[1:], parts[i:]) for i in range(len(parts) + 1))
+
+    return (
+        len(parts) > 0
+        and fnmatchcase(parts[0], pattern[0])
+        and fullMatch(pattern[1:], parts[1:])
+    )
+
+
+def matchesAncestor(pattern: tuple, parts: tuple) -> bool:
+    # The path itself or one of the directories containing it matches
+    return any(fullMatch(pattern, parts[:i]) for i in range(1, len(parts) + 1))
+
+
+def canDescend(pattern: tuple, parts: tuple) -> bool:
+    # Could a path below the directory "parts" match the pattern?
+    if not pattern:
+        return False
+
+    if pattern[0] == "**" or not parts:
+        return True
+
+    return fnmatchcase(parts[0], pattern[0]) and canDescend(pattern[1:], parts[1:])
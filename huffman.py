@@ -493,7 +493,9 @@ def huffman_Encode(src, srcSize, dest=None) -> tuple:
     return (dest, pressSizeCounter + headSize)
 
 
-def huffman_Decode(press, dest=None) -> tuple:
+def huffman_Decode(press, dest=None, limit=None) -> tuple:
+    # limit: only decode the first limit bytes (everything if None)
+    # dest is replaced by a new buffer when it's too small
     # 結合データと数値データ、０～２５５までが数値データ
     node = [HUFFMAN_NODE() for _ in range(256 + 255)]
 
@@ -740,7 +742,7 @@ def huffman_Decode(press, dest=None) -> tuple:
 
         # Byte shifting ????
 
-        pressData = pressPoint[headSize:]
+        pressData = memoryview(pressPoint)[headSize:]  # No copy of the data
 
         # 解凍したデータの格納アドレスを初期化
         destSizeCounter = 0
@@ -756,7 +758,12 @@ def huffman_Decode(press, dest=None) -> tuple:
 
         # 圧縮前のデータサイズになるまで解凍処理を繰り返す
 
-        for destSizeCounter in range(destSize):
+        # Stop early when only the beginning is wanted
+        decodeSize = destSize if limit is None else min(destSize, limit)
+        if len(destPoint) < decodeSize:
+            destPoint = bytearray(decodeSize)
+
+        for destSizeCounter in range(decodeSize):
             # ビット列から数値データを検索する
             # 最後の17byte分のデータは天辺から探す( 最後の次のバイトを読み出そうとしてメモリの不正なアクセスになる可能性があるため )
             if destSizeCounter >= destSize - 17:
@@ -0,0 +1,90 @@
+# Encodings tried, in order, when looking up a name with find()
+SEARCH_ENCODINGS = ("cp932", "utf8")
+
+
+def isShiftJISLeadByte(byte: int) -> bool:
+    return 0x81 <= byte <= 0x9F or 0xE0 <= byte <= 0xFC
+
+
+def getSearchName(path: str, encoding: str) -> bytes:
+    """
+    Convert path to the form of the uppercased names of the name table,
+    like DXLib's ConvSearchData: only ASCII letters are uppercased and the
+    second byte of Shift-JIS characters is left untouched.
+    Raises UnicodeEncodeError if path can't be represented in encoding.
+    """
+    parts = [
+        part for part in path.replace("\\", "/").split("/") if part not in ("", ".")
+    ]
+    encoded = "/".join(parts).encode(encoding)
+
+    if encoding != "cp932":
+        return encoded.upper()
+
+    searchName = bytearray(encoded)
+    i = 0
+    while i < len(searchName):
+        if isShiftJISLeadByte(searchName[i]):
+            i += 2
+            continue
+        if 0x61 <= searchName[i] <= 0x7A:
+            searchName[i] -= 0x20
+        i += 1
+    return bytes(searchName)
+
+
+class ArchiveIndex:
+    """
+    Lookup tables over the files listed by loadArchive, built once:
+        files: name -> ArchivedFile
+        directories: directory name -> {entry name: is it a directory}
+        searchNames: uppercased name table path -> ArchivedFile, for find()
+    Names are the "/" separated paths inside the archive, the root directory is "".
+    """
+
+    def __init__(self, archivedFiles: list = None) -> None:
+        self.files = {}
+        self.directories = {"": {}}
+        self.searchNames = {}
+
+        for archivedFile in archivedFiles or []:
+            self.add(archivedFile)
+
+    def add(self, archivedFile) -> None:
+        self.files[archivedFile.name] = archivedFile
+        self.searchNames[archivedFile.searchName] = archivedFile
+
+        parts = archivedFile.name.split("/")
+        parent = ""
+        for part in parts[:-1]:
+            directory = f"{parent}/{part}" if parent else part
+            if directory not in self.directories:
+                self.directories[directory] = {}
+                self.directories[parent][part] = True
+            parent = directory
+
+        self.directories[parent][parts[-1]] = False
+
+    def find(self, path: str):
+        """
+        Case-insensitive lookup, the way the game engine resolves paths.
+        Names are never decoded: path is converted to the uppercased form
+        stored in the name table and looked up directly.
+        """
+        for encoding in SEARCH_ENCODINGS:
+            try:
+                searchName = getSearchName(path, encoding)
+            except UnicodeEncodeError:
+                continue
+
+            archivedFile = self.searchNames.get(searchName)
+            if archivedFile is not None:
+                return archivedFile
+
+        return None
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.files
@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+from pathlib import Path
+from time import monotonic
+
+try:
+    from .digest import CRC32, newDigest
+except ImportError:
+    from digest import CRC32, newDigest
+
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_DIGEST = CRC32  # Digest of the output recorded for every file
+SYNC_ENTRIES = 256  # Finished files written to the journal with a single fsync
+SYNC_INTERVAL = 1.0  # Seconds a finished file waits at most before it's synced
+CHECK_CHUNK_SIZE = 0x100000  # Bytes read at a time checking the digest of a file
+
+
+def getJournalPath(archive) -> Path:
+    """
+    Journal of archive, next to the directory it's extracted to rather than
+    inside it: <outputPath>.journal
+    """
+    outputPath = Path(archive.outputPath).resolve()
+    return outputPath.with_name(outputPath.name + JOURNAL_SUFFIX)
+
+
+def getFileDigest(path: Path) -> str:
+    """JOURNAL_DIGEST of the file at path"""
+    digest = newDigest(JOURNAL_DIGEST)
+    with open(path, mode="rb") as fp:
+        while chunk := fp.read(CHECK_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def getArchiveIdentity(archivePath: Path) -> dict:
+    """What tells a journal it was written for this archive"""
+    stat = os.stat(archivePath)
+    return {
+        "archive": Path(archivePath).name,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+
+
+class ExtractionJournal:
+    """
+    Append-only record of the files an extraction finished, so an
+    interrupted one can be resumed: a JSON line identifying the archive,
+    then one JSON line per file with its dataStart, dataSize, the size and
+    modification time of its output and the JOURNAL_DIGEST of what was written.
+    A file is done when its output still has that size and time, with
+    verify its digest is checked too (reading every file done again).
+    Files are only recorded once they have their final name (see
+    OutputSink's atomic writes), entries are written and fsynced
+    SYNC_ENTRIES at a time, or after SYNC_INTERVAL seconds. Entries lost
+    in a crash only mean their files are extracted again.
+    A journal written for another archive, or another version of it
+    (size or modification time), is started over. It's removed once
+    the extraction is finished (see finish).
+    """
+
+    def __init__(self, path: Path, identity: dict, verify: bool = False) -> None:
+        self.path = Path(path)
+        self.identity = identity
+        self.verify = verify
+        self.done = {}  # name: (dataStart, dataSize, size, mtime, digest)
+        self.lines = []  # Entries not written yet
+        self.lock = threading.Lock()  # Files are finished by several threads
+        self.lastSync = monotonic()
+
+        self.load()
+        self.rewrite()
+        self.fp = open(self.path, mode="a", encoding="utf-8")
+
+    @classmethod
+    def open(cls, archive, verify: bool = False):
+        """Journal of a loaded archive, see getJournalPath"""
+        return cls(
+            getJournalPath(archive), getArchiveIdentity(archive.archivePath), verify
+        )
+
+    def load(self) -> None:
+        try:
+            with open(self.path, mode="r", encoding="utf-8") as fp:
+                lines = fp.read().splitlines()
+        except FileNotFoundError:
+            return
+
+        if not lines or self.parse(lines[0]) != self.identity:
+            return
+
+        for line in lines[1:]:
+            entry = self.parse(line)
+            try:
+                self.done[entry["name"]] = (
+                    entry["dataStart"],
+                    entry["dataSize"],
+                    entry["size"],
+                    entry["mtime"],
+                    entry["digest"],
+                )
+            except (KeyError, TypeError):
+                # Cut short by a crash
+                continue
+
+    def parse(self, line: str) -> dict | None:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None
+        return entry if isinstance(entry, dict) else None
+
+    def getLine(
+        self,
+        name: str,
+        dataStart: int,
+        dataSize: int,
+        size: int,
+        mtime: int,
+        digest: str,
+    ) -> str:
+        entry = {
+            "name": name,
+            "dataStart": dataStart,
+            "dataSize": dataSize,
+            "size": size,
+            "mtime": mtime,
+            "digest": digest,
+        }
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def rewrite(self) -> None:
+        """
+        Replace the journal by the header and the entries loaded, compacted
+        and without a torn last line to append after
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partialPath = self.path.with_name(self.path.name + ".tmp")
+        with open(partialPath, mode="w", encoding="utf-8") as fp:
+            fp.write(json.dumps(self.identity) + "\n")
+            for name, entry in self.done.items():
+                fp.write(self.getLine(name, *entry))
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(partialPath, self.path)
+
+    def isDone(self, archivedFile) -> bool:
+        """
+        Was archivedFile extracted, and is its file still there as written:
+        same size and modification time, and same digest with verify
+        """
+        entry = self.done.get(archivedFile.name)
+        if entry is None:
+            return False
+        (dataStart, dataSize, size, mtime, digest) = entry
+        if (dataStart, dataSize) != (archivedFile.dataStart, archivedFile.dataSize):
+            return False
+        try:
+            stat = archivedFile.filePath.stat()
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime):
+                return False
+            if self.verify:
+                return digest is not None and (
+                    getFileDigest(archivedFile.filePath) == digest
+                )
+            return True
+        except OSError:
+            return False
+
+    def getUnfinished(self, archivedFiles: list) -> list:
+        return [
+            archivedFile
+            for archivedFile in archivedFiles
+            if not self.isDone(archivedFile)
+        ]
+
+    def record(self, archivedFile) -> None:
+        """archivedFile was written under its final name, with its digests and times"""
+        stat = archivedFile.filePath.stat()
+        entry = (
+            archivedFile.dataStart,
+            archivedFile.dataSize,
+            stat.st_size,
+            stat.st_mtime_ns,
+            (archivedFile.digests or {}).get(JOURNAL_DIGEST),
+        )
+        line = self.getLine(archivedFile.name, *entry)
+        with self.lock:
+            self.done[archivedFile.name] = entry
+            self.lines.append(line)
+            if (
+                len(self.lines) >= SYNC_ENTRIES
+                or monotonic() - self.lastSync >= SYNC_INTERVAL
+            ):
+                self.sync()
+
+    def sync(self) -> None:
+        """Write and fsync the entries waiting, the caller holds self.lock"""
+        if self.lines:
+            self.fp.write("".join(self.lines))
+            self.lines = []
+            self.fp.flush()
+            os.fsync(self.fp.fileno())
+        self.lastSync = monotonic()
+
+    def close(self) -> None:
+        with self.lock:
+            self.sync()
+        self.fp.close()
+
+    def finish(self) -> None:
+        """Every file was extracted, the journal isn't needed anymore"""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
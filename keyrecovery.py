@@ -0,0 +1,355 @@
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+
+try:
+    from .nametable import getEntries
+except ImportError:
+    from nametable import getEntries
+
+KEY_LENGTH = 12  # DXA_KEY_STRING_LENGTH of Ver0x0005 and Ver0x0006
+MIN_SCORE = 0.9  # Lowest score (see scoreKey) of a key taken as the right one
+FINGERPRINT_SIZE = 4096  # Bytes hashed at each end of an archive for its fingerprint
+DXA_HEAD = 0x5844  # "DX"
+FILE_ATTRIBUTE_DIRECTORY = 0x10
+
+# Fields of DARC_HEAD, in order
+(
+    HEAD,
+    VERSION,
+    HEAD_SIZE,
+    DATA_START,
+    NAME_TABLE,
+    FILE_TABLE,
+    DIRECTORY_TABLE,
+    CHAR_CODE,
+) = range(8)
+
+
+class HeaderLayout:
+    """
+    How a family of archive versions lays out what keyConv encrypts:
+        format: struct format of DARC_HEAD
+        versions: versions it's used for
+        dataStarts: usual dataStartAddress values, the size of the header
+        tableKeyVersion: from this version on the name, file and directory
+            tables are XORed from key position 0, before from their position
+            in the archive
+        addressFormat: struct format of an address in the tables
+    """
+
+    def __init__(
+        self,
+        name: str,
+        format: str,
+        versions,
+        dataStarts,
+        tableKeyVersion: int,
+        addressFormat: str,
+    ) -> None:
+        self.name = name
+        self.format = format
+        self.size = struct.calcsize(format)
+        self.versions = tuple(versions)
+        self.dataStarts = tuple(dataStarts)
+        self.tableKeyVersion = tableKeyVersion
+        self.addressFormat = addressFormat
+        self.noAddress = (1 << (8 * struct.calcsize(addressFormat))) - 1
+
+        # (offset, struct format) of every field
+        self.fields = []
+        offset = 0
+        for code in format[1:]:
+            self.fields.append((offset, "<" + code))
+            offset += struct.calcsize(code)
+
+    def getTablePosition(self, version: int, nameTableStart: int) -> int:
+        """Key position the tables start being XORed at"""
+        return 0 if version >= self.tableKeyVersion else nameTableStart
+
+
+VER5_LAYOUT = HeaderLayout("Ver0x0005", "<HHIIIIII", range(1, 6), (24, 28), 5, "<I")
+VER6_LAYOUT = HeaderLayout("Ver0x0006", "<HHIQQQQQ", (6,), (48,), 6, "<Q")
+
+
+def xorKey(data: bytes, key: bytes, position: int) -> bytes:
+    """
+    data XORed with key repeating from key position position, like keyConv
+    but as a single operation on big integers instead of byte by byte
+    """
+    size = len(data)
+    if size == 0:
+        return b""
+    position %= KEY_LENGTH
+    repeats = (position + size) // KEY_LENGTH + 1
+    stream = (bytes(key) * repeats)[position : position + size]
+    value = int.from_bytes(data, "little") ^ int.from_bytes(stream, "little")
+    return value.to_bytes(size, "little")
+
+
+class KnownKey:
+    """Key bytes learnt from known plaintext, contradicting bytes invalidate it"""
+
+    def __init__(self) -> None:
+        self.key = [None] * KEY_LENGTH
+        self.valid = True
+
+    def learn(self, encrypted: bytes, plain: bytes, position: int) -> None:
+        """encrypted is plain XORed from key position position"""
+        if len(encrypted) < len(plain):
+            self.valid = False
+            return
+        for i, byte in enumerate(plain):
+            j = (position + i) % KEY_LENGTH
+            keyByte = encrypted[i] ^ byte
+            if self.key[j] is None:
+                self.key[j] = keyByte
+            elif self.key[j] != keyByte:
+                self.valid = False
+
+    def decrypt(self, encrypted: bytes, position: int) -> bytes | None:
+        """encrypted XORed from key position position, None without the key bytes"""
+        stream = [self.key[(position + i) % KEY_LENGTH] for i in range(len(encrypted))]
+        if None in stream:
+            return None
+        return bytes(byte ^ keyByte for byte, keyByte in zip(encrypted, stream))
+
+    def isComplete(self) -> bool:
+        return self.valid and None not in self.key
+
+
+class HeaderSolver:
+    """Candidate keys of one archive, from what's known of its header and tables"""
+
+    def __init__(self, fp, layout: HeaderLayout) -> None:
+        self.fp = fp
+        self.layout = layout
+        fp.seek(0, os.SEEK_END)
+        self.fileSize = fp.tell()
+        fp.seek(0, os.SEEK_SET)
+        self.encrypted = fp.read(layout.size)
+        self.tables = {}  # (start, size): encrypted bytes, shared by the candidates
+
+    def readAt(self, offset: int, size: int) -> bytes:
+        if (offset, size) not in self.tables:
+            self.fp.seek(offset, os.SEEK_SET)
+            self.tables[(offset, size)] = self.fp.read(size)
+        return self.tables[(offset, size)]
+
+    def learnField(self, known: KnownKey, field: int, value: int) -> None:
+        (offset, format) = self.layout.fields[field]
+        plain = struct.pack(format, value)
+        known.learn(self.encrypted[offset : offset + len(plain)], plain, offset)
+
+    def getField(self, known: KnownKey, field: int) -> int | None:
+        (offset, format) = self.layout.fields[field]
+        size = struct.calcsize(format)
+        plain = known.decrypt(self.encrypted[offset : offset + size], offset)
+        return None if plain is None else struct.unpack(format, plain)[0]
+
+    def getCandidates(self) -> list:
+        """
+        Keys consistent with: the "DX" magic, a version of the layout, a usual
+        dataStartAddress (or none assumed), the high half of 64 bit addresses
+        being 0, the tables ending the archive (fileNameTableStartAddress +
+        headSize is its size), the empty root entry starting the name table
+        and the root directory heading the file table
+        """
+        layout = self.layout
+        if len(self.encrypted) < layout.size:
+            return []
+
+        candidates = []
+        for version in layout.versions:
+            for dataStart in layout.dataStarts + (None,):
+                known = KnownKey()
+                self.learnField(known, HEAD, DXA_HEAD)
+                self.learnField(known, VERSION, version)
+                if dataStart is not None:
+                    self.learnField(known, DATA_START, dataStart)
+                for offset, format in layout.fields[DATA_START:]:
+                    if format == "<Q":
+                        # Archives are smaller than 4GB
+                        high = self.encrypted[offset + 4 : offset + 8]
+                        known.learn(high, bytes(4), offset + 4)
+
+                nameTableStart = self.getField(known, NAME_TABLE)
+                if nameTableStart is None or not 0 < nameTableStart < self.fileSize:
+                    continue
+                headSize = self.fileSize - nameTableStart
+                self.learnField(known, HEAD_SIZE, headSize)
+
+                # The tables only fill in what the header leaves unknown, the
+                # scoring checks them anyway
+                position = layout.getTablePosition(version, nameTableStart)
+                if not known.isComplete():
+                    empty = struct.pack("<HH", 0, 0)
+                    known.learn(
+                        self.readAt(nameTableStart, len(empty)), empty, position
+                    )
+
+                fileTableStart = self.getField(known, FILE_TABLE)
+                if (
+                    not known.isComplete()
+                    and fileTableStart is not None
+                    and 0 < fileTableStart < headSize
+                ):
+                    root = struct.pack(
+                        "<" + layout.addressFormat[1] * 2, 0, FILE_ATTRIBUTE_DIRECTORY
+                    )
+                    known.learn(
+                        self.readAt(nameTableStart + fileTableStart, len(root)),
+                        root,
+                        position + fileTableStart,
+                    )
+
+                if known.isComplete() and bytes(known.key) not in candidates:
+                    candidates.append(bytes(known.key))
+
+        return candidates
+
+    def scoreKey(self, key: bytes) -> float:
+        """
+        0 if the header doesn't make sense decrypted with key, otherwise up to 1
+        by how well the tables parse: parities of the name table entries,
+        entries ending right where the file table starts, the root directory
+        """
+        layout = self.layout
+        (
+            head,
+            version,
+            headSize,
+            dataStart,
+            nameTableStart,
+            fileTableStart,
+            directoryTableStart,
+            _,
+        ) = struct.unpack(layout.format, xorKey(self.encrypted, key, 0))
+        if (
+            head != DXA_HEAD
+            or version not in layout.versions
+            or nameTableStart + headSize != self.fileSize
+            or not 0 < fileTableStart <= directoryTableStart < headSize
+            or dataStart > nameTableStart
+        ):
+            return 0.0
+
+        table = xorKey(
+            self.readAt(nameTableStart, headSize),
+            key,
+            layout.getTablePosition(version, nameTableStart),
+        )
+        entries = getEntries(table, fileTableStart)
+        if not entries:
+            return 0.0
+
+        # The parity of an entry is the sum of the bytes of its uppercased name
+        parities = 0
+        for address, start, _ in entries:
+            parity = table[address + 2] | (table[address + 3] << 8)
+            if sum(table[address + 4 : start]) & 0xFFFF == parity:
+                parities += 1
+
+        directoryFormat = "<" + layout.addressFormat[1] * 2
+        root = None
+        if directoryTableStart + struct.calcsize(directoryFormat) <= len(table):
+            root = struct.unpack_from(directoryFormat, table, directoryTableStart)
+        return (
+            0.6 * parities / len(entries)
+            + 0.2 * (entries[-1][2] == fileTableStart)
+            + 0.2 * (root == (0, layout.noAddress))
+        )
+
+
+def getFingerprint(fp) -> str:
+    """sha256 of the size and both ends of an archive"""
+    fp.seek(0, os.SEEK_END)
+    size = fp.tell()
+    hasher = hashlib.sha256(str(size).encode())
+    fp.seek(0, os.SEEK_SET)
+    hasher.update(fp.read(FINGERPRINT_SIZE))
+    fp.seek(max(0, size - FINGERPRINT_SIZE), os.SEEK_SET)
+    hasher.update(fp.read(FINGERPRINT_SIZE))
+    return hasher.hexdigest()
+
+
+def getDefaultCachePath() -> Path:
+    cacheHome = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cacheHome) / "wolf_rpg_decompyler" / "keys.json"
+
+
+class KeyCache:
+    """
+    Recovered key strings by layout and archive fingerprint, kept in a
+    JSON file when there's a path (see getDefaultCachePath), in memory otherwise
+    """
+
+    def __init__(self, path: Path = None) -> None:
+        self.path = None if path is None else Path(path)
+        self.keys = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path, mode="r", encoding="utf8") as cacheFile:
+                self.keys = json.load(cacheFile)
+
+    def get(self, name: str) -> bytearray | None:
+        keyString = self.keys.get(name)
+        return None if keyString is None else bytearray.fromhex(keyString)
+
+    def put(self, name: str, keyString: bytearray) -> None:
+        self.keys[name] = bytes(keyString).hex()
+        if self.path is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporaryPath = self.path.with_name(self.path.name + ".tmp")
+        with open(temporaryPath, mode="w", encoding="utf8") as cacheFile:
+            json.dump(self.keys, cacheFile, sort_keys=True)
+        os.replace(temporaryPath, self.path)
+
+
+def invertKeyCreate(archive, key: bytes) -> bytearray:
+    """
+    Key string archive.keyCreate turns into key. keyCreate changes every
+    byte on its own, so it's inverted byte by byte with lookup tables.
+    """
+    tables = [{} for _ in range(KEY_LENGTH)]
+    for byte in range(256):
+        source = bytearray([byte] * KEY_LENGTH)
+        created = archive.keyCreate(source, bytearray(KEY_LENGTH))
+        for i in range(KEY_LENGTH):
+            tables[i][created[i]] = byte
+    return bytearray(tables[i][key[i]] for i in range(KEY_LENGTH))
+
+
+def recoverKey(
+    archive, archivePath: Path, layout: HeaderLayout, cache: KeyCache = None
+) -> bytearray | None:
+    """
+    Key string for archive.loadArchive of an archive made with an unknown
+    key, None if no key decrypts its header and tables well enough.
+    Candidate keys come from the known plaintext (see HeaderSolver.getCandidates)
+    and are scored decrypting the whole tables at once, the best one
+    scoring at least MIN_SCORE is kept in cache.
+    """
+    with open(archivePath, mode="rb") as fp:
+        name = f"{layout.name}:{getFingerprint(fp)}"
+        if cache is not None:
+            keyString = cache.get(name)
+            if keyString is not None:
+                return keyString
+
+        solver = HeaderSolver(fp, layout)
+        (score, key) = max(
+            ((solver.scoreKey(key), key) for key in solver.getCandidates()),
+            default=(0.0, None),
+        )
+
+    if score < MIN_SCORE:
+        return None
+
+    keyString = invertKeyCreate(archive, key)
+    if cache is not None:
+        cache.put(name, keyString)
+    return keyString
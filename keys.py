@@ -0,0 +1,9 @@
+# Key strings of the archives made by each WOLF RPG Editor version
+key_1_01_2_02 = bytearray(
+    [0x0F, 0x53, 0xE1, 0x3E, 0x04, 0x37, 0x12, 0x17, 0x60, 0x0F, 0x53, 0xE1]
+)
+key_2_10 = bytearray(
+    [0x4C, 0xD9, 0x2A, 0xB7, 0x28, 0x9B, 0xAC, 0x07, 0x3E, 0x77, 0xEC, 0x4C]
+)
+key_2_20_2_24 = bytearray(b"8P@(rO!p;s58")
+key_2_25_2_81 = bytearray(b"WLFRPrO!p(;s5((8P@((UFWlu$#5(=")
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+try:
+    from .schedule import planReads, readGroup
+    from .sink import BUFFERED_FILE_SIZE
+except ImportError:
+    from schedule import planReads, readGroup
+    from sink import BUFFERED_FILE_SIZE
+
+MANIFEST_SUFFIX = ".manifest"
+HASH_CHUNK_SIZE = 1024 * 1024  # Stored bytes hashed at once for large files
+
+
+def hashStored(fp, archivedFile, source) -> tuple:
+    """
+    sha256 of the bytes archivedFile takes in the archive, and those bytes when small.
+    They're taken from source (see schedule.readGroup) when there's one, read from fp otherwise.
+    """
+    if source is not None:
+        start = archivedFile.dataStart - source.base
+        stored = source.data[start : start + archivedFile.storedSize]
+        return (hashlib.sha256(stored).hexdigest(), stored)
+
+    fp.seek(archivedFile.dataStart, os.SEEK_SET)
+    if archivedFile.storedSize <= BUFFERED_FILE_SIZE:
+        stored = fp.read(archivedFile.storedSize)
+        return (hashlib.sha256(stored).hexdigest(), stored)
+
+    hasher = hashlib.sha256()
+    left = archivedFile.storedSize
+    while left > 0:
+        chunk = fp.read(min(left, HASH_CHUNK_SIZE))
+        if not chunk:
+            break
+        hasher.update(chunk)
+        left -= len(chunk)
+    return (hasher.hexdigest(), None)
+
+
+def getEntryKey(archive, archivedFile, storedDigest: str) -> str:
+    """
+    What archivedFile looks like in the archive: dataSize, pressDataSize,
+    huffPressDataSize, sha256 of the stored bytes, key and key phase (the
+    same bytes decrypt differently with another key). Files with the same
+    entry key decode to the same contents.
+    """
+    key = "" if archivedFile.key is None else bytes(archivedFile.key).hex()
+    return (
+        f"{archivedFile.dataSize}:{archivedFile.pressDataSize}:"
+        f"{archivedFile.huffPressDataSize}:{storedDigest}:"
+        f"{key}:{archive.getKeyPhase(archivedFile)}"
+    )
+
+
+def getManifestPath(outputPath: Path) -> Path:
+    """
+    Manifest of the directory outputPath, next to it rather than inside it:
+    <outputPath>.manifest. It's the same for every archive extracted there.
+    """
+    outputPath = Path(outputPath).resolve()
+    return outputPath.with_name(outputPath.name + MANIFEST_SUFFIX)
+
+
+class ManifestDiff:
+    """What changed in an archive since the manifest was saved"""
+
+    def __init__(self) -> None:
+        self.added = []  # ArchivedFiles not in the manifest
+        self.changed = []  # ArchivedFiles with another entry key, or missing on disk
+        self.removed = []  # Names in the manifest only
+        self.unchanged = 0
+        self.entries = {}  # name: entry key of every file of the archive
+
+    @property
+    def extracted(self) -> list:
+        return self.added + self.changed
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed, {self.unchanged} unchanged"
+        )
+
+
+class ExtractionManifest:
+    """
+    Entry key (see getEntryKey) of every file extracted into the directory
+    outputPath, saved to path once an extraction is complete. Comparing an
+    archive with it only reads and hashes the stored bytes, so a new
+    version of the archive is extracted again by decoding only the files
+    that changed, whatever the archive is called.
+    """
+
+    def __init__(self, path: Path, outputPath: Path) -> None:
+        self.path = Path(path)
+        self.outputPath = Path(outputPath)
+        self.entries = {}
+
+        if self.path.exists():
+            with open(self.path, mode="r", encoding="utf8") as manifestFile:
+                self.entries = json.load(manifestFile)
+
+    @classmethod
+    def open(cls, archive):
+        """Manifest of the directory a loaded archive is extracted to"""
+        return cls(getManifestPath(archive.outputPath), archive.outputPath)
+
+    def diff(
+        self, archive, archivedFiles: list = None, names=None
+    ) -> ManifestDiff:
+        """
+        Compare archivedFiles (every file loaded by default) with the manifest.
+        Files whose output is gone, or isn't dataSize long anymore, count as changed.
+        names are the names of every file of the archive, those of
+        archivedFiles by default: only manifest entries missing from them
+        are removed, the others outside archivedFiles are kept as they are.
+        """
+        if archivedFiles is None:
+            archivedFiles = archive.archivedFiles
+
+        diff = ManifestDiff()
+        for group in planReads(archivedFiles):
+            source = readGroup(archive.fp, group)
+            for archivedFile in group.files:
+                (storedDigest, _) = hashStored(archive.fp, archivedFile, source)
+                entryKey = getEntryKey(archive, archivedFile, storedDigest)
+                diff.entries[archivedFile.name] = entryKey
+
+                previous = self.entries.get(archivedFile.name)
+                if previous is None:
+                    diff.added.append(archivedFile)
+                elif previous != entryKey or not self.isPresent(archivedFile):
+                    diff.changed.append(archivedFile)
+                else:
+                    diff.unchanged += 1
+
+        names = set(diff.entries) if names is None else set(names)
+        diff.removed = sorted(set(self.entries) - names)
+        for name in names - set(diff.entries):
+            # Left out by a filter, still in the archive
+            if name in self.entries:
+                diff.entries[name] = self.entries[name]
+        return diff
+
+    def isPresent(self, archivedFile) -> bool:
+        try:
+            return archivedFile.filePath.stat().st_size == archivedFile.dataSize
+        except OSError:
+            return False
+
+    def apply(self, diff: ManifestDiff) -> None:
+        """
+        Once the added and changed files of diff are extracted: delete the
+        removed ones (and the directories they leave empty) and save diff's
+        entries as the manifest.
+        Raises ValueError, before deleting anything, if a removed name
+        points outside outputPath.
+        """
+        outputPath = self.outputPath.resolve()
+        filePaths = [self.getFilePath(outputPath, name) for name in diff.removed]
+        for filePath in filePaths:
+            filePath.unlink(missing_ok=True)
+
+            parent = filePath.parent
+            while parent != outputPath and outputPath in parent.parents:
+                try:
+                    parent.rmdir()
+                except OSError:
+                    # Not empty
+                    break
+                parent = parent.parent
+
+        self.entries = diff.entries
+        self.save()
+
+    def getFilePath(self, outputPath: Path, name: str) -> Path:
+        """
+        Where the file name of the archive is under the resolved outputPath,
+        without following a link the file itself may be
+        """
+        filePath = outputPath / name
+        filePath = filePath.parent.resolve() / filePath.name
+        if filePath.name in ("", ".", "..") or outputPath not in filePath.parents:
+            raise ValueError(f"{name} is outside of {outputPath}")
+        return filePath
+
+    def save(self) -> None:
+        """Write the manifest, replacing the previous one only once it's complete"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporaryPath = self.path.with_name(self.path.name + ".tmp")
+        with open(temporaryPath, mode="w", encoding="utf8") as manifestFile:
+            json.dump(self.entries, manifestFile, sort_keys=True, ensure_ascii=False)
+        os.replace(temporaryPath, self.path)
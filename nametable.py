@@ -0,0 +1,87 @@
+import codecs
+import sys
+
+# Encodings tried, in order, when the archive doesn't say which one it uses
+FALLBACK_ENCODINGS = ("utf8", "cp932")
+
+
+def getEncoding(charCodeFormat) -> str | None:
+    """Python codec for a DARC_HEAD.charCodeFormat code page number, None if unknown"""
+    if not charCodeFormat or charCodeFormat > 0xFFFF:
+        return None
+
+    try:
+        return codecs.lookup(f"cp{charCodeFormat}").name
+    except LookupError:
+        return None
+
+
+def getEntries(nameTable, size: int) -> list | None:
+    """
+    (nameAddress, start, end) of the original name of every entry.
+    Entries are:
+        u16 length of each name in 4 byte units
+        u16 parity
+        uppercased name
+        original name
+    None if the table doesn't parse.
+    """
+    entries = []
+    address = 0
+    while address + 4 <= size:
+        length = (nameTable[address] | (nameTable[address + 1] << 8)) * 4
+        start = address + 4 + length
+        end = start + length
+        if end > size:
+            return None
+        entries.append((address, start, end))
+        address = end
+    return entries
+
+
+def readString(table, start: int, size: int) -> bytes:
+    """
+    NUL terminated string at start of table, at most size bytes.
+    Only those bytes are copied, table can be a memoryview of the whole header.
+    """
+    data = bytes(table[start : start + size])
+    end = data.find(0)
+    return data if end < 0 else data[:end]
+
+
+def decodeNameTable(nameTable, size: int, encoding: str = None) -> dict:
+    """
+    Decode every name of the name table at once.
+    Returns nameAddress -> name, names are interned so every copy shares one string.
+    """
+    entries = getEntries(nameTable, size)
+    if entries is None:
+        return {}
+
+    table = bytes(nameTable[:size])
+    rawNames = [table[start:end].split(b"\0", 1)[0] for (_, start, end) in entries]
+    # Names never contain NUL, so the whole table can go through the codec in one call
+    joined = b"\0".join(rawNames)
+
+    decoded = None
+    for candidate in [encoding] if encoding is not None else FALLBACK_ENCODINGS:
+        try:
+            decoded = joined.decode(candidate)
+            break
+        except UnicodeDecodeError:
+            continue
+
+    if decoded is None:
+        # Mixed encodings, decide name by name like getOriginalFileName
+        names = []
+        for rawName in rawNames:
+            try:
+                names.append(rawName.decode("utf8"))
+            except UnicodeDecodeError:
+                names.append(rawName.decode("cp932", errors="replace"))
+    else:
+        names = decoded.split("\0")
+
+    return {
+        address: sys.intern(name) for (address, _, _), name in zip(entries, names)
+    }
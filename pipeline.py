@@ -0,0 +1,407 @@
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+try:
+    from .schedule import ReadGroup, SpanReader, adviseGroups, planReads
+    from .sink import OutputSink
+    from .transport import SLOT_SIZE, SLOTS_PER_WORKER, SharedIndex, SlotPool
+except ImportError:
+    from schedule import ReadGroup, SpanReader, adviseGroups, planReads
+    from sink import OutputSink
+    from transport import SLOT_SIZE, SLOTS_PER_WORKER, SharedIndex, SlotPool
+
+PREFETCH_GROUPS = 4  # Read groups waiting for the decoder
+PREFETCH_SIZE = 64 * 1024 * 1024  # Larger groups aren't prefetched, the decoder streams them
+WRITE_QUEUE = 8  # Decoded files waiting for the writer
+DECODES_PER_WORKER = 2  # Files sent to each worker process at once
+POLL_INTERVAL = 0.1  # Seconds between checks for a failure in another thread
+
+
+class PipelineStopped(Exception):
+    """Raised in a stage when another one failed"""
+
+
+# Archive of each worker process, set up by initSharedWorker
+workerArchive = None
+workerIndex = None
+# Shared output slots of each worker process, see initSharedWorker
+workerSlots = None
+workerSlotSize = 0
+
+
+def initSharedWorker(
+    archiveClass, archivePath, indexName: str, slotsName: str, slotSize: int, poolLimit
+) -> None:
+    """
+    Set up a worker from the parent's transport.SharedIndex instead of
+    loading the archive: the worker reads the stored bytes of its files
+    itself and decodes them into the shared slots.
+    """
+    global workerArchive, workerIndex, workerSlots, workerSlotSize
+    workerIndex = SharedIndex.open(indexName)
+    workerArchive = archiveClass()
+    workerArchive.archiveHead = workerIndex.head
+    workerArchive.chunkSize = workerIndex.chunkSize
+    workerArchive.fp = open(archivePath, mode="rb")
+    workerSlots = shared_memory.SharedMemory(name=slotsName)
+    workerSlotSize = slotSize
+    if poolLimit is not None:
+        workerArchive.pool.setLimit(poolLimit)
+
+
+def decodeToSlot(number: int, slot: int) -> int:
+    """Decode file number of the shared index into slot, returns its size"""
+    entry = workerIndex.getEntry(number)
+    pool = workerArchive.pool
+    start = slot * workerSlotSize
+    position = 0
+
+    with workerSlots.buf[start : start + entry.dataSize] as view:
+
+        def write(data) -> None:
+            nonlocal position
+            view[position : position + len(data)] = data
+            position += len(data)
+            pool.give(data)
+
+        workerArchive.decodeFile(entry, write, pool=pool)
+
+    return position
+
+
+class PipelinedExtractor:
+    """
+    Extracts files with three stages running at the same time:
+        a reader thread reading the next groups (see schedule.planReads) into a bounded queue
+        the calling thread decoding them, or a pool of workers processes when workers > 0
+        a writer thread writing decoded files through sink
+    so reading and writing happen while the CPU decodes.
+    Workers get the files from a transport.SharedIndex, read them from the
+    archive themselves and decode them into a transport.SlotPool the writer
+    writes from, nothing but file and slot numbers is pickled.
+    With a budget (see budget.MemoryBudget), the reader only reads files
+    admitted by it, and they hold their part of it until they're written.
+    """
+
+    def __init__(self, archive, workers: int = 0, sink=None, budget=None) -> None:
+        self.archive = archive
+        self.workers = workers
+        self.sink = OutputSink(threads=0) if sink is None else sink
+        self.budget = budget
+        self.readQueue = queue.Queue(PREFETCH_GROUPS)
+        self.writeQueue = queue.Queue(WRITE_QUEUE)
+        self.stop = threading.Event()
+        self.errors = []
+        self.lock = threading.Lock()  # Around the progress reporter
+        self.index = None
+        self.slots = None
+        self.numbers = None  # Number of every file in self.index
+
+    def run(self, archivedFiles: list, reporter) -> None:
+        if self.budget is None:
+            return self.runStages(planReads(archivedFiles), reporter)
+
+        self.budget.check(archivedFiles)
+        archive = self.archive
+        # Free pooled buffers and streamed chunks have to fit in the budget too
+        poolLimit = archive.pool.setLimit(self.budget.poolSize)
+        chunkSize = archive.chunkSize
+        archive.chunkSize = self.budget.streamSize
+        try:
+            self.runStages(self.splitGroups(planReads(archivedFiles)), reporter)
+        finally:
+            archive.pool.setLimit(poolLimit)
+            archive.chunkSize = chunkSize
+
+    def runStages(self, groups: list, reporter) -> None:
+        adviseGroups(self.archive.fp, groups)
+        if self.workers > 0:
+            self.openTransport(groups)
+
+        reader = threading.Thread(
+            target=self.guard, args=(self.readGroups, groups), name="reader"
+        )
+        writer = threading.Thread(
+            target=self.guard, args=(self.writeFiles, reporter), name="writer"
+        )
+        reader.start()
+        writer.start()
+
+        try:
+            if self.workers > 0:
+                self.decodeInPool(reporter)
+            else:
+                self.decode(reporter)
+            self.put(self.writeQueue, None)
+        except BaseException as exception:
+            if not isinstance(exception, PipelineStopped):
+                self.errors.insert(0, exception)
+            self.stop.set()
+        finally:
+            reader.join()
+            writer.join()
+            if self.workers > 0:
+                self.closeTransport()
+
+        if self.errors:
+            raise self.errors[0]
+
+    def openTransport(self, groups: list) -> None:
+        archivedFiles = [
+            archivedFile for group in groups for archivedFile in group.files
+        ]
+        slotSize = SLOT_SIZE
+        if self.budget is not None:
+            slotSize = min(slotSize, self.budget.streamSize)
+
+        self.index = SharedIndex.publish(self.archive, archivedFiles)
+        try:
+            self.slots = SlotPool(self.workers * SLOTS_PER_WORKER, slotSize)
+        except BaseException:
+            self.index.close()
+            raise
+        self.numbers = {
+            archivedFile: number for number, archivedFile in enumerate(archivedFiles)
+        }
+
+    def closeTransport(self) -> None:
+        # Views of files that never reached the writer keep the slots open
+        while True:
+            try:
+                item = self.writeQueue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self.releaseItem(item)
+
+        self.slots.close()
+        self.index.close()
+        self.slots = self.index = self.numbers = None
+
+    def releaseItem(self, item: tuple) -> None:
+        """Give back the slot of a decoded file once it's written (or dropped)"""
+        (_, chunks, _, slot) = item
+        if slot is None:
+            return
+        for chunk in chunks:
+            chunk.release()
+        self.slots.give(slot)
+
+    def guard(self, target, *args) -> None:
+        try:
+            target(*args)
+        except PipelineStopped:
+            pass
+        except BaseException as exception:
+            self.errors.append(exception)
+            self.stop.set()
+
+    def put(self, stageQueue: queue.Queue, item) -> None:
+        while True:
+            if self.stop.is_set():
+                raise PipelineStopped()
+            try:
+                stageQueue.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, stageQueue: queue.Queue):
+        while True:
+            if self.stop.is_set():
+                raise PipelineStopped()
+            try:
+                return stageQueue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def splitGroups(self, groups: list) -> list:
+        """Files of groups too large for the budget, or with streamed files, read one by one"""
+        budget = self.budget
+        split = []
+        for group in groups:
+            files = group.files
+            if len(files) > 1 and (
+                any(budget.streams(archivedFile) for archivedFile in files)
+                or sum(budget.getCost(archivedFile) for archivedFile in files)
+                > budget.size
+            ):
+                split += [ReadGroup(archivedFile, False) for archivedFile in files]
+            else:
+                split.append(group)
+        return split
+
+    def prefetches(self, group) -> bool:
+        """Is group read by the reader thread, instead of file by file by the decoder"""
+        if group.size > PREFETCH_SIZE or self.workers > 0:
+            # Workers read their files themselves
+            return False
+        if self.budget is None:
+            return True
+
+        budget = self.budget
+        if any(budget.streams(archivedFile) for archivedFile in group.files):
+            return False
+        cost = sum(budget.getCost(archivedFile) for archivedFile in group.files)
+        return cost + group.size <= budget.size
+
+    def getCost(self, group) -> int:
+        """Part of the budget group takes from when it's read until its files are written"""
+        cost = sum(self.budget.getCost(archivedFile) for archivedFile in group.files)
+        if self.prefetches(group):
+            cost += group.size
+        return cost
+
+    def release(self, archivedFile) -> None:
+        if self.budget is not None:
+            self.budget.release(self.budget.getCost(archivedFile))
+
+    def releaseSource(self, group, source) -> None:
+        """The read ahead data of group isn't needed anymore"""
+        if self.budget is not None and source is not None:
+            self.budget.release(group.size)
+
+    def readGroups(self, groups: list) -> None:
+        if self.budget is None:
+            admitted = ((group, 0) for group in groups)
+        else:
+            admitted = self.budget.admit(groups, self.getCost, self.stop)
+
+        # Own file object, the decoder keeps using the archive's for large files
+        with open(self.archive.archivePath, mode="rb") as fp:
+            for group, _ in admitted:
+                source = None
+                if self.prefetches(group):
+                    fp.seek(group.start)
+                    source = SpanReader(fp.read(group.size), group.start)
+                self.put(self.readQueue, (group, source))
+
+        self.put(self.readQueue, None)
+
+    def fileStarted(self, archivedFile, reporter) -> None:
+        with self.lock:
+            reporter.fileStarted(archivedFile)
+
+    def extractDirectly(self, archivedFile, reporter) -> None:
+        """Too large to hold in memory, extracted as it's read"""
+        self.archive.extractFile(archivedFile, sink=self.sink)
+        self.release(archivedFile)
+        with self.lock:
+            reporter.fileDone(archivedFile)
+
+    def decode(self, reporter) -> None:
+        while (item := self.get(self.readQueue)) is not None:
+            (group, source) = item
+            for archivedFile in group.files:
+                self.fileStarted(archivedFile, reporter)
+                if source is None:
+                    self.extractDirectly(archivedFile, reporter)
+                    continue
+
+                stats = self.archive.stats
+                record = None if stats is None else stats.beginFile(archivedFile)
+                chunks = []
+                self.archive.decodeFile(archivedFile, chunks.append, record, fp=source)
+                self.put(self.writeQueue, (archivedFile, chunks, record, None))
+
+            self.releaseSource(group, source)
+
+    def decodeInPool(self, reporter) -> None:
+        archive = self.archive
+        slots = self.slots
+        # Buffers kept free by the workers would be outside the budget
+        poolLimit = None if self.budget is None else 0
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=initSharedWorker,
+            initargs=(
+                type(archive),
+                archive.archivePath,
+                self.index.name,
+                slots.name,
+                slots.size,
+                poolLimit,
+            ),
+        ) as executor:
+            pending = {}
+            try:
+                while (item := self.getForwarding(pending)) is not None:
+                    (group, _) = item
+                    for archivedFile in group.files:
+                        self.fileStarted(archivedFile, reporter)
+                        if archivedFile.dataSize > slots.size:
+                            self.extractDirectly(archivedFile, reporter)
+                            continue
+
+                        slot = self.takeSlot(pending)
+                        future = executor.submit(
+                            decodeToSlot, self.numbers[archivedFile], slot
+                        )
+                        pending[future] = (archivedFile, slot)
+
+                        if len(pending) >= self.workers * DECODES_PER_WORKER:
+                            self.forward(pending, FIRST_COMPLETED)
+
+                while pending:
+                    self.forward(pending, FIRST_COMPLETED)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+    def takeSlot(self, pending: dict) -> int:
+        """A free output slot, passing the files the workers finish to the writer meanwhile"""
+        while True:
+            slot = self.slots.take(0 if pending else POLL_INTERVAL)
+            if slot is not None:
+                return slot
+            if self.stop.is_set():
+                raise PipelineStopped()
+            if pending:
+                self.forward(pending, FIRST_COMPLETED, POLL_INTERVAL)
+
+    def getForwarding(self, pending: dict):
+        """
+        Next item of the read queue, passing the files the workers finish to the
+        writer meanwhile (with a budget, the reader may be waiting for them)
+        """
+        while pending:
+            if self.stop.is_set():
+                raise PipelineStopped()
+            try:
+                return self.readQueue.get_nowait()
+            except queue.Empty:
+                self.forward(pending, FIRST_COMPLETED, POLL_INTERVAL)
+
+        return self.get(self.readQueue)
+
+    def forward(self, pending: dict, returnWhen, timeout: float = None) -> None:
+        """Pass the files decoded by the workers to the writer"""
+        done, _ = wait(pending, timeout=timeout, return_when=returnWhen)
+        for future in done:
+            (archivedFile, slot) = pending.pop(future)
+            try:
+                size = future.result()
+            except BaseException:
+                self.slots.give(slot)
+                raise
+            item = (archivedFile, [self.slots.getView(slot, size)], None, slot)
+            try:
+                self.put(self.writeQueue, item)
+            except BaseException:
+                self.releaseItem(item)
+                raise
+
+    def writeFiles(self, reporter) -> None:
+        while (item := self.get(self.writeQueue)) is not None:
+            (archivedFile, chunks, record, _) = item
+            try:
+                self.sink.writeFile(archivedFile, chunks, record)
+            finally:
+                self.releaseItem(item)
+            del chunks, item
+            self.release(archivedFile)
+            with self.lock:
+                reporter.fileDone(archivedFile)
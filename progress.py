@@ -0,0 +1,113 @@
+import sys
+from time import perf_counter
+
+DISP_INTERVAL = 0.5  # Minimum number of seconds between two status outputs
+
+
+class ProgressStatus:
+    """Snapshot of a running extraction passed to the progress callback"""
+
+    totalFileNum: int
+    compFileNum: int
+    processFileName: str
+    totalBytes: int
+    compBytes: int
+    elapsed: float  # Seconds since the start
+    filesPerSecond: float
+    bytesPerSecond: float
+    eta: float | None  # Estimated seconds left, None until something has been processed
+    finished: bool
+
+    @property
+    def megabytesPerSecond(self) -> float:
+        return self.bytesPerSecond / (1024 * 1024)
+
+    def __str__(self) -> str:
+        eta = "?" if self.eta is None else f"{self.eta:.1f}s"
+        return (
+            f"{self.compFileNum}/{self.totalFileNum} files "
+            f"{self.filesPerSecond:.1f} files/s "
+            f"{self.megabytesPerSecond:.2f} MB/s ETA {eta} {self.processFileName}"
+        )
+
+
+def printProgress(status: ProgressStatus) -> None:
+    end = "\n" if status.finished else ""
+    sys.stderr.write(f"\r{status}\x1b[K{end}")
+    sys.stderr.flush()
+
+
+class ProgressReporter:
+    """
+    Keeps a DARC_ENCODEINFO up to date while files are processed and calls
+    callback(ProgressStatus) at most once every interval seconds (using
+    encodeInfo.prevDispTime), plus once when everything is done.
+    """
+
+    def __init__(self, encodeInfo, callback, interval: float = DISP_INTERVAL) -> None:
+        self.encodeInfo = encodeInfo
+        self.callback = callback
+        self.interval = interval
+
+    def start(self, archivedFiles: list) -> None:
+        info = self.encodeInfo
+        info.totalFileNum = len(archivedFiles)
+        info.compFileNum = 0
+        info.totalBytes = sum(archivedFile.dataSize for archivedFile in archivedFiles)
+        info.compBytes = 0
+        info.processFileName = None
+        info.outputStatus = self.callback is not None
+        info.startTime = perf_counter()
+        info.prevDispTime = info.startTime
+
+    def fileStarted(self, archivedFile) -> None:
+        self.encodeInfo.processFileName = archivedFile.name
+
+    def fileDone(self, archivedFile) -> None:
+        info = self.encodeInfo
+        info.compFileNum += 1
+        info.compBytes += archivedFile.dataSize
+
+        if not info.outputStatus:
+            return
+
+        now = perf_counter()
+        if now - info.prevDispTime >= self.interval:
+            info.prevDispTime = now
+            self.callback(self.status(now))
+
+    def finish(self) -> None:
+        info = self.encodeInfo
+        if info.outputStatus:
+            info.prevDispTime = perf_counter()
+            self.callback(self.status(info.prevDispTime, finished=True))
+
+    def status(self, now: float, finished: bool = False) -> ProgressStatus:
+        info = self.encodeInfo
+        status = ProgressStatus()
+        status.totalFileNum = info.totalFileNum
+        status.compFileNum = info.compFileNum
+        status.processFileName = info.processFileName
+        status.totalBytes = info.totalBytes
+        status.compBytes = info.compBytes
+        status.elapsed = now - info.startTime
+        status.finished = finished
+
+        if status.elapsed > 0:
+            status.filesPerSecond = info.compFileNum / status.elapsed
+            status.bytesPerSecond = info.compBytes / status.elapsed
+        else:
+            status.filesPerSecond = 0.0
+            status.bytesPerSecond = 0.0
+
+        if finished:
+            status.eta = 0.0
+        elif status.bytesPerSecond > 0:
+            status.eta = (info.totalBytes - info.compBytes) / status.bytesPerSecond
+        elif status.filesPerSecond > 0:
+            remaining = info.totalFileNum - info.compFileNum
+            status.eta = remaining / status.filesPerSecond
+        else:
+            status.eta = None
+
+        return status
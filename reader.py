@@ -0,0 +1,206 @@
+import io
+import struct
+from pathlib import Path, PurePosixPath
+
+try:
+    from . import DXArchive, DXArchive5, DXArchive6
+except ImportError:
+    import DXArchive
+    import DXArchive5
+    import DXArchive6
+
+# What decoding a header made garbage by a wrong key or version raises
+LOAD_ERRORS = (ValueError, IndexError, KeyError, struct.error, MemoryError)
+
+
+def openArchive(archivePath: Path, keyString_: bytearray = None):
+    """
+    Load archivePath with the first backend that accepts it, None if none does.
+    Errors reading the file (OSError) are raised.
+    """
+    for backend in (DXArchive5, DXArchive6, DXArchive):
+        archive = backend.DXArchive()
+        try:
+            if archive.loadArchive(archivePath=archivePath, keyString_=keyString_):
+                return ArchiveReader(archive)
+        except LOAD_ERRORS:
+            archive.error()
+    return None
+
+
+class ArchiveReader:
+    """
+    Read-only, zipfile-like access to a loaded archive of any version:
+        namelist(), infolist(), getinfo(name), read(name), open(name)
+        root / "BasicData" / "Game.dat" for pathlib-like navigation
+    Nothing is written to disk.
+    """
+
+    def __init__(self, archive) -> None:
+        self.archive = archive
+        self.index = archive.index
+
+    def namelist(self) -> list:
+        return list(self.index.files)
+
+    def infolist(self) -> list:
+        return list(self.index.files.values())
+
+    def getinfo(self, name: str):
+        try:
+            return self.index.files[name]
+        except KeyError:
+            raise KeyError(f"There is no item named {name!r} in the archive")
+
+    def find(self, name: str):
+        """Case-insensitive getinfo, None if there's no such file"""
+        return self.index.find(name)
+
+    def read(self, name: str) -> bytes:
+        return bytes(self.archive.readFile(self.getinfo(name)))
+
+    def open(self, name: str, mode: str = "r") -> io.BufferedIOBase:
+        if mode not in ("r", "rb"):
+            raise ValueError('open() requires mode "r" or "rb"')
+
+        archivedFile = self.getinfo(name)
+        if archivedFile.compressed or archivedFile.huffmanCompressed:
+            return io.BytesIO(self.archive.readFile(archivedFile))
+
+        # Uncompressed files are read on demand
+        return io.BufferedReader(EntryReader(self.archive, archivedFile))
+
+    @property
+    def root(self) -> "ArchivePath":
+        return ArchivePath(self, "")
+
+    def __iter__(self):
+        return iter(self.index.files)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def close(self) -> None:
+        if not self.archive.fp.closed:
+            self.archive.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+
+class EntryReader(io.RawIOBase):
+    """Seekable file object over an uncompressed entry, backed by readRange"""
+
+    def __init__(self, archive, archivedFile) -> None:
+        self.archive = archive
+        self.archivedFile = archivedFile
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.archivedFile.dataSize + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+
+        self.position = position
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        data = self.archive.readRange(self.archivedFile, self.position, len(buffer))
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class ArchivePath:
+    """pathlib-like view of an entry (or directory) inside an ArchiveReader"""
+
+    def __init__(self, reader: ArchiveReader, at: str) -> None:
+        self.reader = reader
+        self.at = at
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.at).name
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.at).suffix
+
+    @property
+    def parent(self) -> "ArchivePath":
+        parent = PurePosixPath(self.at).parent.as_posix()
+        return ArchivePath(self.reader, "" if parent == "." else parent)
+
+    def joinpath(self, *other) -> "ArchivePath":
+        path = PurePosixPath(self.at, *other).as_posix()
+        return ArchivePath(self.reader, "" if path == "." else path)
+
+    def __truediv__(self, other) -> "ArchivePath":
+        return self.joinpath(other)
+
+    def is_dir(self) -> bool:
+        return self.at in self.reader.index.directories
+
+    def is_file(self) -> bool:
+        return self.at in self.reader.index.files
+
+    def exists(self) -> bool:
+        return self.is_dir() or self.is_file()
+
+    def iterdir(self):
+        if not self.is_dir():
+            raise NotADirectoryError(self.at)
+        for name in self.reader.index.directories[self.at]:
+            yield self.joinpath(name)
+
+    def walk(self):
+        """Every file below this directory"""
+        for path in self.iterdir():
+            if path.is_dir():
+                yield from path.walk()
+            else:
+                yield path
+
+    def open(self, mode: str = "r"):
+        return self.reader.open(self.at, mode)
+
+    def read_bytes(self) -> bytes:
+        return self.reader.read(self.at)
+
+    def read_text(self, encoding: str = "utf8") -> str:
+        return bytes(self.read_bytes()).decode(encoding)
+
+    def __str__(self) -> str:
+        return self.at
+
+    def __repr__(self) -> str:
+        return f"ArchivePath({self.at!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ArchivePath) and self.at == other.at
+
+    def __hash__(self) -> int:
+        return hash(self.at)
@@ -0,0 +1,180 @@
+import os
+import threading
+
+COALESCE_FILE_SIZE = 256 * 1024  # Files stored in at most this many bytes are read together
+COALESCE_GAP = 64 * 1024  # Largest hole between two files still read in one go
+COALESCE_SIZE = 8 * 1024 * 1024  # Largest single read
+
+
+class ReadGroup:
+    """Files stored next to each other, read from the archive with a single read"""
+
+    def __init__(self, archivedFile, coalesce: bool) -> None:
+        self.start = archivedFile.dataStart
+        self.end = archivedFile.dataStart + archivedFile.storedSize
+        self.files = [archivedFile]
+        self.coalesce = coalesce
+
+    def accepts(self, archivedFile) -> bool:
+        if not self.coalesce or archivedFile.storedSize > COALESCE_FILE_SIZE:
+            return False
+
+        gap = archivedFile.dataStart - self.end
+        end = archivedFile.dataStart + archivedFile.storedSize
+        return 0 <= gap <= COALESCE_GAP and end - self.start <= COALESCE_SIZE
+
+    def add(self, archivedFile) -> None:
+        self.files.append(archivedFile)
+        self.end = max(self.end, archivedFile.dataStart + archivedFile.storedSize)
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start
+
+
+def planReads(archivedFiles: list) -> list:
+    """
+    Sort archivedFiles by their position in the archive and group the
+    small ones that are (almost) contiguous, so the archive is read
+    front to back with as few reads as possible.
+    """
+    groups = []
+    group = None
+    for archivedFile in sorted(archivedFiles, key=lambda f: f.dataStart):
+        if group is not None and group.accepts(archivedFile):
+            group.add(archivedFile)
+            continue
+
+        group = ReadGroup(archivedFile, archivedFile.storedSize <= COALESCE_FILE_SIZE)
+        groups.append(group)
+
+    return groups
+
+
+class SpanReader:
+    """
+    File-like view of data read from the archive starting at offset base.
+    tell() and seek() use archive offsets, so decoders can use it in place of the archive.
+    """
+
+    def __init__(self, data: bytes, base: int) -> None:
+        self.data = data
+        self.base = base
+        self.position = 0
+
+    def tell(self) -> int:
+        return self.base + self.position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            self.position = offset - self.base
+        elif whence == os.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = len(self.data) + offset
+        return self.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = len(self.data) - self.position
+        data = self.data[self.position : self.position + size]
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        size = max(0, min(len(buffer), len(self.data) - self.position))
+        buffer[:size] = memoryview(self.data)[self.position : self.position + size]
+        self.position += size
+        return size
+
+
+class PositionalReader:
+    """
+    File-like reader of fp with its own position, reading with os.pread so
+    any number of them can be used from different threads at once: nothing
+    is shared but the file descriptor. Where there's no os.pread, reads
+    seek and read the descriptor under a lock shared by all of them.
+    """
+
+    lock = threading.Lock()  # Around lseek + read without os.pread
+
+    def __init__(self, fp, position: int = 0) -> None:
+        self.fd = fp.fileno()
+        self.position = position
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            self.position = offset
+        elif whence == os.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = os.fstat(self.fd).st_size + offset
+        return self.position
+
+    def pread(self, size: int) -> bytes:
+        if hasattr(os, "pread"):
+            return os.pread(self.fd, size, self.position)
+        with self.lock:
+            os.lseek(self.fd, self.position, os.SEEK_SET)
+            return os.read(self.fd, size)
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = max(0, os.fstat(self.fd).st_size - self.position)
+
+        chunks = []
+        while size > 0:
+            data = self.pread(size)
+            if not data:
+                break
+            chunks.append(data)
+            self.position += len(data)
+            size -= len(data)
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    def readinto(self, buffer) -> int:
+        if hasattr(os, "preadv"):
+            with memoryview(buffer) as view:
+                read = 0
+                while read < len(view):
+                    size = os.preadv(self.fd, [view[read:]], self.position)
+                    if size == 0:
+                        break
+                    read += size
+                    self.position += size
+            return read
+
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def readGroup(fp, group: ReadGroup) -> SpanReader | None:
+    """The data of a coalesced group, None if its files are better read on their own"""
+    if len(group.files) < 2:
+        return None
+
+    fp.seek(group.start, os.SEEK_SET)
+    return SpanReader(fp.read(group.size), group.start)
+
+
+def advise(fp, start: int, length: int, advice: str) -> None:
+    """posix_fadvise(POSIX_FADV_<advice>) where the platform has it"""
+    if not hasattr(os, "posix_fadvise") or length <= 0:
+        return
+
+    try:
+        os.posix_fadvise(fp.fileno(), start, length, getattr(os, f"POSIX_FADV_{advice}"))
+    except (AttributeError, OSError, ValueError):
+        # Not a real file, or the file system doesn't care
+        pass
+
+
+def adviseGroups(fp, groups: list) -> None:
+    """Tell the kernel the archive will be read sequentially over the extracted range"""
+    if groups:
+        start = groups[0].start
+        advise(fp, start, max(group.end for group in groups) - start, "SEQUENTIAL")
@@ -0,0 +1,216 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+try:
+    from .digest import Digester
+    from .journal import JOURNAL_DIGEST
+except ImportError:
+    from digest import Digester
+    from journal import JOURNAL_DIGEST
+
+WRITE_THREADS = 4  # Threads writing extracted files
+PENDING_WRITES = 16  # Files decoded but not written yet, per thread
+BUFFERED_FILE_SIZE = 4 * 1024 * 1024  # Larger files are written as they're decoded
+PREALLOCATE_SIZE = 1024 * 1024  # Smaller files aren't worth the extra syscall
+PARTIAL_SUFFIX = ".part"  # Added to the name of files being written with atomic
+FILETIME_EPOCH = 116444736000000000  # 1970/01/01 as a FILETIME (100ns units since 1601/01/01)
+
+
+def fileTimeToNs(fileTime: int) -> int | None:
+    """Nanoseconds since the Unix epoch of a Windows FILETIME, None if it isn't set"""
+    if not fileTime or fileTime < FILETIME_EPOCH:
+        return None
+    return (fileTime - FILETIME_EPOCH) * 100
+
+
+class FileWriter:
+    """Write callable for decodeFile writing to destP, with stats and digests"""
+
+    def __init__(
+        self, archivedFile, destP, record=None, digester=None, partialPath=None
+    ) -> None:
+        self.archivedFile = archivedFile
+        self.destP = destP
+        self.record = record
+        self.digester = digester
+        self.partialPath = partialPath  # Renamed to archivedFile.filePath once complete
+
+    def __call__(self, data) -> None:
+        if self.digester is not None:
+            self.digester.update(data)
+
+        if self.record is None:
+            self.destP.write(data)
+            return
+
+        start = perf_counter()
+        self.destP.write(data)
+        self.record.stage("write", start)
+        self.record.bytesOut += len(data)
+
+
+class OutputSink:
+    """
+    Writes extracted files:
+        parent directories are created once and remembered
+        files of known large size are preallocated with posix_fallocate
+        with threads, buffered files are written by a thread pool
+        with setTimes, access / modification times are set from DARC_FILETIME
+        with digests (names of hashlib algorithms or "crc32"), archivedFile.digests
+        is set to {name: hex digest} of the data written
+        with atomic, files are written under a PARTIAL_SUFFIX name and renamed
+        once complete, so a file with its own name is never cut short
+        with journal (a journal.ExtractionJournal), writes are atomic and every
+        file is recorded in it once renamed
+    finish() waits for everything and raises the first error.
+    """
+
+    def __init__(
+        self,
+        threads: int = WRITE_THREADS,
+        setTimes: bool = False,
+        stats=None,
+        digests=None,
+        atomic: bool = False,
+        journal=None,
+    ):
+        self.threads = threads
+        self.setTimes = setTimes
+        self.stats = stats
+        self.atomic = atomic or journal is not None
+        self.journal = journal
+        if journal is not None:
+            digests = tuple(digests or ())
+            if JOURNAL_DIGEST not in digests:
+                digests += (JOURNAL_DIGEST,)
+        self.digests = tuple(digests) if digests else None
+        if self.digests:
+            # Fail on unknown algorithms before anything is extracted
+            Digester(self.digests)
+        self.createdDirectories = set()
+        self.lock = threading.Lock()  # Around stats
+        self.errors = []
+        self.executor = None
+        if threads > 0:
+            self.executor = ThreadPoolExecutor(threads, thread_name_prefix="sink")
+            self.pending = threading.BoundedSemaphore(threads * PENDING_WRITES)
+
+    def buffers(self, archivedFile) -> bool:
+        """Should archivedFile be decoded in memory and passed to submit()"""
+        return self.executor is not None and archivedFile.dataSize <= BUFFERED_FILE_SIZE
+
+    def makeParent(self, path) -> None:
+        parent = path.parent
+        if parent in self.createdDirectories:
+            return
+        parent.mkdir(parents=True, exist_ok=True)
+        self.createdDirectories.add(parent)
+
+    def open(self, archivedFile, record=None) -> FileWriter:
+        path = archivedFile.filePath
+        self.makeParent(path)
+        partialPath = None
+        if self.atomic:
+            partialPath = path.with_name(path.name + PARTIAL_SUFFIX)
+        destP = open(path if partialPath is None else partialPath, mode="wb")
+
+        if archivedFile.dataSize >= PREALLOCATE_SIZE and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(destP.fileno(), 0, archivedFile.dataSize)
+            except OSError:
+                # Not supported by the file system
+                pass
+
+        digester = None if self.digests is None else Digester(self.digests)
+        return FileWriter(archivedFile, destP, record, digester, partialPath)
+
+    def close(self, writer: FileWriter, completed: bool = True) -> None:
+        """Close the file of writer, completed is False when it was cut short by an error"""
+        writer.destP.close()
+
+        if writer.partialPath is not None:
+            if not completed:
+                writer.partialPath.unlink(missing_ok=True)
+                return
+            os.replace(writer.partialPath, writer.archivedFile.filePath)
+
+        if writer.digester is not None:
+            writer.archivedFile.digests = writer.digester.result()
+
+        if self.setTimes:
+            self.applyTimes(writer.archivedFile)
+
+        if self.journal is not None and completed:
+            self.journal.record(writer.archivedFile)
+
+    def applyTimes(self, archivedFile) -> None:
+        time = getattr(archivedFile, "time", None)
+        if time is None:
+            return
+
+        lastWrite = fileTimeToNs(time.lastWrite)
+        if lastWrite is None:
+            return
+        lastAccess = fileTimeToNs(time.lastAccess) or lastWrite
+        os.utime(archivedFile.filePath, ns=(lastAccess, lastWrite))
+
+    def writeFile(self, archivedFile, chunks: list, record=None, pool=None) -> None:
+        """Write chunks to archivedFile, then give them back to pool if there's one"""
+        writer = self.open(archivedFile, record)
+        try:
+            for chunk in chunks:
+                writer(chunk)
+        except BaseException:
+            self.close(writer, completed=False)
+            raise
+        else:
+            self.close(writer)
+        finally:
+            if pool is not None:
+                for chunk in chunks:
+                    pool.give(chunk)
+
+        self.endFile(record)
+
+    def endFile(self, record) -> None:
+        if record is not None and self.stats is not None:
+            with self.lock:
+                self.stats.endFile(record)
+
+    def submit(self, archivedFile, chunks: list, record=None, pool=None) -> None:
+        """Write archivedFile from the thread pool, blocks while too many are waiting"""
+        if self.errors:
+            raise self.errors[0]
+
+        if self.executor is None:
+            return self.writeFile(archivedFile, chunks, record, pool)
+
+        self.pending.acquire()
+        self.executor.submit(self.writeInThread, archivedFile, chunks, record, pool)
+
+    def writeInThread(self, archivedFile, chunks: list, record, pool) -> None:
+        try:
+            self.writeFile(archivedFile, chunks, record, pool)
+        except BaseException as exception:
+            self.errors.append(exception)
+        finally:
+            self.pending.release()
+
+    def finish(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        if self.errors:
+            raise self.errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:
+            self.finish()
+        elif self.executor is not None:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,99 @@
+from time import perf_counter
+
+# Stages of extractFile, in the order they run
+STAGES = ("read", "keyConv", "huffman", "decode", "write")
+
+
+def compressionKind(archivedFile) -> str:
+    if archivedFile.huffmanCompressed and archivedFile.compressed:
+        return "huffman+lz"
+    if archivedFile.huffmanCompressed:
+        return "huffman"
+    if archivedFile.compressed:
+        return "lz"
+    return "none"
+
+
+class FileRecord:
+    """Measurements for a single extracted file"""
+
+    name: str
+    dataSize: int
+    pressDataSize: int
+    huffPressDataSize: int
+    compression: str
+    stageTimes: dict  # Seconds spent on every stage
+    bytesIn: int  # Bytes read from the archive
+    bytesOut: int  # Bytes written to the output file
+
+    def __init__(self, archivedFile=None) -> None:
+        self.stageTimes = dict.fromkeys(STAGES, 0.0)
+        self.bytesIn = 0
+        self.bytesOut = 0
+        if archivedFile is None:
+            return
+        self.name = archivedFile.name
+        self.dataSize = archivedFile.dataSize
+        self.pressDataSize = archivedFile.pressDataSize
+        self.huffPressDataSize = archivedFile.huffPressDataSize
+        self.compression = compressionKind(archivedFile)
+
+    def stage(self, stage: str, start: float) -> None:
+        """Add the time elapsed since start (a perf_counter() value) to stage"""
+        self.stageTimes[stage] += perf_counter() - start
+
+    @property
+    def totalTime(self) -> float:
+        return sum(self.stageTimes.values())
+
+    def __repr__(self) -> str:
+        times = ", ".join(f"{k}={v * 1000:.2f}ms" for k, v in self.stageTimes.items())
+        return (
+            f"FileRecord({self.name}, {self.compression}, "
+            f"in={self.bytesIn}, out={self.bytesOut}, {times})"
+        )
+
+
+class ExtractionStats:
+    """
+    Aggregated extraction measurements.
+    Enable it with DXArchive.enableStats(), while disabled extractFile doesn't measure anything.
+    callback(record: FileRecord) is called after every extracted file.
+    """
+
+    def __init__(self, callback=None, keepRecords: bool = True) -> None:
+        self.callback = callback
+        self.keepRecords = keepRecords
+        self.stageTimes = dict.fromkeys(STAGES, 0.0)
+        self.bytesIn = 0
+        self.bytesOut = 0
+        self.fileNum = 0
+        self.records = []
+
+    def beginFile(self, archivedFile) -> FileRecord:
+        return FileRecord(archivedFile)
+
+    def endFile(self, record: FileRecord) -> None:
+        for stage, seconds in record.stageTimes.items():
+            self.stageTimes[stage] += seconds
+        self.bytesIn += record.bytesIn
+        self.bytesOut += record.bytesOut
+        self.fileNum += 1
+
+        if self.keepRecords:
+            self.records.append(record)
+
+        if self.callback is not None:
+            self.callback(record)
+
+    def slowest(self, count: int = 10) -> list:
+        return sorted(self.records, key=lambda r: r.totalTime, reverse=True)[:count]
+
+    def __repr__(self) -> str:
+        times = "\n".join(f"\t{k} = {v:.3f}s" for k, v in self.stageTimes.items())
+        return f"""ExtractionStats(
+\tfileNum = {self.fileNum}
+\tbytesIn = {self.bytesIn}
+\tbytesOut = {self.bytesOut}
+{times}
+)"""
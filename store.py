@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+from pathlib import Path
+
+try:
+    from .manifest import getEntryKey, hashStored
+    from .schedule import SpanReader, planReads, readGroup
+except ImportError:
+    from manifest import getEntryKey, hashStored
+    from schedule import SpanReader, planReads, readGroup
+
+MANIFEST_NAME = "manifest.json"
+OBJECTS_NAME = "objects"
+FICLONE = 0x40049409  # Linux ioctl cloning a whole file (reflink)
+LINK_MODES = ("reflink", "hardlink", "copy")
+OBJECT_MODE = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH  # Objects are read-only
+
+
+class ContentStore:
+    """
+    Decoded files stored once, by the sha256 of their contents, under root/objects.
+    Extracted files are reflinked from there by default, hardlinked where
+    the file system can't and copied as a last resort: link picks the
+    first one tried. Hardlinks share the object itself, so objects are
+    read-only: writing to a hardlinked file can't change the store.
+    links counts the files extracted each way, see fallbacks.
+
+    root/manifest.json maps what a file looks like in an archive:
+        dataSize, pressDataSize, huffPressDataSize, sha256 of the stored bytes,
+        key and key phase (the same bytes decrypt differently with another key)
+    to the hash of its contents, so files already seen in any archive
+    aren't decoded again.
+    """
+
+    def __init__(self, root: Path, link: str = "reflink") -> None:
+        if link not in LINK_MODES:
+            raise ValueError(f"link must be one of {LINK_MODES}")
+
+        self.root = Path(root)
+        self.objects = self.root / OBJECTS_NAME
+        self.link = link
+        self.links = dict.fromkeys(LINK_MODES, 0)
+        self.manifest = {}
+        self.hits = 0
+        self.misses = 0
+        self.decodedBytes = 0
+
+        manifestPath = self.root / MANIFEST_NAME
+        if manifestPath.exists():
+            with open(manifestPath, mode="r", encoding="utf8") as manifestFile:
+                self.manifest = json.load(manifestFile)
+
+    def save(self) -> None:
+        """Write the manifest, replacing the previous one only once it's complete"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        manifestPath = self.root / MANIFEST_NAME
+        temporaryPath = manifestPath.with_suffix(".tmp")
+        with open(temporaryPath, mode="w", encoding="utf8") as manifestFile:
+            json.dump(self.manifest, manifestFile, sort_keys=True)
+        os.replace(temporaryPath, manifestPath)
+
+    def getObjectPath(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def addFile(self, archive, archivedFile, stored) -> str:
+        """Decode archivedFile into the store, the hash of its contents"""
+        self.objects.mkdir(parents=True, exist_ok=True)
+        temporaryPath = self.objects / f"tmp-{os.getpid()}-{id(archivedFile)}"
+
+        hasher = hashlib.sha256()
+        fp = None if stored is None else SpanReader(stored, archivedFile.dataStart)
+        with open(temporaryPath, mode="wb") as destP:
+
+            def write(data) -> None:
+                hasher.update(data)
+                destP.write(data)
+
+            archive.decodeFile(archivedFile, write, fp=fp)
+
+        digest = hasher.hexdigest()
+        objectPath = self.getObjectPath(digest)
+        if objectPath.exists():
+            temporaryPath.unlink()
+        else:
+            objectPath.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(temporaryPath, OBJECT_MODE)
+            os.replace(temporaryPath, objectPath)
+
+        self.decodedBytes += archivedFile.dataSize
+        return digest
+
+    @property
+    def fallbacks(self) -> int:
+        """Files that couldn't be extracted the way link asks for"""
+        return sum(count for link, count in self.links.items() if link != self.link)
+
+    def linkFile(self, objectPath: Path, filePath: Path) -> None:
+        """Make filePath a reflink / hardlink / copy of objectPath"""
+        filePath.parent.mkdir(parents=True, exist_ok=True)
+        if filePath.exists() or filePath.is_symlink():
+            filePath.unlink()
+
+        if self.link == "reflink" and self.reflink(objectPath, filePath):
+            self.links["reflink"] += 1
+            return
+
+        if self.link in ("reflink", "hardlink"):
+            try:
+                os.link(objectPath, filePath)
+                self.links["hardlink"] += 1
+                return
+            except OSError:
+                # Other file system, or no hardlinks there
+                pass
+
+        shutil.copyfile(objectPath, filePath)
+        self.links["copy"] += 1
+
+    def reflink(self, objectPath: Path, filePath: Path) -> bool:
+        try:
+            import fcntl
+        except ImportError:
+            return False
+
+        with open(objectPath, mode="rb") as srcP, open(filePath, mode="wb") as destP:
+            try:
+                fcntl.ioctl(destP.fileno(), FICLONE, srcP.fileno())
+                return True
+            except OSError:
+                pass
+
+        filePath.unlink()
+        return False
+
+    def extract(self, archive, archivedFiles: list = None) -> None:
+        """
+        Extract archivedFiles (every file of the archive by default) to their
+        filePath through the store, decoding only the files never seen before.
+        """
+        if archivedFiles is None:
+            archivedFiles = archive.archivedFiles
+
+        try:
+            for group in planReads(archivedFiles):
+                source = readGroup(archive.fp, group)
+                for archivedFile in group.files:
+                    self.extractFile(archive, archivedFile, source)
+        finally:
+            self.save()
+
+    def extractFile(self, archive, archivedFile, source=None) -> None:
+        (storedDigest, stored) = hashStored(archive.fp, archivedFile, source)
+        entryKey = getEntryKey(archive, archivedFile, storedDigest)
+
+        digest = self.manifest.get(entryKey)
+        if digest is not None and self.getObjectPath(digest).exists():
+            self.hits += 1
+        else:
+            self.misses += 1
+            digest = self.addFile(archive, archivedFile, stored)
+            self.manifest[entryKey] = digest
+
+        self.linkFile(self.getObjectPath(digest), archivedFile.filePath)
+
+    def __str__(self) -> str:
+        links = ", ".join(f"{count} {link}" for link, count in self.links.items())
+        return (
+            f"{self.hits} files reused, {self.misses} decoded "
+            f"({self.decodedBytes} bytes), {len(self.manifest)} known, "
+            f"linked: {links} ({self.fallbacks} fell back from {self.link})"
+        )
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+TEST_WOLF = ROOT / "test_wolf"
+
+# The modules fall back to absolute imports when they aren't loaded as a package
+sys.path.insert(0, str(ROOT))
+
+import DXArchive  # noqa: E402
+import DXArchive5  # noqa: E402
+from keys import key_1_01_2_02, key_2_25_2_81  # noqa: E402
+
+VER5_ARCHIVES = sorted(TEST_WOLF.glob("version_*.wolf"))
+# Small Ver0x0008 archive with huffmanEncodeKB = 1: files over 2KB are only
+# Huffman coded at both ends, see VER8_FILES for what it holds
+VER8_ARCHIVE = TEST_WOLF / "synthetic_v8.wolf"
+
+
+@pytest.fixture
+def loadArchive(tmp_path):
+    """loadArchive(archivePath, outputPath=tmp_path / "output") of a Ver0x0005 archive"""
+    archives = []
+
+    def load(archivePath: Path, outputPath: Path = None):
+        archive = DXArchive5.DXArchive()
+        if outputPath is None:
+            outputPath = tmp_path / "output"
+        assert archive.loadArchive(archivePath, outputPath, key_1_01_2_02)
+        archives.append(archive)
+        return archive
+
+    yield load
+
+    for archive in archives:
+        archive.fp.close()
+
+
+@pytest.fixture
+def loadVer8Archive(tmp_path):
+    """VER8_ARCHIVE loaded to be extracted into tmp_path / output"""
+    archive = DXArchive.DXArchive()
+    assert archive.loadArchive(VER8_ARCHIVE, tmp_path / "output", key_2_25_2_81)
+    yield archive
+    archive.fp.close()
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from budget import MIN_MAX_MEMORY, MemoryBudget
+from conftest import TEST_WOLF
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_extractWithBudget(loadArchive, workers):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    archive.extractAll(maxMemory=MIN_MAX_MEMORY, workers=workers)
+    for archivedFile in archive.archivedFiles:
+        assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+def test_budgetTooSmall(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    with pytest.raises(ValueError):
+        archive.extractAll(maxMemory=MIN_MAX_MEMORY - 1)
+
+
+def test_optionsAreKeywordOnly(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    with pytest.raises(TypeError):
+        archive.extractAll(None, True)
+    with pytest.raises(TypeError):
+        archive.extract(["*.png"], None, None, True)
+
+
+def test_admitOvertakes():
+    budget = MemoryBudget(MIN_MAX_MEMORY)
+    budget.used = budget.size - 10
+    admitted = budget.admit([100, 1, 2], lambda item: item)
+    # The first file doesn't fit yet, the smaller ones go ahead of it
+    assert next(admitted) == (1, 1)
+    assert next(admitted) == (2, 2)
+    budget.release(budget.size - 10 + 3)
+    assert next(admitted) == (100, 100)
+    assert budget.used == 100
+    assert budget.peak == budget.size - 10 + 3
+    assert next(admitted, None) is None
+
+
+def test_admitStopped():
+    budget = MemoryBudget(MIN_MAX_MEMORY)
+    budget.used = budget.size
+    stop = threading.Event()
+    stop.set()
+    assert list(budget.admit([1], lambda item: item, stop)) == []
@@ -0,0 +1,81 @@
+import struct
+import threading
+
+import DXArchive5
+from bufferpool import (
+    MAX_SIZE_CLASS,
+    MIN_SIZE_CLASS,
+    BufferPool,
+    getSizeClass,
+    readInto,
+)
+from conftest import TEST_WOLF
+
+
+def test_getSizeClass():
+    assert getSizeClass(0) == MIN_SIZE_CLASS
+    assert getSizeClass(MIN_SIZE_CLASS) == MIN_SIZE_CLASS
+    assert getSizeClass(MIN_SIZE_CLASS + 1) == MIN_SIZE_CLASS * 2
+
+
+def test_reuse():
+    pool = BufferPool()
+    buffer = pool.take(100)
+    assert len(buffer) == MIN_SIZE_CLASS
+    pool.give(memoryview(buffer)[:100])
+    assert pool.freeSize == MIN_SIZE_CLASS
+    assert pool.take(MIN_SIZE_CLASS) is buffer
+    assert pool.freeSize == 0
+
+    # Other buffers, and ones too large for a size class, aren't kept
+    pool.give(bytearray(100))
+    pool.give(pool.take(MAX_SIZE_CLASS + 1))
+    assert pool.freeSize == 0
+
+
+def test_limit():
+    pool = BufferPool(limit=MIN_SIZE_CLASS)
+    buffers = [pool.take(1), pool.take(1)]
+    for buffer in buffers:
+        pool.give(buffer)
+    assert pool.freeSize == MIN_SIZE_CLASS
+    assert pool.setLimit(0) == MIN_SIZE_CLASS
+    assert pool.freeSize == 0
+
+
+def test_giveFromAnotherThread():
+    pool = BufferPool()
+    buffer = pool.take(1)
+    thread = threading.Thread(target=pool.give, args=(buffer,))
+    thread.start()
+    thread.join()
+    # Back in the arena of this thread, where it was taken
+    assert pool.take(1) is buffer
+
+
+def test_readInto(tmp_path):
+    path = tmp_path / "data"
+    path.write_bytes(b"0123456789")
+    pool = BufferPool()
+    with open(path, "rb") as fp:
+        assert readInto(fp, pool, 4)[:4] == b"0123"
+        assert readInto(fp, pool, 100) == b"456789"
+
+
+def test_decodeCutShort():
+    archive = DXArchive5.DXArchive()
+    keycode = 0xFF
+    stream = struct.pack("<IIB", 10, 9 + 4, keycode) + b"abcd"
+    dirty = bytearray(b"\xaa" * 16)
+    (decoded, size) = archive.decode(stream, dirty)
+    assert size == 10
+    assert decoded[:10] == b"abcd" + bytes(6)
+
+
+def test_extractWithPool(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    archive.extractAll()
+    archive.extractAll()
+    for archivedFile in archive.archivedFiles:
+        assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+    assert archive.pool.freeSize > 0
@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import TEST_WOLF
+from container import PAGE_SIZE, ContainerReader
+
+
+def checkContainer(archive, containerPath) -> None:
+    with ContainerReader(containerPath) as reader:
+        assert len(reader) == len(archive.archivedFiles)
+        assert sorted(reader.namelist()) == sorted(
+            archivedFile.name for archivedFile in archive.archivedFiles
+        )
+        for archivedFile in archive.archivedFiles:
+            assert archivedFile.name in reader
+            with reader.read(archivedFile.name) as view:
+                assert view == archive.readFile(archivedFile)
+                assert reader.find(archivedFile.name)[0] % PAGE_SIZE == 0
+
+
+def test_exportContainer(loadArchive, tmp_path):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    containerPath = tmp_path / "game.cnt"
+    assert archive.exportContainer(containerPath) == len(archive.archivedFiles)
+    checkContainer(archive, containerPath)
+
+
+def test_exportContainerVer8(loadVer8Archive, tmp_path):
+    loadVer8Archive.exportContainer(tmp_path / "game.cnt")
+    checkContainer(loadVer8Archive, tmp_path / "game.cnt")
+
+
+def test_exportContainerPatterns(loadArchive, tmp_path):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.exportContainer(tmp_path / "game.cnt", ["BasicData"])
+    with ContainerReader(tmp_path / "game.cnt") as reader:
+        assert reader.namelist()
+        assert all(name.startswith("BasicData/") for name in reader.namelist())
+        assert "missing.dat" not in reader
+        with pytest.raises(KeyError):
+            reader.read("missing.dat")
+
+
+def test_notAContainer():
+    with pytest.raises(ValueError):
+        ContainerReader(TEST_WOLF / "version_110.wolf")
@@ -0,0 +1,104 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+import convert
+from conftest import TEST_WOLF
+
+
+def readTar(data: bytes) -> dict:
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        return {
+            member.name: tar.extractfile(member).read()
+            for member in tar.getmembers()
+            if member.isfile()
+        }
+
+
+def readZip(path) -> dict:
+    with zipfile.ZipFile(path) as zip:
+        return {
+            info.filename: zip.read(info) for info in zip.infolist() if not info.is_dir()
+        }
+
+
+def getContents(archive) -> dict:
+    return {
+        archivedFile.name: bytes(archive.readFile(archivedFile))
+        for archivedFile in archive.archivedFiles
+    }
+
+
+@pytest.mark.parametrize("format", ["tar", "tar.gz", "tar.bz2", "tar.xz"])
+def test_convertTar(loadArchive, format):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    output = io.BytesIO()
+    assert archive.convert(output, format) == len(archive.archivedFiles)
+    assert readTar(output.getvalue()) == getContents(archive)
+
+
+def test_convertZip(loadArchive, tmp_path):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.convert(tmp_path / "output.zip")
+    assert readZip(tmp_path / "output.zip") == getContents(archive)
+
+
+def test_convertPatterns(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    output = io.BytesIO()
+    assert archive.convert(output, "tar", patterns=["*.png"]) > 0
+    contents = readTar(output.getvalue())
+    assert contents
+    assert all(name.lower().endswith(".png") for name in contents)
+
+
+def test_convertUnknownFormat(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    with pytest.raises(ValueError):
+        archive.convert(io.BytesIO(), "rar")
+
+
+@pytest.mark.parametrize(
+    "output, format",
+    [
+        ("game.zip", "zip"),
+        ("game.TAR.GZ", "tar.gz"),
+        ("game.tgz", "tar.gz"),
+        ("game.tar.xz", "tar.xz"),
+        ("-", "tar"),
+        ("game", "tar"),
+    ],
+)
+def test_guessFormat(output, format):
+    assert convert.guessFormat(output) == format
+
+
+@pytest.mark.parametrize("slotSize", [convert.SLOT_SIZE, 0x1000])
+def test_convertWorkers(loadArchive, monkeypatch, slotSize):
+    # With small slots, the larger files are decoded by the parent in between
+    monkeypatch.setattr(convert, "SLOT_SIZE", slotSize)
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    output = io.BytesIO()
+    assert archive.convert(output, "tar", workers=2) == len(archive.archivedFiles)
+    assert readTar(output.getvalue()) == getContents(archive)
+
+
+def test_convertWorkersVer8(loadVer8Archive):
+    output = io.BytesIO()
+    loadVer8Archive.convert(output, "tar", workers=2)
+    assert readTar(output.getvalue()) == getContents(loadVer8Archive)
+
+
+def test_decodeEntriesReleasesSlots(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    entries = convert.decodeEntries(archive, archive.archivedFiles, workers=1)
+    (archivedFile, chunks) = next(entries)
+    assert bytes(chunks[0]) == bytes(archive.readFile(archivedFile))
+
+    next(entries)
+    # The view of the previous file went back with its slot
+    with pytest.raises(ValueError):
+        bytes(chunks[0])
+    entries.close()
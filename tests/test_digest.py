@@ -0,0 +1,50 @@
+import hashlib
+import zlib
+
+import pytest
+
+from conftest import TEST_WOLF
+from digest import Digester
+
+DIGESTS = ("crc32", "sha256")
+
+
+def getDigests(data: bytes) -> dict:
+    return {
+        "crc32": f"{zlib.crc32(data):08x}",
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def test_digester():
+    digester = Digester(DIGESTS)
+    for chunk in (b"", b"abc", b"\0" * 1000):
+        digester.update(chunk)
+    assert digester.result() == getDigests(b"abc" + b"\0" * 1000)
+
+
+def test_unknownAlgorithm():
+    with pytest.raises(ValueError):
+        Digester(["crc32", "nope"])
+
+
+@pytest.mark.parametrize("options", [{}, {"pipelined": True}, {"threads": 2}])
+def test_extractDigests(loadArchive, options):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    archive.extractAll(digests=DIGESTS, **options)
+    for archivedFile in archive.archivedFiles:
+        assert archivedFile.digests == getDigests(archive.readFile(archivedFile))
+
+
+def test_extractDigestsVer8(loadVer8Archive):
+    loadVer8Archive.extractAll(digests=DIGESTS)
+    for archivedFile in loadVer8Archive.archivedFiles:
+        data = archivedFile.filePath.read_bytes()
+        assert archivedFile.digests == getDigests(data)
+
+
+def test_extractUnknownDigest(loadArchive, tmp_path):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    with pytest.raises(ValueError):
+        archive.extractAll(digests=["nope"])
+    assert not (tmp_path / "output").exists()
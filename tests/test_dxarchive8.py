@@ -0,0 +1,98 @@
+import hashlib
+
+import pytest
+
+from DXArchive import MiddleWriter
+from bufferpool import MIN_SIZE_CLASS, BufferPool
+
+# name: sha256 of the contents, with how each file is stored
+VER8_FILES = {
+    # LZ, Huffman coded at both ends only
+    "BasicData/DataBase.dat": (
+        "c99c3fc8c41f66fb2694a5820ed7893e4a315f7ea3a156857f8a78ddd01c01c1"
+    ),
+    "BasicData/Game.dat": (
+        "846d67b978230a28f40f5d9bc55953a3006229b86afb1aa60c9a2fef48d2b73f"
+    ),
+    "MapData/Map001.mps": (
+        "aa71c3fc275501858430f282cc572825e2f3d0c6747fd11bb3cb85d080cfec39"
+    ),
+    # LZ only
+    "BasicData/Sub/deep.txt": (
+        "89995b35c9d739677c28b2a8187d56111c23baa3746d27c4381d44b71f405c74"
+    ),
+    "root.txt": "d42d000ab8ff26e6b8f27b2f0bff19917df404782c0ecf4af925c3d1138c17a1",
+    # LZ, all Huffman coded
+    "BasicData/small.dat": (
+        "5a551e2f5eb6d92880496f73fb68565045afb5136cf2990b3cf9782969cabb03"
+    ),
+    # Huffman coded at both ends only
+    "Picture/b.png": "eaeb878ab78978f9e914108fb80431feb756d84cc473efccdf8656d58edbd628",
+    # All Huffman coded
+    "Picture/tiny.png": (
+        "ae7bc8f4ea8e6b0c520586b5460a9292afaea19c9d8334de63fac7b522088fc1"
+    ),
+    # Stored
+    "BasicData/empty.dat": (
+        "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+    ),
+    "Picture/a.png": "94db2af1bfbcf1aabd04e4fff265b7cb84a846237f28e5197d3da356214de2ba",
+    "SE/テスト.ogg": "632576d06cdb391742166cc9f12f6d1f97de7219bdbdb971a92d3509c38c8887",
+}
+
+
+def test_partialHuffmanFiles(loadVer8Archive):
+    archive = loadVer8Archive
+    huffmanEncodeSize = archive.archiveHead.huffmanEncodeKB * 1024
+    partial = [
+        archivedFile.name
+        for archivedFile in archive.archivedFiles
+        if archivedFile.huffmanCompressed
+        and archive.getStoredSize(archivedFile) > huffmanEncodeSize * 2
+    ]
+    # The fixture goes through every path of huffmanDecodeFile
+    assert "Picture/b.png" in partial
+    assert "MapData/Map001.mps" in partial
+
+
+def test_readFile(loadVer8Archive):
+    archive = loadVer8Archive
+    contents = {
+        archivedFile.name: hashlib.sha256(archive.readFile(archivedFile)).hexdigest()
+        for archivedFile in archive.archivedFiles
+    }
+    assert contents == VER8_FILES
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"threads": 2}, {"pipelined": True}],
+    ids=["sequential", "threads", "pipelined"],
+)
+def test_extractAll(loadVer8Archive, options):
+    archive = loadVer8Archive
+    archive.extractAll(**options)
+    for name, digest in VER8_FILES.items():
+        data = (archive.outputPath / name).read_bytes()
+        assert hashlib.sha256(data).hexdigest() == digest
+
+
+def test_verify(loadVer8Archive):
+    report = loadVer8Archive.verify()
+    assert report.ok, str(report)
+
+
+def test_middleWriter():
+    pool = BufferPool()
+    buffer = bytearray(b"HEAD" + bytes(6) + b"TAIL")
+    write = MiddleWriter(buffer, 4, pool)
+    for chunk in (b"mid", b"dle"):
+        data = pool.take(len(chunk))
+        data[: len(chunk)] = chunk
+        write(memoryview(data)[: len(chunk)])
+
+    assert buffer == b"HEADmiddleTAIL"
+    assert write.offset == 10
+    # Every chunk went back to the pool, the second one reused the first
+    assert pool.freeSize == MIN_SIZE_CLASS
+    assert pool.getArena().reused == 1
@@ -0,0 +1,71 @@
+import pytest
+
+from conftest import TEST_WOLF
+from filters import EntryFilter
+
+ARCHIVE = TEST_WOLF / "version_110.wolf"
+
+
+@pytest.mark.parametrize(
+    "patterns",
+    [["BasicData/*.dat"], ["basicdata/*.DAT"], ["*.dat"], ["**/BasicData/*.dat"]],
+)
+def test_patterns(loadArchive, patterns):
+    everything = loadArchive(ARCHIVE).archivedFiles
+    selected = loadArchive(ARCHIVE).listFiles(patterns)
+    expected = [
+        archivedFile.name
+        for archivedFile in everything
+        if archivedFile.name.startswith("BasicData/")
+        and archivedFile.name.endswith(".dat")
+    ]
+    assert expected
+    assert [archivedFile.name for archivedFile in selected] == expected
+
+
+def test_patternSelectsDirectory(loadArchive):
+    archive = loadArchive(ARCHIVE)
+    names = [archivedFile.name for archivedFile in archive.listFiles("BasicData")]
+    assert names == [
+        archivedFile.name
+        for archivedFile in archive.archivedFiles
+        if archivedFile.name.startswith("BasicData/")
+    ]
+
+
+def test_predicatePrunes(loadArchive):
+    archive = loadArchive(ARCHIVE)
+    visited = []
+
+    def predicate(path, isDirectory):
+        visited.append(path)
+        return not isDirectory or path == "BasicData"
+
+    selected = archive.listFiles(predicate=predicate)
+    assert selected
+    assert all(archivedFile.name.startswith("BasicData/") for archivedFile in selected)
+    # Nothing below the rejected directories was looked at
+    assert all(path.count("/") == 0 or path.startswith("BasicData/") for path in visited)
+
+
+def test_loadWithPatterns(loadArchive, tmp_path):
+    archive = loadArchive(ARCHIVE)
+    archive.extract(["*.png"])
+    extracted = {
+        path.relative_to(tmp_path / "output").as_posix()
+        for path in (tmp_path / "output").rglob("*")
+        if path.is_file()
+    }
+    assert extracted == {
+        archivedFile.name
+        for archivedFile in archive.archivedFiles
+        if archivedFile.name.lower().endswith(".png")
+    }
+
+
+def test_emptyFilter():
+    assert not EntryFilter()
+    assert EntryFilter([])
+    assert EntryFilter("*.png").matchFile("a/b/C.PNG")
+    assert not EntryFilter("a/*.png").matchFile("b/c.png")
+    assert not EntryFilter("a/*.png").matchDirectory("b")
@@ -0,0 +1,42 @@
+import pytest
+
+from conftest import VER5_ARCHIVES
+from huffman import huffman_Decode, huffman_Encode
+from nametable import readString
+
+
+def checkTables(archive) -> None:
+    # The three tables are views of the one decoded header
+    for table in (archive.nameTable, archive.fileTable, archive.directoryTable):
+        assert isinstance(table, memoryview)
+        assert table.obj is archive.nameTable.obj
+    assert len(archive.nameTable.obj) == archive.archiveHead.headSize
+
+
+@pytest.mark.parametrize("archivePath", VER5_ARCHIVES, ids=lambda path: path.name)
+def test_headerTables(loadArchive, archivePath):
+    archive = loadArchive(archivePath)
+    checkTables(archive)
+    assert len(archive.archivedFiles) > 0
+
+
+def test_headerTablesVer8(loadVer8Archive):
+    checkTables(loadVer8Archive)
+    assert loadVer8Archive.find("Picture/tiny.png") is not None
+
+
+def test_huffmanDecodeSizesBuffer():
+    data = bytes(range(50)) * 20
+    (press, pressSize) = huffman_Encode(bytearray(data), len(data), bytearray(2048))
+    assert huffman_Decode(press[:pressSize], None) == len(data)
+    (decoded, size) = huffman_Decode(press[:pressSize], bytearray())
+    assert size == len(data)
+    assert decoded[:size] == data
+
+
+def test_readString():
+    table = memoryview(b"abc\0def\0")
+    assert readString(table, 0, 8) == b"abc"
+    assert readString(table, 4, 8) == b"def"
+    assert readString(table, 4, 2) == b"de"
+    assert type(readString(table, 0, 8)) is bytes
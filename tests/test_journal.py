@@ -0,0 +1,84 @@
+import os
+
+from conftest import TEST_WOLF
+from journal import ExtractionJournal, getJournalPath
+
+
+def extractWithJournal(archive) -> None:
+    """Extract every file with a journal left behind, like an interrupted run"""
+    with ExtractionJournal.open(archive) as journal:
+        archive.extractFiles(archive.archivedFiles, journal=journal)
+
+
+def getExtracted(archive, verifyResumed: bool = False) -> list:
+    records = []
+    archive.enableStats(records.append)
+    archive.extractAll(resume=True, verifyResumed=verifyResumed)
+    archive.disableStats()
+    return [record.name for record in records]
+
+
+def test_resumeRewritesDeletedFile(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    extractWithJournal(archive)
+    archivedFile = archive.archivedFiles[0]
+    archivedFile.filePath.unlink()
+
+    assert getExtracted(archive) == [archivedFile.name]
+    assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+def test_resumeRewritesChangedFile(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    extractWithJournal(archive)
+    archivedFile = next(
+        archivedFile
+        for archivedFile in archive.archivedFiles
+        if archivedFile.dataSize > 0
+    )
+    data = bytearray(archivedFile.filePath.read_bytes())
+    data[0] ^= 0xFF
+    archivedFile.filePath.write_bytes(data)
+
+    # Same size, told apart by its modification time
+    assert getExtracted(archive) == [archivedFile.name]
+    assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+def corruptKeepingTime(archivedFile) -> None:
+    stat = archivedFile.filePath.stat()
+    data = bytearray(archivedFile.filePath.read_bytes())
+    data[0] ^= 0xFF
+    archivedFile.filePath.write_bytes(data)
+    os.utime(archivedFile.filePath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_resumeVerify(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    archivedFile = next(
+        archivedFile
+        for archivedFile in archive.archivedFiles
+        if archivedFile.dataSize > 0
+    )
+
+    # Same size and time: trusted without reading it again
+    extractWithJournal(archive)
+    corruptKeepingTime(archivedFile)
+    assert getExtracted(archive) == []
+
+    # Told apart by its digest
+    extractWithJournal(archive)
+    corruptKeepingTime(archivedFile)
+    assert getExtracted(archive, verifyResumed=True) == [archivedFile.name]
+    assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+def test_journalRemovedWhenFinished(loadArchive, tmp_path):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    assert getJournalPath(archive).parent == tmp_path
+    extractWithJournal(archive)
+    assert getJournalPath(archive).exists()
+
+    assert getExtracted(archive) == []
+    assert not getJournalPath(archive).exists()
+    assert not list(archive.outputPath.rglob("*.journal"))
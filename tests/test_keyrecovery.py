@@ -0,0 +1,83 @@
+import importlib.util
+import shutil
+import sys
+
+import pytest
+
+import DXArchive
+import DXArchive5
+import DXArchive6
+from conftest import ROOT, VER5_ARCHIVES
+from keyrecovery import VER5_LAYOUT, VER6_LAYOUT, KeyCache, recoverKey
+from keys import key_1_01_2_02
+
+
+@pytest.mark.parametrize("archivePath", VER5_ARCHIVES, ids=lambda path: path.stem)
+def test_recoverKeyVer5(archivePath):
+    keyString = recoverKey(DXArchive5.DXArchive(), archivePath, VER5_LAYOUT)
+    assert keyString == key_1_01_2_02
+
+
+@pytest.mark.parametrize("archivePath", VER5_ARCHIVES, ids=lambda path: path.stem)
+def test_recoverKeyWrongLayout(archivePath):
+    assert recoverKey(DXArchive6.DXArchive(), archivePath, VER6_LAYOUT) is None
+
+
+def test_recoverKeyCached(tmp_path):
+    archivePath = VER5_ARCHIVES[0]
+    cachePath = tmp_path / "keys.json"
+    archive = DXArchive5.DXArchive()
+    assert archive.recoverKey(archivePath, KeyCache(cachePath)) == key_1_01_2_02
+
+    # Found again in the cache file rather than solved
+    cache = KeyCache(cachePath)
+    (name,) = cache.keys
+    cache.keys[name] = bytes(12).hex()
+    assert archive.recoverKey(archivePath, cache) == bytes(12)
+
+
+def test_recoverKeyVer8():
+    # Per-file keys, there's nothing to recover from the header
+    assert not hasattr(DXArchive.DXArchive(), "recoverKey")
+
+
+def test_recoveredKeyLoads(tmp_path):
+    archivePath = VER5_ARCHIVES[0]
+    archive = DXArchive5.DXArchive()
+    keyString = archive.recoverKey(archivePath)
+    assert archive.loadArchive(archivePath, tmp_path, keyString)
+    assert archive.archivedFiles
+    archive.fp.close()
+
+
+@pytest.fixture
+def package(monkeypatch):
+    """The package itself, for decompile_wolf"""
+    spec = importlib.util.spec_from_file_location(
+        "wolfrpg", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, "wolfrpg", module)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_decompileRecoveredKey(package, monkeypatch, tmp_path, cached):
+    archivePath = tmp_path / "data.wolf"
+    shutil.copyfile(VER5_ARCHIVES[0], archivePath)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    # The known key isn't tried: it has to be recovered
+    monkeypatch.setattr(
+        package,
+        "decompiler_pairs",
+        [(package.DXArchive5.DXArchive(), package.key_2_10)],
+    )
+
+    cachePath = tmp_path / "keys.json" if cached else None
+    assert package.decompile_wolf(archivePath, cachePath)
+    # Nothing is written to the default cache
+    assert not (tmp_path / "cache").exists()
+    assert (tmp_path / "keys.json").exists() == cached
+    if cached:
+        assert list(KeyCache(cachePath).keys.values()) == [key_1_01_2_02.hex()]
@@ -0,0 +1,88 @@
+import pytest
+
+import DXArchive5
+from conftest import TEST_WOLF
+from keys import key_1_01_2_02
+from manifest import ExtractionManifest, getManifestPath
+
+
+def getTree(outputPath) -> dict:
+    return {
+        path.relative_to(outputPath).as_posix(): path.read_bytes()
+        for path in outputPath.rglob("*")
+        if path.is_file()
+    }
+
+
+def test_extractChangesTwice(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    diff = archive.extractChanges()
+    assert len(diff.added) == len(archive.archivedFiles)
+
+    diff = archive.extractChanges()
+    assert (len(diff.added), len(diff.changed), len(diff.removed)) == (0, 0, 0)
+    assert diff.unchanged == len(archive.archivedFiles)
+
+
+def test_extractChangesMissingFile(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    archive.extractChanges()
+    archivedFile = archive.archivedFiles[0]
+    archivedFile.filePath.unlink()
+
+    diff = archive.extractChanges()
+    assert diff.changed == [archivedFile]
+    assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+def test_extractChangesOtherArchive(loadArchive, tmp_path):
+    outputPath = tmp_path / "output"
+    loadArchive(TEST_WOLF / "version_110.wolf", outputPath).extractChanges()
+
+    archive = loadArchive(TEST_WOLF / "version_131.wolf", outputPath)
+    diff = archive.extractChanges()
+    assert diff.removed
+
+    # Nothing left of the first archive, and the manifest isn't in the tree
+    assert getTree(outputPath) == {
+        archivedFile.name: bytes(archive.readFile(archivedFile))
+        for archivedFile in archive.archivedFiles
+    }
+    assert getManifestPath(outputPath).parent == tmp_path
+    assert ExtractionManifest.open(archive).entries == diff.entries
+
+
+def test_extractChangesFiltered(loadArchive, tmp_path):
+    outputPath = tmp_path / "output"
+    archive = loadArchive(TEST_WOLF / "version_131.wolf", outputPath)
+    archive.extractChanges()
+    tree = getTree(outputPath)
+
+    filtered = DXArchive5.DXArchive()
+    assert filtered.loadArchive(
+        TEST_WOLF / "version_131.wolf", outputPath, key_1_01_2_02, ["*.dat"]
+    )
+    diff = filtered.extractChanges()
+    filtered.fp.close()
+    assert diff.removed == []
+    assert diff.unchanged == len(filtered.archivedFiles)
+    assert getTree(outputPath) == tree
+
+    # The files left out are still known to the manifest
+    diff = archive.extractChanges()
+    assert diff.unchanged == len(archive.archivedFiles)
+
+
+def test_applyOutsideOutputPath(loadArchive, tmp_path):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.extractChanges()
+    outside = tmp_path / "outside.txt"
+    outside.write_bytes(b"kept")
+
+    manifest = ExtractionManifest.open(archive)
+    manifest.entries["../outside.txt"] = ""
+    diff = manifest.diff(archive)
+    assert diff.removed == ["../outside.txt"]
+    with pytest.raises(ValueError):
+        manifest.apply(diff)
+    assert outside.read_bytes() == b"kept"
@@ -0,0 +1,58 @@
+import struct
+
+import pytest
+
+from conftest import VER5_ARCHIVES
+from nametable import decodeNameTable, getEncoding
+
+
+def makeNameTable(names: list, encoding: str) -> bytes:
+    """Name table holding names, the way DXArchive writes it"""
+    table = b""
+    for name in names:
+        raw = name.encode(encoding)
+        length = len(raw) // 4 + 1
+        padded = raw.ljust(length * 4, b"\0")
+        parity = sum(padded.upper()) & 0xFFFF
+        table += struct.pack("<HH", length, parity) + padded.upper() + padded
+    return table
+
+
+@pytest.mark.parametrize("encoding", ["utf8", "cp932"])
+def test_decodeNameTable(encoding):
+    names = ["Game.dat", "マップデータ", "abc", "効果音.wav"]
+    table = makeNameTable(names, encoding)
+    decoded = decodeNameTable(table, len(table))
+    assert list(decoded.values()) == names
+    assert decodeNameTable(table, len(table), encoding) == decoded
+
+
+def test_decodeWithEncoding():
+    # UTF-8 names also decode as CP932, only the archive's code page tells them apart
+    table = makeNameTable(["ユーザー"], "utf8")
+    assert list(decodeNameTable(table, len(table), "cp932").values()) != ["ユーザー"]
+    assert list(decodeNameTable(table, len(table), "utf8").values()) == ["ユーザー"]
+
+
+def test_decodeBrokenTable():
+    table = makeNameTable(["abc"], "utf8")
+    assert decodeNameTable(table + b"\xff\xff\0\0", len(table) + 4) == {}
+
+
+def test_getEncoding():
+    assert getEncoding(932) == "cp932"
+    assert getEncoding(65001) == "utf-8"
+    assert getEncoding(0) is None
+    assert getEncoding(12345) is None
+    assert getEncoding(3040347651) is None
+
+
+@pytest.mark.parametrize("archivePath", VER5_ARCHIVES, ids=lambda path: path.name)
+def test_namesOfArchives(loadArchive, archivePath):
+    archive = loadArchive(archivePath)
+    for nameAddress, name in archive.fileNames.items():
+        if not name:
+            # The root directory
+            continue
+        fileNameTable = archive.nameTable[nameAddress:]
+        assert name == archive.getOriginalFileName(fileNameTable).as_posix()
@@ -0,0 +1,28 @@
+import pytest
+
+from conftest import TEST_WOLF
+
+SIZES = (0, 1, 100, 0x1000, 0x5000)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_peekVer5(loadArchive, size):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    assert any(archivedFile.compressed for archivedFile in archive.archivedFiles)
+    for archivedFile in archive.archivedFiles:
+        assert archive.peek(archivedFile, size) == archive.readFile(archivedFile)[:size]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_peekVer8(loadVer8Archive, size):
+    archive = loadVer8Archive
+    for archivedFile in archive.archivedFiles:
+        assert archive.peek(archivedFile, size) == archive.readFile(archivedFile)[:size]
+
+
+def test_peekWholeFile(loadVer8Archive):
+    archive = loadVer8Archive
+    for archivedFile in archive.archivedFiles:
+        data = archive.readFile(archivedFile)
+        assert archive.peek(archivedFile, archivedFile.dataSize + 10) == data
+        assert archive.peek(archivedFile, -1) == b""
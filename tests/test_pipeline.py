@@ -0,0 +1,31 @@
+import pytest
+
+from conftest import TEST_WOLF
+
+
+def checkExtracted(archive) -> None:
+    for archivedFile in archive.archivedFiles:
+        assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_pipelined(loadArchive, workers):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    statuses = []
+    archive.extractAll(pipelined=True, workers=workers, progress=statuses.append)
+    checkExtracted(archive)
+    assert statuses[-1].compFileNum == len(archive.archivedFiles)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_pipelinedVer8(loadVer8Archive, workers):
+    loadVer8Archive.extractAll(pipelined=True, workers=workers)
+    checkExtracted(loadVer8Archive)
+
+
+def test_pipelinedWriteError(loadArchive, tmp_path):
+    # A file where the output directory should be makes every write fail
+    (tmp_path / "output").write_bytes(b"")
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    with pytest.raises(OSError):
+        archive.extractAll(pipelined=True)
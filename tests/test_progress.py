@@ -0,0 +1,64 @@
+from archivebase import DARC_ENCODEINFO
+from conftest import TEST_WOLF
+from progress import ProgressReporter
+
+
+class FakeFile:
+    def __init__(self, name: str, dataSize: int) -> None:
+        self.name = name
+        self.dataSize = dataSize
+
+
+def test_extractProgress(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    statuses = []
+    archive.extractAll(progress=statuses.append)
+
+    status = statuses[-1]
+    assert status.finished
+    assert status.eta == 0.0
+    assert status.totalFileNum == status.compFileNum == len(archive.archivedFiles)
+    assert status.totalBytes == status.compBytes
+    assert status.totalBytes == sum(f.dataSize for f in archive.archivedFiles)
+    assert archive.encodeInfo.compFileNum == len(archive.archivedFiles)
+
+
+def test_interval():
+    files = [FakeFile(f"{i}.dat", 100) for i in range(10)]
+    statuses = []
+    reporter = ProgressReporter(DARC_ENCODEINFO(), statuses.append, interval=0)
+    reporter.start(files)
+    for archivedFile in files:
+        reporter.fileStarted(archivedFile)
+        reporter.fileDone(archivedFile)
+    reporter.finish()
+
+    assert [status.compFileNum for status in statuses] == list(range(1, 11)) + [10]
+    assert [status.processFileName for status in statuses[:3]] == [
+        "0.dat",
+        "1.dat",
+        "2.dat",
+    ]
+    assert [status.finished for status in statuses].count(True) == 1
+    assert statuses[3].compBytes == 400
+
+
+def test_onlyFinished():
+    files = [FakeFile(f"{i}.dat", 100) for i in range(10)]
+    statuses = []
+    reporter = ProgressReporter(DARC_ENCODEINFO(), statuses.append, interval=3600)
+    reporter.start(files)
+    for archivedFile in files:
+        reporter.fileDone(archivedFile)
+    reporter.finish()
+    assert len(statuses) == 1 and statuses[0].finished
+
+
+def test_noCallback():
+    info = DARC_ENCODEINFO()
+    reporter = ProgressReporter(info, None)
+    reporter.start([FakeFile("a.dat", 10)])
+    reporter.fileDone(FakeFile("a.dat", 10))
+    reporter.finish()
+    assert not info.outputStatus
+    assert (info.compFileNum, info.compBytes) == (1, 10)
@@ -0,0 +1,88 @@
+import io
+
+import pytest
+
+from conftest import TEST_WOLF, VER8_ARCHIVE
+from keys import key_1_01_2_02, key_2_25_2_81
+from reader import openArchive
+
+
+@pytest.fixture
+def reader():
+    with openArchive(TEST_WOLF / "version_131.wolf", key_1_01_2_02) as reader:
+        yield reader
+
+
+def getStored(reader):
+    """An uncompressed file of reader, read on demand by open()"""
+    return next(
+        archivedFile
+        for archivedFile in reader.infolist()
+        if not archivedFile.compressed and archivedFile.dataSize > 16
+    )
+
+
+def test_namelist(reader):
+    names = [archivedFile.name for archivedFile in reader.archive.archivedFiles]
+    assert reader.namelist() == names
+    assert len(reader) == len(names)
+    assert names[0] in reader
+
+
+def test_read(reader):
+    for archivedFile in reader.infolist():
+        data = reader.read(archivedFile.name)
+        assert type(data) is bytes
+        assert data == reader.archive.readFile(archivedFile)
+
+    with pytest.raises(KeyError):
+        reader.read("missing.dat")
+
+
+def test_openRead(reader):
+    for archivedFile in reader.infolist():
+        with reader.open(archivedFile.name) as fp:
+            assert fp.read() == reader.read(archivedFile.name)
+
+
+def test_openSeek(reader):
+    archivedFile = getStored(reader)
+    data = reader.read(archivedFile.name)
+    with reader.open(archivedFile.name, "rb") as fp:
+        assert fp.seekable()
+        assert fp.read(4) == data[:4]
+        assert fp.seek(-8, io.SEEK_END) == len(data) - 8
+        assert fp.read() == data[-8:]
+        fp.seek(3)
+        fp.seek(2, io.SEEK_CUR)
+        assert fp.tell() == 5
+        assert fp.read(4) == data[5:9]
+
+    with pytest.raises(ValueError):
+        reader.open(archivedFile.name, "w")
+
+
+def test_root(reader):
+    paths = list(reader.root.walk())
+    assert sorted(str(path) for path in paths) == sorted(reader.namelist())
+    path = paths[0]
+    assert path.is_file() and path.parent.is_dir()
+    assert path.read_bytes() == reader.read(str(path))
+    assert reader.find(str(path).upper()).name == str(path)
+
+
+def test_openVer8():
+    with openArchive(VER8_ARCHIVE, key_2_25_2_81) as reader:
+        assert type(reader.archive).__module__ == "DXArchive"
+        assert reader.read("Picture/tiny.png") == reader.root.joinpath(
+            "Picture", "tiny.png"
+        ).read_bytes()
+
+
+def test_openArchiveWrongFile():
+    assert openArchive(TEST_WOLF.parent / "README.md") is None
+
+
+def test_openArchiveMissing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        openArchive(tmp_path / "missing.wolf")
@@ -0,0 +1,49 @@
+import pytest
+
+from conftest import TEST_WOLF
+
+
+@pytest.fixture
+def archive(loadArchive):
+    return loadArchive(TEST_WOLF / "version_131.wolf")
+
+
+def getStored(archive) -> list:
+    return [
+        archivedFile
+        for archivedFile in archive.archivedFiles
+        if not archivedFile.compressed and not archivedFile.huffmanCompressed
+    ]
+
+
+@pytest.mark.parametrize("offset", [0, 1, 5, 11, 12, 13, 1000])
+@pytest.mark.parametrize("length", [0, 1, 7, 12, 100, 1 << 20])
+def test_readRange(archive, offset, length):
+    for archivedFile in getStored(archive)[:20]:
+        data = archive.readFile(archivedFile)
+        assert archive.readRange(archivedFile, offset, length) == data[
+            offset : offset + length
+        ]
+
+
+def test_readRangeCompressed(archive):
+    archivedFile = next(f for f in archive.archivedFiles if f.compressed)
+    with pytest.raises(ValueError):
+        archive.readRange(archivedFile, 0, 10)
+
+
+def test_readRangeNegative(archive):
+    with pytest.raises(ValueError):
+        archive.readRange(getStored(archive)[0], -1, 10)
+
+
+def test_readRangeVer8(loadVer8Archive):
+    archive = loadVer8Archive
+    stored = getStored(archive)
+    assert stored
+    for archivedFile in stored:
+        data = archive.readFile(archivedFile)
+        for offset in (0, 3, 7, 100):
+            assert archive.readRange(archivedFile, offset, 50) == data[
+                offset : offset + 50
+            ]
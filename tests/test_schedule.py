@@ -0,0 +1,65 @@
+import io
+
+from conftest import TEST_WOLF
+from schedule import (
+    COALESCE_FILE_SIZE,
+    COALESCE_GAP,
+    SpanReader,
+    planReads,
+)
+
+
+class FakeFile:
+    def __init__(self, dataStart: int, storedSize: int) -> None:
+        self.dataStart = dataStart
+        self.storedSize = storedSize
+
+
+def test_planReadsOrder():
+    files = [FakeFile(300, 10), FakeFile(0, 100), FakeFile(100, 200)]
+    groups = planReads(files)
+    assert len(groups) == 1
+    assert [f.dataStart for f in groups[0].files] == [0, 100, 300]
+    assert (groups[0].start, groups[0].size) == (0, 310)
+
+
+def test_planReadsSplits():
+    large = FakeFile(1000, COALESCE_FILE_SIZE + 1)
+    afterGap = FakeFile(large.dataStart + large.storedSize + COALESCE_GAP + 1, 10)
+    files = [FakeFile(0, 1000), large, afterGap, FakeFile(afterGap.dataStart + 10, 5)]
+    groups = planReads(files)
+    assert [[f.dataStart for f in group.files] for group in groups] == [
+        [0],
+        [1000],
+        [afterGap.dataStart, afterGap.dataStart + 10],
+    ]
+    assert not groups[1].coalesce
+
+
+def test_planReadsArchive(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    groups = planReads(archive.archivedFiles)
+    planned = [archivedFile for group in groups for archivedFile in group.files]
+    assert sorted(planned, key=id) == sorted(archive.archivedFiles, key=id)
+    assert planned == sorted(archive.archivedFiles, key=lambda f: f.dataStart)
+    assert len(groups) < len(archive.archivedFiles)
+
+
+def test_extractFromGroups(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    archive.extractAll()
+    for archivedFile in archive.archivedFiles:
+        assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+def test_spanReader():
+    reader = SpanReader(b"0123456789", 100)
+    assert reader.seek(102) == 102
+    assert reader.read(3) == b"234"
+    assert reader.tell() == 105
+    buffer = bytearray(10)
+    assert reader.readinto(buffer) == 5
+    assert buffer[:5] == b"56789"
+    reader.seek(-2, io.SEEK_END)
+    assert reader.read() == b"89"
+
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from archivebase import ArchivedFile, DARC_FILETIME
+from conftest import TEST_WOLF
+from sink import FILETIME_EPOCH, PARTIAL_SUFFIX, OutputSink, fileTimeToNs
+
+
+def makeFile(path, dataSize: int, lastWrite: int = 0) -> ArchivedFile:
+    archivedFile = ArchivedFile()
+    archivedFile.filePath = path
+    archivedFile.dataSize = dataSize
+    archivedFile.time = DARC_FILETIME()
+    archivedFile.time.lastAccess = archivedFile.time.lastWrite = lastWrite
+    return archivedFile
+
+
+def test_fileTimeToNs():
+    assert fileTimeToNs(0) is None
+    assert fileTimeToNs(FILETIME_EPOCH - 1) is None
+    assert fileTimeToNs(FILETIME_EPOCH) == 0
+    assert fileTimeToNs(FILETIME_EPOCH + 10_000_000) == 1_000_000_000
+
+
+@pytest.mark.parametrize("threads", [0, 2])
+def test_submit(tmp_path, threads):
+    files = [makeFile(tmp_path / f"dir{i % 3}" / f"{i}.dat", 4) for i in range(50)]
+    with OutputSink(threads) as sink:
+        for i, archivedFile in enumerate(files):
+            sink.submit(archivedFile, [b"ab", i.to_bytes(2, "little")])
+    for i, archivedFile in enumerate(files):
+        assert archivedFile.filePath.read_bytes() == b"ab" + i.to_bytes(2, "little")
+    assert len(sink.createdDirectories) == 3
+
+
+def test_setTimes(tmp_path):
+    lastWrite = FILETIME_EPOCH + 1_600_000_000 * 10_000_000
+    archivedFile = makeFile(tmp_path / "file.dat", 1, lastWrite)
+    with OutputSink(0, setTimes=True) as sink:
+        sink.submit(archivedFile, [b"x"])
+    assert archivedFile.filePath.stat().st_mtime_ns == 1_600_000_000 * 10**9
+
+
+def test_atomicError(tmp_path):
+    archivedFile = makeFile(tmp_path / "file.dat", 4)
+
+    def chunks():
+        yield b"ab"
+        raise RuntimeError("cut short")
+
+    with OutputSink(0, atomic=True) as sink:
+        with pytest.raises(RuntimeError):
+            sink.writeFile(archivedFile, chunks())
+    assert not archivedFile.filePath.exists()
+    assert not (tmp_path / ("file.dat" + PARTIAL_SUFFIX)).exists()
+
+
+def test_threadError(tmp_path):
+    (tmp_path / "blocked").write_bytes(b"")
+    sink = OutputSink(2)
+    sink.submit(makeFile(tmp_path / "blocked" / "file.dat", 1), [b"x"])
+    with pytest.raises(OSError):
+        sink.finish()
+
+
+def test_extractWithTimes(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.extractAll(setTimes=True)
+    for archivedFile in archive.archivedFiles:
+        lastWrite = fileTimeToNs(archivedFile.time.lastWrite)
+        if lastWrite is not None:
+            assert os.stat(archivedFile.filePath).st_mtime_ns == lastWrite
@@ -0,0 +1,36 @@
+from conftest import TEST_WOLF
+from stats import STAGES
+
+
+def test_enableStats(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    records = []
+    stats = archive.enableStats(records.append)
+    archive.extractAll()
+    assert archive.disableStats() is stats
+    assert archive.stats is None
+
+    assert stats.fileNum == len(archive.archivedFiles)
+    assert records == stats.records
+    # The sink writes from several threads, files can finish in any order
+    files = {archivedFile.name: archivedFile for archivedFile in archive.archivedFiles}
+    assert sorted(record.name for record in records) == sorted(files)
+    assert stats.bytesOut == sum(f.dataSize for f in archive.archivedFiles)
+    assert stats.bytesIn == sum(archive.getStoredSize(f) for f in archive.archivedFiles)
+    assert set(stats.stageTimes) == set(STAGES)
+
+    for record in records:
+        archivedFile = files[record.name]
+        assert record.bytesOut == archivedFile.dataSize
+        assert record.compression == ("lz" if archivedFile.compressed else "none")
+        assert record.stageTimes["write"] > 0
+    assert len(stats.slowest(3)) == 3
+
+
+def test_statsDisabled(loadArchive):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.enableStats()
+    stats = archive.disableStats()
+    archive.extractAll()
+    assert stats.fileNum == 0
+    assert stats.records == []
@@ -0,0 +1,82 @@
+import stat
+
+from conftest import TEST_WOLF
+from store import ContentStore
+
+
+def checkExtracted(archive) -> None:
+    for archivedFile in archive.archivedFiles:
+        assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+def test_extractToStoreTwoVersions(loadArchive, tmp_path):
+    store = ContentStore(tmp_path / "store")
+    first = loadArchive(TEST_WOLF / "version_130.wolf", tmp_path / "130")
+    first.extractToStore(store)
+    assert (store.hits, store.misses) == (0, len(first.archivedFiles))
+
+    second = loadArchive(TEST_WOLF / "version_131.wolf", tmp_path / "131")
+    second.extractToStore(store)
+    # Files the versions share are linked from the objects of the first one
+    assert store.hits > 0
+    assert store.hits + store.misses == len(first.archivedFiles) + len(
+        second.archivedFiles
+    )
+    checkExtracted(first)
+    checkExtracted(second)
+
+
+def test_extractToStoreAgain(loadArchive, tmp_path):
+    store = ContentStore(tmp_path / "store")
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.extractToStore(store)
+    decodedBytes = store.decodedBytes
+
+    # From the saved manifest, nothing is decoded again
+    store = loadArchive(TEST_WOLF / "version_110.wolf").extractToStore(
+        tmp_path / "store"
+    )
+    assert (store.hits, store.decodedBytes) == (len(archive.archivedFiles), 0)
+    assert decodedBytes > 0
+    checkExtracted(archive)
+
+
+def test_storeObjectsReadOnly(loadArchive, tmp_path):
+    store = ContentStore(tmp_path / "store")
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.extractToStore(store)
+
+    objects = [path for path in store.objects.rglob("*") if path.is_file()]
+    assert objects
+    for path in objects:
+        assert not path.stat().st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+
+
+def test_storeLinks(loadArchive, tmp_path):
+    store = ContentStore(tmp_path / "store")
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.extractToStore(store)
+
+    # Reflinked, or hardlinked to the read-only objects where there are no
+    # reflinks: never copied on the same file system
+    assert store.links["copy"] == 0
+    assert sum(store.links.values()) == len(archive.archivedFiles)
+    assert store.fallbacks == store.links["hardlink"]
+    assert f"{store.fallbacks} fell back from reflink" in str(store)
+    if store.links["hardlink"]:
+        assert all(
+            archivedFile.filePath.stat().st_nlink > 1
+            for archivedFile in archive.archivedFiles
+        )
+
+
+def test_storeCopy(loadArchive, tmp_path):
+    store = ContentStore(tmp_path / "store", "copy")
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    archive.extractToStore(store)
+    assert store.links["copy"] == len(archive.archivedFiles)
+    assert store.fallbacks == 0
+    for archivedFile in archive.archivedFiles:
+        assert archivedFile.filePath.stat().st_nlink == 1
+    checkExtracted(archive)
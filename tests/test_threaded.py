@@ -0,0 +1,53 @@
+import io
+
+import pytest
+
+from conftest import TEST_WOLF
+from schedule import PositionalReader
+
+
+def checkExtracted(archive) -> None:
+    for archivedFile in archive.archivedFiles:
+        assert archivedFile.filePath.read_bytes() == archive.readFile(archivedFile)
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_threads(loadArchive, threads):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    position = archive.fp.tell()
+    statuses = []
+    archive.extractAll(threads=threads, progress=statuses.append)
+    # The threads read through their own positions
+    assert archive.fp.tell() == position
+    assert statuses[-1].compFileNum == len(archive.archivedFiles)
+    checkExtracted(archive)
+
+
+def test_threadsVer8(loadVer8Archive):
+    loadVer8Archive.extractAll(threads=2)
+    checkExtracted(loadVer8Archive)
+
+
+@pytest.mark.parametrize(
+    "options", [{"pipelined": True}, {"workers": 2}, {"maxMemory": 1 << 24}]
+)
+def test_threadsWithOthers(loadArchive, options):
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    with pytest.raises(ValueError):
+        archive.extractAll(threads=2, **options)
+
+
+def test_positionalReader(tmp_path):
+    path = tmp_path / "data"
+    path.write_bytes(bytes(range(256)))
+    with open(path, "rb") as fp:
+        first = PositionalReader(fp, 10)
+        second = PositionalReader(fp)
+        assert first.read(4) == bytes(range(10, 14))
+        assert second.read(2) == bytes(range(2))
+        assert first.tell() == 14
+        buffer = bytearray(8)
+        assert first.readinto(buffer) == 8 and buffer == bytes(range(14, 22))
+        second.seek(-3, io.SEEK_END)
+        assert second.read() == bytes(range(253, 256))
+        assert fp.tell() == 0
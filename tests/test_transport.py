@@ -0,0 +1,73 @@
+import pytest
+
+import pipeline
+from conftest import TEST_WOLF
+from transport import SharedIndex, SlotPool
+
+FIELDS = ("dataStart", "dataSize", "pressDataSize", "huffPressDataSize")
+
+
+def checkIndex(archive) -> None:
+    index = SharedIndex.publish(archive, archive.archivedFiles)
+    try:
+        shared = SharedIndex.open(index.name)
+        assert shared.count == len(archive.archivedFiles)
+        assert shared.head.version == archive.archiveHead.version
+        for number, archivedFile in enumerate(archive.archivedFiles):
+            entry = shared.getEntry(number)
+            for field in FIELDS + ("compressed", "huffmanCompressed", "key"):
+                assert getattr(entry, field) == getattr(archivedFile, field)
+        with pytest.raises(IndexError):
+            shared.getEntry(shared.count)
+        shared.close()
+    finally:
+        index.close()
+
+
+def test_sharedIndex(loadArchive):
+    checkIndex(loadArchive(TEST_WOLF / "version_131.wolf"))
+
+
+def test_sharedIndexVer8(loadVer8Archive):
+    checkIndex(loadVer8Archive)
+
+
+def test_slotPool():
+    slots = SlotPool(2, 16)
+    try:
+        assert {slots.take(), slots.take()} == {0, 1}
+        assert slots.take(timeout=0) is None
+        slots.give(1)
+        assert slots.take() == 1
+        with slots.getView(1, 4) as view:
+            view[:] = b"abcd"
+        assert bytes(slots.memory.buf[16:20]) == b"abcd"
+    finally:
+        slots.close()
+
+
+@pytest.mark.parametrize("ver8", [False, True])
+def test_decodeToSlot(loadArchive, loadVer8Archive, ver8):
+    if ver8:
+        archive = loadVer8Archive
+    else:
+        archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    size = max(archivedFile.dataSize for archivedFile in archive.archivedFiles)
+    index = SharedIndex.publish(archive, archive.archivedFiles)
+    slots = SlotPool(1, size)
+    # What a worker process does, in this one
+    pipeline.initSharedWorker(
+        type(archive), archive.archivePath, index.name, slots.name, size, None
+    )
+    try:
+        for number, archivedFile in enumerate(archive.archivedFiles):
+            assert pipeline.decodeToSlot(number, 0) == archivedFile.dataSize
+            with slots.getView(0, archivedFile.dataSize) as view:
+                assert view == archive.readFile(archivedFile)
+    finally:
+        pipeline.workerArchive.fp.close()
+        pipeline.workerIndex.close()
+        pipeline.workerSlots.close()
+        pipeline.workerArchive = pipeline.workerIndex = pipeline.workerSlots = None
+        slots.close()
+        index.close()
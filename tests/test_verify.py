@@ -0,0 +1,42 @@
+import shutil
+
+import pytest
+
+from conftest import TEST_WOLF
+
+
+@pytest.fixture
+def brokenArchive(loadArchive, tmp_path):
+    """Copy of version_110.wolf with the LZ stream of one file overwritten"""
+    archive = loadArchive(TEST_WOLF / "version_110.wolf")
+    broken = max(
+        (f for f in archive.archivedFiles if f.compressed), key=lambda f: f.dataSize
+    )
+    archivePath = tmp_path / "broken.wolf"
+    shutil.copyfile(archive.archivePath, archivePath)
+    with open(archivePath, "r+b") as fp:
+        fp.seek(broken.dataStart + 16)
+        fp.write(b"\xff" * 64)
+    return (loadArchive(archivePath), broken.name)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_verify(loadArchive, workers):
+    archive = loadArchive(TEST_WOLF / "version_131.wolf")
+    report = archive.verify(workers)
+    assert report.ok and report
+    assert report.checkedFiles == len(archive.archivedFiles)
+    assert report.checkedBytes == sum(f.dataSize for f in archive.archivedFiles)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_verifyBroken(brokenArchive, workers):
+    (archive, name) = brokenArchive
+    report = archive.verify(workers)
+    assert not report
+    assert [failedName for (failedName, _) in report.failures] == [name]
+    assert name in str(report)
+
+
+def test_verifyVer8(loadVer8Archive):
+    assert loadVer8Archive.verify(1).ok
@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+try:
+    from .schedule import PositionalReader, adviseGroups, planReads, readGroup
+    from .sink import OutputSink
+except ImportError:
+    from schedule import PositionalReader, adviseGroups, planReads, readGroup
+    from sink import OutputSink
+
+
+class ThreadedExtractor:
+    """
+    Extracts files with threads of this process, each one reading, decoding
+    and writing whole read groups (see schedule.planReads) on its own.
+    Threads read the archive through their own schedule.PositionalReader,
+    the archive's file object and its position are never touched, and the
+    buffer pool gives each thread its own arena.
+    Under the GIL the decoders take turns, on a free-threaded build
+    (python3.13t and later) they run at the same time without the start up
+    and pickling costs of worker processes.
+    """
+
+    def __init__(self, archive, threads: int, sink=None) -> None:
+        if threads < 1:
+            raise ValueError("threads must be at least 1")
+        self.archive = archive
+        self.threads = threads
+        self.sink = OutputSink(threads=0) if sink is None else sink
+        self.stop = threading.Event()
+        self.lock = threading.Lock()  # Around the progress reporter
+
+    def run(self, archivedFiles: list, reporter) -> None:
+        groups = planReads(archivedFiles)
+        adviseGroups(self.archive.fp, groups)
+
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="extract") as executor:
+            futures = [
+                executor.submit(self.extractGroup, group, reporter) for group in groups
+            ]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    # The groups not started yet are skipped
+                    self.stop.set()
+                    for other in futures:
+                        other.cancel()
+                    raise future.exception()
+
+    def extractGroup(self, group, reporter) -> None:
+        if self.stop.is_set():
+            return
+
+        reader = PositionalReader(self.archive.fp)
+        source = readGroup(reader, group)
+        for archivedFile in group.files:
+            with self.lock:
+                reporter.fileStarted(archivedFile)
+            self.archive.extractFile(
+                archivedFile, reader if source is None else source, self.sink
+            )
+            with self.lock:
+                reporter.fileDone(archivedFile)
@@ -0,0 +1,178 @@
+import queue
+import struct
+from multiprocessing import shared_memory
+
+INDEX_MAGIC = b"WDXI"
+# magic, number of entries, archive version, huffmanEncodeKB, chunkSize
+INDEX_HEAD = struct.Struct("<4sIHHQ")
+# dataStart, dataSize, pressDataSize, huffPressDataSize, flags, key length (0: None), key
+INDEX_ENTRY = struct.Struct("<QQQQBB12s")
+FLAG_COMPRESSED = 0x01
+FLAG_HUFFMAN = 0x02
+SLOT_SIZE = 16 * 1024 * 1024  # Larger files aren't decoded by the workers
+SLOTS_PER_WORKER = 4  # Output slots for each worker process
+
+
+class IndexHead:
+    """The fields of the archive header decodeFile uses"""
+
+    def __init__(self, version: int, huffmanEncodeKB: int) -> None:
+        self.version = version
+        self.huffmanEncodeKB = huffmanEncodeKB
+
+
+class IndexEntry:
+    """The fields of an ArchivedFile decodeFile uses, read back from a SharedIndex"""
+
+    __slots__ = (
+        "compressed",
+        "huffmanCompressed",
+        "key",
+        "dataStart",
+        "dataSize",
+        "pressDataSize",
+        "huffPressDataSize",
+    )
+
+
+class SharedIndex:
+    """
+    The files to decode, published once in shared memory for worker processes
+    instead of every worker loading the archive again: a fixed-width INDEX_HEAD
+    followed by one INDEX_ENTRY per file, found by its number.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool) -> None:
+        self.memory = memory
+        self.owner = owner
+        (magic, self.count, version, huffmanEncodeKB, self.chunkSize) = (
+            INDEX_HEAD.unpack_from(memory.buf)
+        )
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{memory.name} isn't a shared archive index")
+        self.head = IndexHead(version, huffmanEncodeKB)
+
+    @classmethod
+    def publish(cls, archive, archivedFiles: list):
+        """Shared index of archivedFiles, the number of a file is its position in the list"""
+        size = INDEX_HEAD.size + INDEX_ENTRY.size * len(archivedFiles)
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            head = archive.archiveHead
+            INDEX_HEAD.pack_into(
+                memory.buf,
+                0,
+                INDEX_MAGIC,
+                len(archivedFiles),
+                head.version,
+                getattr(head, "huffmanEncodeKB", None) or 0,
+                archive.chunkSize,
+            )
+
+            offset = INDEX_HEAD.size
+            for archivedFile in archivedFiles:
+                key = b"" if archivedFile.key is None else bytes(archivedFile.key)
+                flags = 0
+                if archivedFile.compressed:
+                    flags |= FLAG_COMPRESSED
+                if archivedFile.huffmanCompressed:
+                    flags |= FLAG_HUFFMAN
+
+                INDEX_ENTRY.pack_into(
+                    memory.buf,
+                    offset,
+                    archivedFile.dataStart,
+                    archivedFile.dataSize,
+                    archivedFile.pressDataSize,
+                    archivedFile.huffPressDataSize,
+                    flags,
+                    len(key),
+                    key,
+                )
+                offset += INDEX_ENTRY.size
+
+            return cls(memory, True)
+        except BaseException:
+            memory.close()
+            memory.unlink()
+            raise
+
+    @classmethod
+    def open(cls, name: str):
+        return cls(shared_memory.SharedMemory(name=name), False)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def getEntry(self, number: int) -> IndexEntry:
+        """File number of the index"""
+        if not 0 <= number < self.count:
+            raise IndexError(f"No file {number} in a shared index of {self.count}")
+
+        (
+            dataStart,
+            dataSize,
+            pressDataSize,
+            huffPressDataSize,
+            flags,
+            keyLength,
+            key,
+        ) = INDEX_ENTRY.unpack_from(
+            self.memory.buf, INDEX_HEAD.size + INDEX_ENTRY.size * number
+        )
+
+        entry = IndexEntry()
+        entry.compressed = (flags & FLAG_COMPRESSED) != 0
+        entry.huffmanCompressed = (flags & FLAG_HUFFMAN) != 0
+        entry.key = bytearray(key[:keyLength]) if keyLength else None
+        entry.dataStart = dataStart
+        entry.dataSize = dataSize
+        entry.pressDataSize = pressDataSize
+        entry.huffPressDataSize = huffPressDataSize
+        return entry
+
+    def close(self) -> None:
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class SlotPool:
+    """
+    count output slots of size bytes in one shared memory block. A worker
+    decodes a file into a free slot and the parent writes it from there,
+    the decoded data is never pickled. Slots are taken and given back by
+    the parent only.
+    """
+
+    def __init__(self, count: int, size: int) -> None:
+        self.count = count
+        self.size = size
+        self.memory = shared_memory.SharedMemory(create=True, size=count * size)
+        self.free = queue.Queue()
+        for slot in range(count):
+            self.free.put(slot)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def take(self, timeout: float = None) -> int | None:
+        """A free slot, None if there's none after timeout seconds"""
+        try:
+            return self.free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def give(self, slot: int) -> None:
+        self.free.put(slot)
+
+    def getView(self, slot: int, size: int) -> memoryview:
+        """The first size bytes of slot, release() it before close()"""
+        start = slot * self.size
+        return self.memory.buf[start : start + size]
+
+    def close(self) -> None:
+        self.memory.close()
+        self.memory.unlink()
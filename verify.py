@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+BATCH_BYTES = 16 * 1024 * 1024  # Decoded bytes sent to a worker at once
+BATCH_FILES = 256  # Files sent to a worker at once
+BATCHES_PER_WORKER = 2  # Batches queued per worker, bounds the memory in use
+
+
+class ByteCounter:
+    """Write callable that only counts what it's given, then gives it back to pool"""
+
+    def __init__(self, pool=None) -> None:
+        self.size = 0
+        self.pool = pool
+
+    def __call__(self, data) -> None:
+        self.size += len(data)
+        if self.pool is not None:
+            self.pool.give(data)
+
+
+class VerifyReport:
+    """Result of verify(): failures is a list of (name, reason)"""
+
+    def __init__(self) -> None:
+        self.checkedFiles = 0
+        self.checkedBytes = 0
+        self.failures = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.checkedFiles} files ({self.checkedBytes} bytes) checked, "
+            f"{len(self.failures)} failed"
+        ]
+        lines += [f"\t{name}: {reason}" for name, reason in self.failures]
+        return "\n".join(lines)
+
+
+def verifyFile(archive, archivedFile) -> str | None:
+    """Decode archivedFile without writing it, the reason it's broken or None"""
+    counter = ByteCounter(archive.pool)
+    try:
+        archive.decodeFile(archivedFile, counter, check=True, pool=archive.pool)
+    except Exception as exception:
+        # Broken data makes the decoders fail in all sorts of ways
+        return f"{type(exception).__name__}: {exception}"
+
+    if counter.size != archivedFile.dataSize:
+        return f"decoded to {counter.size} bytes, expected {archivedFile.dataSize}"
+
+    return None
+
+
+# Archive loaded by each worker process
+workerArchive = None
+
+
+def initWorker(archiveClass, archivePath, keyString_) -> None:
+    global workerArchive
+    workerArchive = archiveClass()
+    if not workerArchive.loadArchive(archivePath=archivePath, keyString_=keyString_):
+        raise ValueError(f"Can't load {archivePath}")
+
+
+def verifyBatch(names: list) -> list:
+    failures = []
+    for name in names:
+        reason = verifyFile(workerArchive, workerArchive.index.files[name])
+        if reason is not None:
+            failures.append((name, reason))
+    return failures
+
+
+def makeBatches(archivedFiles: list):
+    batch = []
+    batchBytes = 0
+    for archivedFile in archivedFiles:
+        batch.append(archivedFile.name)
+        batchBytes += archivedFile.dataSize
+        if batchBytes >= BATCH_BYTES or len(batch) >= BATCH_FILES:
+            yield batch
+            batch = []
+            batchBytes = 0
+    if batch:
+        yield batch
+
+
+def verifyArchive(archive, archivedFiles: list, workers: int = None) -> VerifyReport:
+    """
+    Decode every file of archivedFiles, checking the sizes stored in the
+    file table against the LZ / Huffman headers and the decoded data.
+    With more than one worker each process loads the archive on its own and
+    gets batches of names, with at most BATCHES_PER_WORKER batches in flight per worker.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    report = VerifyReport()
+    report.checkedFiles = len(archivedFiles)
+    report.checkedBytes = sum(archivedFile.dataSize for archivedFile in archivedFiles)
+
+    if workers <= 1 or len(archivedFiles) <= 1:
+        for archivedFile in archivedFiles:
+            reason = verifyFile(archive, archivedFile)
+            if reason is not None:
+                report.failures.append((archivedFile.name, reason))
+        return report
+
+    # Largest first so a big file doesn't end up alone at the end
+    ordered = sorted(archivedFiles, key=lambda f: f.dataSize, reverse=True)
+    batches = makeBatches(ordered)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=initWorker,
+        initargs=(type(archive), archive.archivePath, archive.keyString_),
+    ) as executor:
+        pending = set()
+        for batch in batches:
+            pending.add(executor.submit(verifyBatch, batch))
+            if len(pending) >= workers * BATCHES_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report.failures += future.result()
+
+        for future in pending:
+            report.failures += future.result()
+
+    report.failures.sort()
+    return report